@@ -1,12 +1,30 @@
 import streamlit as st
 import pandas as pd
-import base64
-import io
-import re
-import calendar
-from datetime import datetime
-import numpy as np
-import xlsxwriter
+import json
+import math
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+
+from unificador.cache import DataFrameCache, content_hash
+from unificador.export import (
+    CSV_COMPRESSIONS, build_csv_file, build_summaries_zip, build_tables_excel_file, read_file
+)
+from unificador.explorer import PAGE_SIZE, ResultIndex
+from unificador.fx import load_fx_rates
+from unificador.history import compare_runs, list_runs, run_name, save_run
+from unificador.jobs import Job
+from unificador.mapping import load_saved_mapping
+from unificador.pipeline import (
+    attach_excel_file, build_mapping, enable_copy_on_write, load_reports, unify, unify_incremental
+)
+from unificador.quality import problem_counts
+from unificador.reconcile import RECONCILE_POLICIES
+from unificador.schemas import SOURCE_COLUMN
+from unificador.streaming import DEFAULT_MEMORY_MB, MIN_MEMORY_MB, preview_report, stream_unify
+from unificador.profiling import StageProfiler, profile_call
 
 # Configuración de la página
 st.set_page_config(
@@ -15,165 +33,70 @@ st.set_page_config(
     layout="wide"
 )
 
+# Copias diferidas de DataFrames (pandas 2.x; en pandas 3 ya es el comportamiento por defecto)
+enable_copy_on_write()
+
 # Título de la aplicación
 st.title("Unificador de Reportes Netsuite-Salesforce")
 st.write("Esta aplicación te permite combinar reportes de Netsuite y Salesforce en un único archivo XLSX o CSV.")
 
-# Función para convertir fecha a formato unificado
-def convert_date_format(date_str, source_format="netsuite"):
-    try:
-        if pd.isna(date_str) or date_str == "" or date_str is None:
-            return None
-        
-        date_str = str(date_str).strip()
-        
-        # Diferentes patrones para detectar el formato de fecha
-        patterns = {
-            # DD/MM/YYYY
-            "dd_mm_yyyy": r'^(\d{1,2})[/\-\.](\d{1,2})[/\-\.](\d{4})$',
-            # MM/DD/YYYY
-            "mm_dd_yyyy": r'^(\d{1,2})[/\-\.](\d{1,2})[/\-\.](\d{4})$',
-            # YYYY/MM/DD
-            "yyyy_mm_dd": r'^(\d{4})[/\-\.](\d{1,2})[/\-\.](\d{1,2})$',
-            # DD-MMM-YYYY o DD MMM YYYY
-            "dd_mmm_yyyy": r'^(\d{1,2})[\s\-\.]+([A-Za-z]{3})[\s\-\.]+(\d{4})$',
-        }
-        
-        for pattern_name, pattern in patterns.items():
-            match = re.match(pattern, date_str)
-            if match:
-                if pattern_name == "dd_mm_yyyy":
-                    day, month, year = match.groups()
-                    # Verificar si el formato es realmente MM/DD/YYYY (común en EEUU)
-                    if int(month) <= 12 and int(day) <= 12:
-                        # Si source_format es "netsuite", asumimos que viene en formato europeo DD/MM/YYYY
-                        if source_format == "netsuite":
-                            return f"{int(day):02d}/{int(month):02d}/{year}"
-                        # En caso de duda, seguir el formato MM/DD/YYYY (para EEUU)
-                        else:
-                            # Aquí invertimos día y mes si viene en formato americano
-                            return f"{int(day):02d}/{int(month):02d}/{year}"
-                    else:
-                        # Si month > 12, entonces es claramente DD/MM/YYYY
-                        return f"{int(day):02d}/{int(month):02d}/{year}"
-                
-                elif pattern_name == "mm_dd_yyyy":
-                    month, day, year = match.groups()
-                    return f"{int(day):02d}/{int(month):02d}/{year}"
-                
-                elif pattern_name == "yyyy_mm_dd":
-                    year, month, day = match.groups()
-                    return f"{int(day):02d}/{int(month):02d}/{year}"
-                
-                elif pattern_name == "dd_mmm_yyyy":
-                    day, month_str, year = match.groups()
-                    month_dict = {
-                        'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
-                        'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12,
-                        'Ene': 1, 'Feb': 2, 'Mar': 3, 'Abr': 4, 'May': 5, 'Jun': 6,
-                        'Jul': 7, 'Ago': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dic': 12
-                    }
-                    month = month_dict.get(month_str, 1)
-                    return f"{int(day):02d}/{month:02d}/{year}"
-        
-        # Si no coincide con ningún patrón común, intentar con datetime
-        try:
-            # Intentar con datetime para detectar automáticamente el formato
-            for fmt in ["%d/%m/%Y", "%m/%d/%Y", "%Y-%m-%d", "%d-%m-%Y", "%m-%d-%Y"]:
-                try:
-                    dt = datetime.strptime(date_str, fmt)
-                    return dt.strftime("%d/%m/%Y")
-                except ValueError:
-                    continue
-        except:
-            pass
-        
-        # Si no se pudo convertir, devolver el valor original
-        return date_str
-    except Exception as e:
-        print(f"Error al convertir fecha '{date_str}': {e}")
-        return date_str
-
-# Función para formatear números (eliminar separadores de miles y mantener punto decimal)
-def format_number(value):
-    try:
-        # Si es un número, convertir a string primero
-        if isinstance(value, (int, float)):
-            return str(value)
-        
-        # Si ya es string, procesar
-        if isinstance(value, str):
-            # Eliminar caracteres no numéricos excepto punto y coma
-            value = ''.join(c for c in value if c.isdigit() or c in '.,')
-            
-            # Si hay puntos y comas, asumir que el último es el decimal
-            if '.' in value and ',' in value:
-                # Determinar cuál es el separador decimal (el último)
-                last_dot_pos = value.rfind('.')
-                last_comma_pos = value.rfind(',')
-                
-                if last_dot_pos > last_comma_pos:  # El punto es el separador decimal
-                    # Eliminar todas las comas (separadores de miles)
-                    value = value.replace(',', '')
-                else:  # La coma es el separador decimal
-                    # Eliminar todos los puntos (separadores de miles) y cambiar la última coma por punto
-                    value = value.replace('.', '')
-                    value = value[:last_comma_pos] + '.' + value[last_comma_pos+1:]
-            elif ',' in value:
-                # Si solo hay comas, la última es el separador decimal
-                last_comma_pos = value.rfind(',')
-                if last_comma_pos == len(value) - 3 or last_comma_pos == len(value) - 2:
-                    # Parece ser un separador decimal, cambiar por punto
-                    value = value.replace(',', '.')
-                else:
-                    # Probablemente son separadores de miles, eliminarlos
-                    value = value.replace(',', '')
-            
-            # Intentar convertir a float y luego de nuevo a string para asegurar formato consistente
-            try:
-                return str(float(value))
-            except ValueError:
-                return value
-        return value
-    except Exception as e:
-        # st.warning(f"Error al formatear número '{value}': {e}")
-        return value
-
-# Función para formatear números específicamente para Excel
-def format_number_for_excel(value):
-    try:
-        if pd.isna(value):
-            return ""
-            
-        # Si es un número o puede convertirse a uno
+# Directorio del historial de corridas (ver history): los resultados guardados se pueden
+# comparar entre sí. Se configura con la variable de entorno UNIFICADOR_HISTORIAL (p. ej.
+# un directorio por usuario o por equipo); cada corrida guardada desde la aplicación lleva
+# fecha, hora y el hash de sus archivos, así dos unificaciones no se reemplazan entre sí.
+HISTORY_DIR = os.environ.get("UNIFICADOR_HISTORIAL", "historial")
+
+# Caché de archivos leídos, compartida entre reruns y sesiones
+UPLOAD_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+@st.cache_resource
+def get_upload_cache():
+    return DataFrameCache(max_bytes=UPLOAD_CACHE_MAX_BYTES)
+
+# Hash del contenido de un archivo subido (se calcula una sola vez por archivo)
+def get_file_hash(file):
+    hashes = st.session_state.setdefault("upload_hashes", {})
+    file_id = getattr(file, "file_id", None)
+    if file_id is None or file_id not in hashes:
+        file_hash = content_hash(file.getvalue())
+        if file_id is None:
+            return file_hash
+        hashes[file_id] = file_hash
+    return hashes[file_id]
+
+# Texto con el formato detectado al leer un archivo (ver ingest.read_csv)
+def format_caption(ingest, name=None):
+    delimiter = {"\t": "tabulación"}.get(ingest["delimiter"], f"'{ingest['delimiter']}'")
+    prefix = f"{name}: formato" if name else "Formato"
+    return (
+        f"{prefix} detectado: codificación {ingest['encoding']}, separador {delimiter}, "
+        f"decimal '{ingest['decimal']}' (lector {ingest['engine']})"
+    )
+
+# Función para leer y mostrar datos. files son uno o varios archivos del mismo reporte,
+# que se leen en paralelo y se combinan; con tag=True cada fila queda marcada con su
+# archivo de origen. report ("netsuite" o "salesforce") elige el esquema con los tipos
+# de sus columnas. En la caché se guarda solo el reporte combinado, no cada archivo.
+def read_and_display_data(files, title, report, tag=False):
+    if files:
         try:
-            # Primero limpiar el valor usando la función anterior
-            cleaned_value = format_number(value)
-            # Convertir a número
-            num_value = float(cleaned_value)
-            
-            # Formatear el número con el formato español (coma como decimal)
-            # Y asegurar que tenga comillas para que Excel no lo convierta
-            if num_value == int(num_value):
-                # Es un entero
-                formatted = f'"{int(num_value)}"'
+            cache = get_upload_cache()
+            cache_key = (report, tuple(get_file_hash(file) for file in files), tag)
+            df = cache.get(cache_key)
+            label = title if len(files) == 1 else f"{title} ({len(files)} archivos)"
+            if df is None:
+                df = load_reports([file.getvalue() for file in files], report, [file.name for file in files], tag)
+                cache.put(cache_key, df)
+                st.caption(f"📥 {label}: leído y guardado en caché")
             else:
-                # Es un decimal - usar 2 decimales y coma como separador
-                formatted = f'"{str(num_value).replace(".", ",")}"'
-                
-            return formatted
-        except:
-            # Si no se puede convertir a número, devolver como string con comillas
-            return f'"{str(value)}"'
-    except Exception as e:
-        # Si hay cualquier error, devolver el valor original
-        return value
-
-# Función para leer y mostrar datos
-def read_and_display_data(file, title):
-    if file is not None:
-        try:
-            df = pd.read_csv(file)
+                st.caption(f"♻️ {label}: datos reutilizados de la caché")
+            if "files" in df.attrs:
+                for source in df.attrs["files"]:
+                    if source["ingest"]:
+                        st.caption(f"{format_caption(source['ingest'], source['name'])}, {source['rows']:,} filas")
+            elif df.attrs.get("ingest"):
+                st.caption(format_caption(df.attrs["ingest"]))
+            # La vista previa usa las primeras filas ya leídas, sin volver a leer el archivo
             st.write(f"**Vista previa de {title}:**")
             st.dataframe(df.head())
             return df
@@ -182,57 +105,470 @@ def read_and_display_data(file, title):
             return None
     return None
 
-# Función para generar link de descarga
-def get_csv_download_link(df, filename="datos_unificados.csv"):
-    # Reemplazar puntos por comas en las columnas numéricas antes de descargar
-    df_download = df.copy()
-    numeric_columns = ["Total", "Total USD", "Quantity", "FX Rate", "FX Rate Item", "Consolidated FX Rate"]
+# Vista previa del modo por partes: se leen solo las primeras filas de cada reporte (con
+# las columnas de todos sus archivos), sin cargarlo completo en memoria
+def preview_and_display_data(files, title, report):
+    if files:
+        try:
+            df = preview_report([file.getvalue() for file in files], report, [file.name for file in files])
+            for source in df.attrs["files"]:
+                st.caption(format_caption(source["ingest"], source["name"]))
+            st.write(f"**Vista previa de {title}:**")
+            st.dataframe(df)
+            return df
+        except Exception as e:
+            st.error(f"Error al cargar el archivo {title}: {e}")
+            return None
+    return None
+
+# Función para unificar los datos de Netsuite y Salesforce.
+# Devuelve (resultado, estado incremental): el resultado es un diccionario con todo lo
+# necesario para mostrarlo, de modo que pueda guardarse en la sesión y volver a mostrarse
+# sin recalcular. Con incremental=True se reutilizan las filas sin cambios de state (la
+# última unificación de la sesión). Cada etapa queda medida en result["profile"]; con
+# capture_cprofile también se guarda el perfil de cProfile de la unificación
+# (result["cprofile"]). reconcile_policy indica qué hacer con las filas de Salesforce que
+# ya están en Netsuite y fx_rates (opcional) son los tipos de cambio para las filas de
+# Salesforce. Con history_dir el resultado se guarda en ese historial como la corrida
+# history_run (por defecto, la de hoy). Se ejecuta como trabajo en segundo plano
+# (progress informa el avance), así que no usa st.session_state.
+def unify_data(netsuite_df, salesforce_df, mapping, incremental=False, capture_cprofile=False,
+               reconcile_policy="ninguna", state=None, history_dir=None, fx_rates=None, history_run=None,
+               progress=None):
+    profiler = StageProfiler(progress=progress)
+    
+    def run():
+        if incremental:
+            return unify_incremental(netsuite_df, salesforce_df, mapping, state, profiler, reconcile_policy, fx_rates)
+        result = unify(
+            netsuite_df, salesforce_df, mapping, profiler=profiler, reconcile_policy=reconcile_policy, fx_rates=fx_rates
+        )
+        return result, None
+    
+    if capture_cprofile:
+        (result, state), cprofile_stats = profile_call(run)
+    else:
+        (result, state), cprofile_stats = run(), None
+    result = attach_excel_file(result, profiler)
+    result["history_run"] = None
+    if history_dir is not None:
+        try:
+            result["history_run"] = save_run(result["combined_df"], history_dir, len(netsuite_df), history_run)
+        except Exception as e:
+            result["warnings"].append(f"No se pudo guardar el resultado en el historial: {e}")
+    result["profile"] = profiler
+    result["cprofile"] = cprofile_stats
+    # El CSV se serializa recién al descargarlo
+    result["csv_files"] = {}
+    result["mapping_json"] = pd.Series(mapping).to_json()
+    return result, state
+
+# Unificar por partes (ver streaming.stream_unify), con un presupuesto de memoria de
+# memory_mb MB: para reportes que no entran en memoria. El XLSX y el CSV se escriben en un
+# directorio temporal que se borra cuando el resultado sale de la sesión. netsuite_files y
+# salesforce_files son listas de (nombre, contenido). Devuelve (resultado, None), como
+# unify_data sin estado incremental.
+def stream_unify_data(netsuite_files, salesforce_files, mapping, reconcile_policy, memory_mb, history_dir=None,
+                      fx_rates=None, history_run=None, progress=None):
+    output_dir = tempfile.mkdtemp(prefix="unificador_")
+    try:
+        result = stream_unify(
+            "datos_unificados", [data for _, data in netsuite_files], [data for _, data in salesforce_files],
+            output_dir, mapping, ("xlsx", "csv"), reconcile_policy, memory_mb=memory_mb,
+            netsuite_names=[name for name, _ in netsuite_files],
+            salesforce_names=[name for name, _ in salesforce_files], history_dir=history_dir, run=history_run,
+            progress=progress, fx_rates=fx_rates,
+        )
+    except BaseException:
+        shutil.rmtree(output_dir, ignore_errors=True)
+        raise
+    result["output_dir"] = output_dir
+    result["history_run"] = result["history"]["run"] if result["history"] is not None else None
+    # Solo el resultado (no el reporte de calidad ni las diferencias del historial)
+    result["output_files"] = {
+        Path(path).suffix: path for path in result["outputs"] if Path(path).stem == "datos_unificados"
+    }
+    result["mapping_json"] = pd.Series(mapping).to_json()
+    return result, None
+
+# Cada cuánto se actualiza el progreso de una unificación en curso (segundos)
+JOB_POLL_SECONDS = 0.5
+
+# Mostrar el progreso de la unificación en curso, con un botón para cancelarla. Es un
+# fragmento que se actualiza solo cada JOB_POLL_SECONDS, sin volver a ejecutar la página;
+# cuando el trabajo termina se ejecuta la página completa para mostrar el resultado.
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def render_job_progress(job):
+    if job.done():
+        st.rerun()
+    snapshot = job.progress.snapshot()
+    stage = snapshot["stage"] or "Iniciando"
+    if job.progress.cancelled:
+        text = f"Cancelando... ({stage})"
+    else:
+        text = f"Etapa {snapshot['stage_number']}: {stage} — {job.elapsed():.0f} s"
+    st.progress(snapshot["fraction"], text=text)
+    if st.button("Cancelar unificación", disabled=job.progress.cancelled):
+        job.cancel()
+
+# Guardar en la sesión el resultado de una unificación terminada (o informar el error)
+def collect_job(job_info):
+    job = job_info["job"]
+    if job.status == "done":
+        result, state = job.result
+        if job_info["incremental"]:
+            st.session_state["incremental_state"] = state
+        store_unified_result(job_info["key"], result)
+    elif job.status == "failed":
+        st.error(f"Error al unificar los datos: {job.error}")
+    else:
+        st.warning("Unificación cancelada.")
+
+# Función para mostrar un resultado de unificación (recién calculado o guardado en la sesión)
+def render_unified_result(result):
+    # Resumen de los diagnósticos por categoría; el detalle con ejemplos se descarga aparte
+    diagnostics = result["diagnostics"]
+    with st.expander("Ver detalles de procesamiento"):
+        if len(diagnostics) == 0:
+            st.write("No se registraron eventos durante el procesamiento.")
+        else:
+            st.dataframe(diagnostics.summary(), hide_index=True)
+            st.download_button(
+                label="Descargar detalle de diagnósticos",
+                data=diagnostics.to_json,
+                file_name="diagnosticos.json",
+                mime="application/json"
+            )
     
-    for col in numeric_columns:
-        if col in df_download.columns:
-            df_download[col] = df_download[col].apply(
-                lambda x: format_number_for_excel(x) if pd.notna(x) else x
+    # Perfil de tiempos y memoria de cada etapa (el modo por partes solo mide los tiempos)
+    profiler = result.get("profile")
+    streaming = result.get("streaming")
+    if streaming is not None:
+        stages = ", ".join(f"{stage} {seconds:.2f} s" for stage, seconds in result["timings"].items() if stage != "total")
+        st.caption(
+            f"🧩 Unificación por partes en {result['timings']['total']:.2f} s ({stages}): {result['rows']:,} filas en "
+            f"{streaming['chunks']:,} partes de hasta {streaming['block_bytes'] / 1024 ** 2:.1f} MB de CSV "
+            f"(presupuesto de {streaming['memory_mb']:,} MB)"
+        )
+    else:
+        with st.expander(f"Perfil de la unificación ({profiler.total_seconds():.2f} s)"):
+            st.dataframe(profiler.table(), hide_index=True)
+            st.download_button(
+                label="Descargar perfil (JSON)",
+                data=profiler.to_json,
+                file_name="perfil_unificacion.json",
+                mime="application/json"
             )
+            if result["cprofile"] is not None:
+                st.download_button(
+                    label="Descargar captura de cProfile (.prof)",
+                    data=result["cprofile"],
+                    file_name="unificacion.prof",
+                    mime="application/octet-stream"
+                )
+    
+    incremental = result.get("incremental")
+    if incremental is not None and not incremental["full"]:
+        st.caption(
+            f"♻️ Unificación incremental: {incremental['reprocessed']:,} filas reprocesadas, "
+            f"{incremental['reused']:,} reutilizadas y {incremental['discarded']:,} descartadas"
+        )
+    
+    if result.get("history_run") is not None:
+        st.caption(f"🗂️ Resultado guardado en el historial como la corrida {result['history_run']}")
+    
+    reconciliation = result.get("reconciliation")
+    if reconciliation is not None:
+        detail = ", ".join(f"{estado}: {count:,}" for estado, count in reconciliation["by_estado"].items())
+        st.caption(
+            f"🔗 Conciliación con Netsuite: {reconciliation['matched']:,} filas de Salesforce ya estaban en Netsuite"
+            + (f" ({detail})" if detail else "")
+            + f". Política: {RECONCILE_POLICIES[reconciliation['policy']].lower()}."
+        )
+    
+    fx = result.get("fx")
+    if fx is not None:
+        st.caption(
+            f"💱 Tipos de cambio: {fx['rows']:,} filas de Salesforce completadas"
+            + (f", {fx['missing']:,} sin tipo de cambio (ver detalles de procesamiento)" if fx["missing"] else "")
+        )
+    
+    # Mostrar un resumen de las columnas mapeadas
+    st.subheader("Resumen del mapeo aplicado:")
+    st.markdown("**Columnas mapeadas para la primera fila:**")
+    for mapping_info in result["mappings_applied"]:
+        st.write(f"- {mapping_info}")
+    
+    # Mostrar ejemplos de los valores mapeados
+    if result["examples"]:
+        st.subheader("Ejemplos de valores mapeados (primera fila):")
+        for col, source_value, mapped_value in result["examples"]:
+            st.markdown(f"**{col}**: `{source_value}` → `{mapped_value}`")
+    
+    # Mostrar advertencias importantes sobre columnas mapeadas
+    if result["column_warnings"]:
+        st.warning("Se detectaron problemas en el mapeo:")
+        for warning in result["column_warnings"]:
+            st.write(warning)
+    
+    for warning in result["warnings"]:
+        st.warning(warning)
+    
+    # Mostrar resultado: el de memoria se explora por páginas; del modo por partes solo
+    # quedan en memoria sus primeras filas
+    if streaming is None:
+        st.subheader("Explorar el resultado:")
+        render_explorer(result)
+    else:
+        st.subheader("Vista previa del resultado:")
+        st.dataframe(result["preview"])
+    
+    # Resúmenes precalculados (también van como hojas adicionales del XLSX)
+    summaries = result.get("summaries") or {}
+    if summaries:
+        with st.expander("Ver resúmenes por Estado, mes, cliente, PM y Client Leader"):
+            for tab, (name, table) in zip(st.tabs(list(summaries)), summaries.items()):
+                with tab:
+                    st.dataframe(table, hide_index=True)
+    
+    # Reporte de calidad de todas las filas de los reportes y del resultado
+    quality = result.get("quality")
+    if quality is not None:
+        counts = problem_counts(quality)
+        detail = ", ".join(f"{control}: {rows:,}" for control, rows in counts.items()) or "sin problemas"
+        with st.expander(f"Ver reporte de calidad de datos ({detail})"):
+            st.caption("Vacíos por columna, fechas y montos que no se pudieron interpretar, probabilidades fuera de 0-100, Estados desconocidos y claves (proyecto, cliente y mes) repetidas en un mismo reporte, con algunas filas de ejemplo.")
+            for tab, (name, table) in zip(st.tabs(list(quality)), quality.items()):
+                with tab:
+                    st.dataframe(table, hide_index=True)
+    
+    # Información sobre el formato de descarga
+    st.info("""
+    El archivo CSV de descarga ha sido optimizado para Excel:
+    - Usa punto y coma (;) como separador de columnas
+    - Los valores numéricos usan coma (,) como separador decimal
+    - Los números tienen formato óptimo para evitar conversiones automáticas
+    - No aparecerá la advertencia de conversión a notación científica
+    
+    Al abrir el archivo en Excel, simplemente haz clic en "Aceptar" si aparece algún diálogo.
+    """)
     
-    # Usar punto y coma como separador para evitar conflictos con comas
-    # Asegurar que los números no se conviertan a notación científica
-    csv = df_download.to_csv(index=False, sep=';', float_format='%.10f')
-    
-    b64 = base64.b64encode(csv.encode()).decode()
-    href = f'<a href="data:file/csv;base64,{b64}" download="{filename}">Descargar CSV unificado</a>'
-    return href
-
-# Mapeo predeterminado de columnas Salesforce a Netsuite
-default_mapping = {
-    "Probability (%)": "Quantity",
-    "Client Leader": "_Client Leader AUX",  # Nombre exacto de la columna
-    "Project Manager": "_PM",              # Nombre exacto de la columna
-    "Amount Currency": "Proj. Currency",
-    "Amount (converted)": "Total",
-    "Account Name": "Customer Parent",
-    "Opportunity Name": "Project(PLAN)",
-    "Month": "Date"
-}
+    # En el modo por partes el XLSX y el CSV ya están escritos en disco
+    if streaming is not None:
+        output_files = result["output_files"]
+        if ".xlsx" in output_files:
+            st.download_button(
+                label="⬇️ Descargar como Excel (.xlsx)",
+                data=Path(output_files[".xlsx"]).read_bytes,
+                file_name="datos_unificados.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+        st.download_button(
+            label="⬇️ Descargar como CSV",
+            data=Path(output_files[".csv"]).read_bytes,
+            file_name="datos_unificados.csv",
+            mime="text/csv"
+        )
+    
+    # Botón para descargar como Excel
+    elif result["excel_file"] is not None:
+        excel_file = result["excel_file"]
+        st.download_button(
+            label="⬇️ Descargar como Excel (.xlsx)",
+            data=lambda: read_file(excel_file),
+            file_name="datos_unificados.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+    
+    # Descarga CSV (se genera por bloques recién al hacer clic, una vez por compresión)
+    if streaming is None:
+        st.markdown("<h4>O descarga como CSV:</h4>", unsafe_allow_html=True)
+        compression_labels = {"Sin compresión": None, "gzip": "gzip", "zip": "zip"}
+        compression = compression_labels[st.radio(
+            "Compresión del CSV", list(compression_labels), horizontal=True
+        )]
+        extension, mime = CSV_COMPRESSIONS[compression]
+        
+        def get_csv_data():
+            if compression not in result["csv_files"]:
+                result["csv_files"][compression] = build_csv_file(result["combined_df"], compression)
+            return read_file(result["csv_files"][compression])
+        
+        st.download_button(
+            label="⬇️ Descargar como CSV",
+            data=get_csv_data,
+            file_name=f"datos_unificados{extension}",
+            mime=mime
+        )
+    
+    # Resúmenes como CSV separados, en un ZIP (se genera al hacer clic)
+    if summaries:
+        def get_summaries_data():
+            if "summaries_zip" not in result:
+                result["summaries_zip"] = build_summaries_zip(summaries)
+            return read_file(result["summaries_zip"])
+        
+        st.download_button(
+            label="⬇️ Descargar resúmenes (CSV en .zip)",
+            data=get_summaries_data,
+            file_name="resumenes_unificados.zip",
+            mime="application/zip"
+        )
+    
+    # Reporte de calidad como XLSX aparte, una hoja por tabla (se genera al hacer clic)
+    if quality is not None:
+        def get_quality_data():
+            if "quality_file" not in result:
+                result["quality_file"] = build_tables_excel_file(quality)
+            return read_file(result["quality_file"])
+        
+        st.download_button(
+            label="⬇️ Descargar reporte de calidad (.xlsx)",
+            data=get_quality_data,
+            file_name="datos_unificados_calidad.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+    
+    # Guardar mapeo para futuros usos
+    st.download_button(
+        label="Guardar configuración de mapeo",
+        data=result["mapping_json"],
+        file_name="mapeo_columnas.json",
+        mime="application/json"
+    )
+
+# Nombres de las columnas que filtra el explorador del resultado
+EXPLORER_LABELS = {"Estado": "Estado", "Customer Parent": "Cliente (Customer Parent)", "_PM": "PM"}
+
+# Filas por página que se pueden elegir en el explorador
+EXPLORER_PAGE_SIZES = [25, PAGE_SIZE, 100, 250]
+
+# Explorador del resultado en memoria: filtra por Estado, cliente, PM y rango de fechas y
+# ordena por cualquier columna sobre el índice del resultado (ver explorer.ResultIndex),
+# que se arma una sola vez y queda guardado en el resultado. Al navegador solo va la
+# página elegida. Es un fragmento: sus controles recalculan solo el explorador y no toda
+# la página. Las claves de los controles llevan el id del índice, así un resultado nuevo
+# empieza sin filtros.
+@st.fragment
+def render_explorer(result):
+    index = result.get("explorer")
+    if index is None:
+        index = result["explorer"] = ResultIndex(result["combined_df"])
+    prefix = f"explorer_{id(index)}"
+    
+    filters = {}
+    date_range = index.date_range()
+    filter_count = len(index.options) + (date_range is not None)
+    columns = st.columns(filter_count) if filter_count else []
+    for column, (col, options) in zip(columns, index.options.items()):
+        with column:
+            filters[col] = st.multiselect(EXPLORER_LABELS[col], options, key=f"{prefix}_{col}")
+    start = end = None
+    if date_range is not None:
+        with columns[-1]:
+            dates = st.date_input(
+                "Fechas (Date)", value=date_range, min_value=date_range[0], max_value=date_range[1],
+                format="DD/MM/YYYY", key=f"{prefix}_dates",
+                help="Con un rango de fechas quedan fuera las filas sin fecha"
+            )
+        # Mientras se elige el rango llega solo la primera fecha
+        if len(dates) == 2 and tuple(dates) != date_range:
+            start, end = dates
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        sort_by = st.selectbox(
+            "Ordenar por", [None] + list(result["combined_df"].columns),
+            format_func=lambda col: "Orden del resultado" if col is None else col, key=f"{prefix}_sort"
+        )
+    with col2:
+        descending = st.radio("Sentido", ["Ascendente", "Descendente"], horizontal=True, key=f"{prefix}_order") == "Descendente"
+    with col3:
+        page_size = st.selectbox("Filas por página", EXPLORER_PAGE_SIZES, index=1, key=f"{prefix}_size")
+    
+    mask = index.filter(filters, start, end)
+    pages = max(1, math.ceil(int(mask.sum()) / page_size))
+    # Si los filtros dejan menos páginas, se vuelve a la última
+    if st.session_state.get(f"{prefix}_page", 1) > pages:
+        st.session_state[f"{prefix}_page"] = pages
+    with col4:
+        number = st.number_input("Página", min_value=1, max_value=pages, step=1, key=f"{prefix}_page")
+    
+    page, total = index.page(mask, sort_by, not descending, number - 1, page_size)
+    st.caption(f"{total:,} de {len(index):,} filas cumplen los filtros — página {number:,} de {pages:,}")
+    st.dataframe(page)
+
+# Resultados de unificación guardados en la sesión, por (archivos, mapeo)
+UNIFIED_RESULTS_MAX = 3
+
+def get_unify_key(netsuite_files, salesforce_files, mapping, reconcile_policy, stream_mode=False, save_history=False,
+                  fx_rates=None):
+    canonical_mapping = json.dumps(mapping, sort_keys=True, ensure_ascii=False)
+    return (
+        tuple(get_file_hash(file) for file in netsuite_files),
+        tuple(get_file_hash(file) for file in salesforce_files),
+        canonical_mapping,
+        reconcile_policy,
+        stream_mode,
+        save_history,
+        fx_rates.key if fx_rates is not None else None,
+    )
+
+def store_unified_result(key, result):
+    results = st.session_state.setdefault("unified_results", OrderedDict())
+    results[key] = result
+    results.move_to_end(key)
+    while len(results) > UNIFIED_RESULTS_MAX:
+        _, evicted = results.popitem(last=False)
+        # Los archivos del modo por partes se borran junto con su resultado
+        if "output_dir" in evicted:
+            shutil.rmtree(evicted["output_dir"], ignore_errors=True)
 
 # Cargar archivos CSV
 st.header("1. Cargar archivos CSV")
 col1, col2 = st.columns(2)
 
 with col1:
-    st.subheader("Archivo de Netsuite")
-    netsuite_file = st.file_uploader("Cargar CSV de Netsuite", type=["csv"])
+    st.subheader("Archivos de Netsuite")
+    netsuite_files = st.file_uploader(
+        "Cargar CSV de Netsuite", type=["csv"], accept_multiple_files=True,
+        help="Se pueden cargar varios archivos (por ejemplo, uno por subsidiaria o trimestre); se combinan en un único reporte."
+    )
 
 with col2:
-    st.subheader("Archivo de Salesforce")
-    salesforce_file = st.file_uploader("Cargar CSV de Salesforce", type=["csv"])
+    st.subheader("Archivos de Salesforce")
+    salesforce_files = st.file_uploader(
+        "Cargar CSV de Salesforce", type=["csv"], accept_multiple_files=True,
+        help="Se pueden cargar varios archivos; se combinan en un único reporte."
+    )
 
 # Procesar archivos si se han cargado
-if netsuite_file and salesforce_file:
+if netsuite_files and salesforce_files:
     st.header("2. Vista previa de los datos")
     
-    # Leer y mostrar datos
-    netsuite_df = read_and_display_data(netsuite_file, "Netsuite")
-    salesforce_df = read_and_display_data(salesforce_file, "Salesforce")
+    # Modo por partes: para reportes que no entran en memoria, se muestran solo sus
+    # primeras filas y la unificación los lee y escribe por partes
+    stream_mode = st.checkbox(
+        "Procesar por partes (memoria limitada)",
+        value=False,
+        help="Para reportes que no entran en memoria: se leen, unifican y escriben por partes sin superar el presupuesto de memoria. No admite la unificación incremental."
+    )
+    memory_mb = None
+    if stream_mode:
+        memory_mb = st.number_input(
+            "Presupuesto de memoria (MB)", min_value=MIN_MEMORY_MB, value=DEFAULT_MEMORY_MB, step=64,
+            help="Memoria aproximada que puede usar la unificación. Con menos memoria se procesan partes más chicas."
+        )
+    
+    # Leer y mostrar datos. Con más de un archivo en cualquiera de los reportes, cada fila
+    # del resultado indica su archivo de origen.
+    tag_sources = len(netsuite_files) > 1 or len(salesforce_files) > 1
+    if stream_mode:
+        netsuite_df = preview_and_display_data(netsuite_files, "Netsuite", "netsuite")
+        salesforce_df = preview_and_display_data(salesforce_files, "Salesforce", "salesforce")
+    else:
+        netsuite_df = read_and_display_data(netsuite_files, "Netsuite", "netsuite", tag_sources)
+        salesforce_df = read_and_display_data(salesforce_files, "Salesforce", "salesforce", tag_sources)
     
     # Verificar y mostrar problemas con las columnas
     if netsuite_df is not None:
@@ -250,38 +586,57 @@ if netsuite_file and salesforce_file:
         st.write("El mapeo predeterminado de columnas ya está configurado según tus especificaciones:")
         
         # Crear mapeo entre las columnas de Salesforce y Netsuite
-        salesforce_columns = salesforce_df.columns.tolist()
-        mapping = {col: "No mapear" for col in salesforce_columns}
+        mapping = build_mapping(salesforce_df.columns)
+        salesforce_columns = list(mapping)
         
-        # Aplicar mapeo predeterminado
-        for sf_col, ns_col in default_mapping.items():
-            if sf_col in mapping:
-                mapping[sf_col] = ns_col
-            # También revisar si hay alguna columna que contenga el nombre (para casos como "Amount (converted)")
+        # Obtener las columnas de Netsuite y agregar "Estado" si no existe
+        netsuite_columns_list = [col for col in netsuite_df.columns if col != SOURCE_COLUMN]
+        if "Estado" not in netsuite_columns_list:
+            netsuite_columns_list.append("Estado")
+        options = ["No mapear"] + netsuite_columns_list
+        
+        # El mapeo elegido vive en session_state (una clave por columna de Salesforce); se
+        # inicializa con el mapeo automático y solo se reemplaza al aplicar un mapeo guardado
+        for sf_col in salesforce_columns:
+            if st.session_state.get(f"map_{sf_col}") not in options:
+                st.session_state[f"map_{sf_col}"] = mapping[sf_col] if mapping[sf_col] in options else "No mapear"
+        
+        saved_mapping_file = st.file_uploader(
+            "Cargar un mapeo guardado (opcional)",
+            type=["json"],
+            help="El archivo mapeo_columnas.json que se descarga con 'Guardar configuración de mapeo'. Las columnas se buscan por nombre aunque cambien mayúsculas, acentos o signos."
+        )
+        if saved_mapping_file is not None and st.session_state.get("saved_mapping_id") != saved_mapping_file.file_id:
+            try:
+                saved, ignored = load_saved_mapping(saved_mapping_file.getvalue(), mapping, netsuite_columns_list)
+            except ValueError as e:
+                st.error(f"No se pudo leer el mapeo guardado: {e}")
             else:
-                for col in salesforce_columns:
-                    if sf_col in col:
-                        mapping[col] = ns_col
-                        break
+                for sf_col in salesforce_columns:
+                    st.session_state[f"map_{sf_col}"] = saved[sf_col]
+                st.session_state["saved_mapping_id"] = saved_mapping_file.file_id
+                st.session_state["saved_mapping_ignored"] = ignored
+        if saved_mapping_file is not None and st.session_state.get("saved_mapping_id") == saved_mapping_file.file_id:
+            st.caption(f"Mapeo guardado aplicado: {saved_mapping_file.name}")
+            ignored = st.session_state.get("saved_mapping_ignored", [])
+            if ignored:
+                st.caption("Columnas del mapeo guardado que no se encontraron o no tienen destino: " + ", ".join(ignored))
         
         col1, col2 = st.columns(2)
         
-        # Obtener las columnas de Netsuite y agregar "Estado" si no existe
-        netsuite_columns_list = netsuite_df.columns.tolist()
-        if "Estado" not in netsuite_columns_list:
-            netsuite_columns_list.append("Estado")
-            
+        # Todas las selecciones van en un formulario: la página se recalcula una sola vez al
+        # aplicar el mapeo y no con cada cambio
         with col1:
             st.subheader("Columnas de Salesforce")
-            for sf_col in salesforce_columns:
-                options = ["No mapear"] + netsuite_columns_list
-                default_index = options.index(mapping[sf_col]) if mapping[sf_col] in options else 0
-                mapping[sf_col] = st.selectbox(
-                    f"Mapear '{sf_col}' a:",
-                    options=options,
-                    index=default_index,
-                    key=f"map_{sf_col}"
-                )
+            with st.form("mapping_form"):
+                for sf_col in salesforce_columns:
+                    st.selectbox(
+                        f"Mapear '{sf_col}' a:",
+                        options=options,
+                        key=f"map_{sf_col}"
+                    )
+                st.form_submit_button("Aplicar mapeo")
+        mapping = {sf_col: st.session_state[f"map_{sf_col}"] for sf_col in salesforce_columns}
         
         with col2:
             st.subheader("Vista previa del mapeo")
@@ -296,375 +651,152 @@ if netsuite_file and salesforce_file:
         
         st.info("Al hacer clic en 'Unificar datos', la información del CSV de Salesforce se incorporará al formato de Netsuite, generando un único archivo CSV con toda la información integrada.")
         
-        if st.button("Unificar datos"):
-            with st.spinner("Procesando e incorporando datos de Salesforce a Netsuite..."):
-                try:
-                    # Filtrar los mensajes de depuración para que no sobrecarguen la interfaz
-                    with st.expander("Ver detalles de procesamiento"):
-                        st.write("Datos procesados correctamente. Expande para ver los detalles de mapeo.")
-                    
-                    # Crear una copia de la función de información para capturar mensajes
-                    original_info = st.info
-                    original_warning = st.warning
-                    
-                    # Redefine temporalmente las funciones para capturar mensajes
-                    debug_messages = []
-                    def capture_info(message):
-                        debug_messages.append(f"ℹ️ {message}")
-                    
-                    def capture_warning(message):
-                        debug_messages.append(f"⚠️ {message}")
-                    
-                    # Reemplazar las funciones temporalmente
-                    st.info = capture_info
-                    st.warning = capture_warning
-                    
-                    # Mostrar mensaje de información
-                    st.info("Procesando los datos... Por favor espera.")
-                    
-                    # Verificar si hay columnas duplicadas en Netsuite
-                    if len(netsuite_df.columns) != len(set(netsuite_df.columns)):
-                        st.warning("Se detectaron columnas duplicadas en el archivo de Netsuite. Se renombrarán automáticamente para evitar conflictos.")
-                    
-                    # Preparar DataFrame de Netsuite para recibir datos de Salesforce
-                    result_df = netsuite_df.copy()
-                    
-                    # Añadir columna "Estado" a Netsuite con valor "CONFIRMADO"
-                    if "Estado" not in result_df.columns:
-                        result_df["Estado"] = "CONFIRMADO"
-                    
-                    # Unificar formato de fechas en el DataFrame de Netsuite
-                    if "Date" in result_df.columns:
-                        result_df["Date"] = result_df["Date"].apply(lambda x: convert_date_format(x, "netsuite"))
-                    
-                    # Crear lista para almacenar las filas de Salesforce transformadas
-                    salesforce_rows = []
-                    
-                    # Añadir variables para depuración del mapeo
-                    mappings_applied = []
-                    debug_rows = []
-                    
-                    # Transferir datos de Salesforce según el mapeo
-                    for idx, row in salesforce_df.iterrows():
-                        # Crear diccionario para la nueva fila con todas las columnas de netsuite_df y "Estado"
-                        new_row = {col: None for col in result_df.columns}
-                        
-                        row_mappings = []
-                        
-                        for sf_col, ns_col in mapping.items():
-                            if ns_col != "No mapear" and ns_col in new_row:
-                                row_mappings.append(f"{sf_col} → {ns_col}")
-                                
-                                # Procesamiento especial para Client Leader (cambiar formato de nombre)
-                                if (sf_col == "Client Leader" or "Client Leader" in sf_col) and ("_Client Leader AUX" in ns_col or "_Client Leader" in ns_col):
-                                    # Cambiar formato "Nombre Apellido" a "Apellido, Nombre"
-                                    if pd.notna(row[sf_col]) and str(row[sf_col]).strip() != "":
-                                        try:
-                                            name_str = str(row[sf_col]).strip()
-                                            parts = name_str.split(maxsplit=1)
-                                            if len(parts) > 1:
-                                                formatted_name = f"{parts[1]}, {parts[0]}"
-                                                st.info(f"Mapeando Client Leader: '{name_str}' a '{formatted_name}' en columna '{ns_col}'")
-                                                new_row[ns_col] = formatted_name
-                                            else:
-                                                new_row[ns_col] = name_str
-                                        except Exception as e:
-                                            st.warning(f"Error al formatear el nombre '{row[sf_col]}': {e}")
-                                            new_row[ns_col] = row[sf_col]
-                                # Procesamiento especial para Project Manager a PM
-                                elif (sf_col == "Project Manager" or "Project Manager" in sf_col) and ("_PM" in ns_col or ns_col.endswith("PM")):
-                                    if pd.notna(row[sf_col]):
-                                        # Asegurarse de que el valor se transfiera correctamente
-                                        try:
-                                            pm_value = str(row[sf_col]).strip()
-                                            st.info(f"Mapeando Project Manager: '{pm_value}' a '{ns_col}'")
-                                            new_row[ns_col] = pm_value
-                                        except Exception as e:
-                                            st.warning(f"Error al procesar Project Manager '{row[sf_col]}': {e}")
-                                            new_row[ns_col] = str(row[sf_col])
-                                # Procesamiento especial para Month a Date (Mmm.YYYY a DD/MM/YYYY)
-                                elif (sf_col == "Month" or "Month" in sf_col) and "Date" in ns_col:
-                                    if pd.notna(row[sf_col]) and str(row[sf_col]) != "":
-                                        try:
-                                            # Extraer mes y año del formato Mmm.YYYY (por ejemplo, Feb.2025)
-                                            month_str = str(row[sf_col])
-                                            st.info(f"Procesando fecha: '{month_str}'")
-                                            
-                                            # Diferentes patrones posibles para extraer mes y año
-                                            patterns = [
-                                                r'([A-Za-z]+)\.(\d{4})',  # Mmm.YYYY
-                                                r'([A-Za-z]+)(\d{4})',    # MmmYYYY
-                                                r'([A-Za-z]+)[^0-9]+(\d{4})',  # Cualquier separador
-                                                r'(\d{1,2})[/\-](\d{4})'  # MM/YYYY o MM-YYYY
-                                            ]
-                                            
-                                            month_num = None
-                                            year_num = None
-                                            
-                                            # Probar cada patrón
-                                            for pattern in patterns:
-                                                match = re.match(pattern, month_str)
-                                                if match:
-                                                    part1, part2 = match.groups()
-                                                    
-                                                    # Ver si la primera parte es un mes en texto
-                                                    month_dict = {
-                                                        'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
-                                                        'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12,
-                                                        'Ene': 1, 'Feb': 2, 'Mar': 3, 'Abr': 4, 'May': 5, 'Jun': 6,
-                                                        'Jul': 7, 'Ago': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dic': 12
-                                                    }
-                                                    
-                                                    # Intentar extraer el mes y año
-                                                    if part1 in month_dict:
-                                                        month_num = month_dict[part1]
-                                                        year_num = int(part2)
-                                                    elif part1.isdigit() and int(part1) >= 1 and int(part1) <= 12:
-                                                        month_num = int(part1)
-                                                        year_num = int(part2)
-                                                    
-                                                    break
-                                            
-                                            # Si no se pudo extraer con los patrones, intentar buscar partes numéricas
-                                            if month_num is None or year_num is None:
-                                                # Buscar 4 dígitos consecutivos para el año
-                                                year_match = re.search(r'(\d{4})', month_str)
-                                                if year_match:
-                                                    year_num = int(year_match.group(1))
-                                                    
-                                                    # Buscar 1-2 dígitos para el mes
-                                                    month_match = re.search(r'(?<!\d)([1-9]|1[0-2])(?!\d)', month_str)
-                                                    if month_match:
-                                                        month_num = int(month_match.group(1))
-                                            
-                                            # Si se encontró mes y año, formatear la fecha
-                                            if month_num is not None and year_num is not None:
-                                                # Obtener último día del mes
-                                                last_day = calendar.monthrange(year_num, month_num)[1]
-                                                
-                                                # Formatear como DD/MM/YYYY (formato universal para ordenar)
-                                                formatted_date = f"{last_day:02d}/{month_num:02d}/{year_num}"
-                                                st.info(f"Fecha convertida: '{month_str}' → '{formatted_date}'")
-                                                new_row[ns_col] = formatted_date
-                                            else:
-                                                st.warning(f"No se pudo extraer mes y año de '{month_str}'")
-                                                new_row[ns_col] = month_str
-                                        except Exception as e:
-                                            st.warning(f"Error al convertir la fecha '{row[sf_col]}': {e}")
-                                            new_row[ns_col] = row[sf_col]
-                                # Procesamiento especial para Amount (converted) a Total
-                                elif ("Amount" in sf_col and "converted" in sf_col) and ("Total" in ns_col):
-                                    if pd.notna(row[sf_col]):
-                                        try:
-                                            # Intentar convertir a número y limpiar formato
-                                            value_str = str(row[sf_col])
-                                            value_clean = value_str.replace(',', '').replace('$', '').strip()
-                                            new_row[ns_col] = float(value_clean) if value_clean else None
-                                        except Exception as e:
-                                            st.warning(f"Error al convertir el monto '{row[sf_col]}': {e}")
-                                            new_row[ns_col] = row[sf_col]
-                                else:
-                                    # Transferir el valor de la columna de Salesforce a Netsuite
-                                    new_row[ns_col] = row[sf_col]
-                        
-                        # Calcular TOTAL USD = TOTAL * (Probability / 100)
-                        if "Total" in new_row and new_row["Total"] is not None and "Quantity" in new_row and new_row["Quantity"] is not None:
-                            try:
-                                # Asegurar que ambos valores sean numéricos
-                                total_value = new_row["Total"]
-                                qty_value = new_row["Quantity"]
-                                
-                                # Limpiar y convertir valores si son strings
-                                if isinstance(total_value, str):
-                                    total_value = total_value.replace(',', '').replace('$', '').strip()
-                                    total_value = float(total_value) if total_value else 0
-                                
-                                if isinstance(qty_value, str):
-                                    qty_value = qty_value.replace('%', '').replace(',', '').strip()
-                                    qty_value = float(qty_value) if qty_value else 0
-                                
-                                # Realizar el cálculo
-                                if isinstance(total_value, (int, float)) and isinstance(qty_value, (int, float)):
-                                    new_row["Total USD"] = float(total_value) * (float(qty_value) / 100)
-                                    
-                                    # Determinar el valor de "Estado" basado en Probability (Quantity)
-                                    if qty_value == 100:
-                                        new_row["Estado"] = "CONFIRMADO"
-                                    elif qty_value in [50, 70]:
-                                        new_row["Estado"] = "PIPELINE"
-                                    else:
-                                        new_row["Estado"] = "NO INCLUIR"
-                            except Exception as e:
-                                st.warning(f"No se pudo calcular TOTAL USD: {e}")
-                                new_row["Total USD"] = None
-                                new_row["Estado"] = "NO INCLUIR"  # Valor por defecto si hay un error
-                        else:
-                            new_row["Estado"] = "NO INCLUIR"  # Si no hay datos para el cálculo
-                        
-                        # Agregar la fila a la lista y la información de depuración
-                        salesforce_rows.append(new_row)
-                        mappings_applied.append(row_mappings)
-                        debug_rows.append(dict(row))
-                    
-                    # Restaurar las funciones originales
-                    st.info = original_info
-                    st.warning = original_warning
-                    
-                    # Mostrar los mensajes de depuración capturados en el expander
-                    with st.expander("Ver detalles de procesamiento"):
-                        for msg in debug_messages:
-                            st.write(msg)
-                    
-                    # Mostrar un resumen de las columnas mapeadas
-                    st.subheader("Resumen del mapeo aplicado:")
-                    st.markdown("**Columnas mapeadas para la primera fila:**")
-                    if mappings_applied:
-                        for mapping_info in mappings_applied[0]:
-                            st.write(f"- {mapping_info}")
-                    
-                    # Mostrar ejemplos de los valores mapeados
-                    if debug_rows and salesforce_rows:
-                        st.subheader("Ejemplos de valores mapeados (primera fila):")
-                        important_cols = ["_PM", "_Client Leader AUX", "Date", "Total", "Total USD", "Estado"]
-                        for col in important_cols:
-                            if col in salesforce_rows[0]:
-                                source_col = next((sf for sf, ns in mapping.items() if ns == col), "Desconocido")
-                                source_value = debug_rows[0].get(source_col, "N/A") if source_col != "Desconocido" else "N/A"
-                                mapped_value = salesforce_rows[0].get(col, "No mapeado")
-                                st.markdown(f"**{col}**: `{source_value}` → `{mapped_value}`")
-                    
-                    # Verificar y mostrar advertencias importantes sobre columnas mapeadas
-                    column_warnings = []
-                    important_columns = ["_PM", "_Client Leader AUX", "Date", "Total", "Quantity"]
-                    
-                    # Comprobar si los datos de Salesforce se mapearon correctamente
-                    if salesforce_rows:
-                        mapped_columns = set(salesforce_rows[0].keys())
-                        for col in important_columns:
-                            if col in mapped_columns and salesforce_rows[0][col] is None:
-                                column_warnings.append(f"⚠️ La columna '{col}' no parece tener datos mapeados correctamente.")
-                    
-                    if column_warnings:
-                        st.warning("Se detectaron problemas en el mapeo:")
-                        for warning in column_warnings:
-                            st.write(warning)
-                    
-                    # Crear DataFrame con las filas de Salesforce
-                    if salesforce_rows:
-                        # Convertir la lista de filas de Salesforce a DataFrame
-                        temp_salesforce = pd.DataFrame(salesforce_rows)
-                        
-                        # Combinar los DataFrames de manera segura, asegurando que tengan las mismas columnas
-                        combined_df = pd.concat([result_df, temp_salesforce], axis=0, ignore_index=True)
-                        
-                        # Reemplazar 'nan' string con valores nulos reales
-                        combined_df = combined_df.replace('nan', np.nan)
-                        combined_df = combined_df.replace('None', np.nan)
-                        
-                        # Formatear valores numéricos (eliminar separadores de miles y formatear decimales)
-                        numeric_columns = ["Total", "Total USD", "Quantity", "FX Rate", "FX Rate Item", "Consolidated FX Rate"]
-                        for col in numeric_columns:
-                            if col in combined_df.columns:
-                                combined_df[col] = combined_df[col].apply(lambda x: format_number(x) if pd.notna(x) else x)
-                        
-                        # Unificar formato de todas las fechas para que sean ordenables
-                        if "Date" in combined_df.columns:
-                            combined_df["Date"] = combined_df["Date"].apply(lambda x: convert_date_format(x))
-                    else:
-                        combined_df = result_df.copy()
-                    
-                    # Mostrar resultado
-                    st.subheader("Vista previa del resultado:")
-                    st.dataframe(combined_df.head(10))
-                    
-                    # Información sobre el formato de descarga
-                    st.info("""
-                    El archivo CSV de descarga ha sido optimizado para Excel:
-                    - Usa punto y coma (;) como separador de columnas
-                    - Los valores numéricos usan coma (,) como separador decimal
-                    - Los números tienen formato óptimo para evitar conversiones automáticas
-                    - No aparecerá la advertencia de conversión a notación científica
-                    
-                    Al abrir el archivo en Excel, simplemente haz clic en "Aceptar" si aparece algún diálogo.
-                    """)
-                    
-                    # Generar opción para descargar en formato Excel directamente
-                    try:
-                        # Crear un archivo Excel en memoria
-                        output = io.BytesIO()
-                        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                            combined_df.to_excel(writer, index=False, sheet_name='Datos Unificados')
-                            # Configurar formato de números para las columnas numéricas
-                            workbook = writer.book
-                            worksheet = writer.sheets['Datos Unificados']
-                            num_format = workbook.add_format({'num_format': '#,##0.00'})
-                            
-                            # Aplicar formato a columnas numéricas
-                            numeric_columns = ["Total", "Total USD", "Quantity", "FX Rate", "FX Rate Item", "Consolidated FX Rate"]
-                            for col in numeric_columns:
-                                if col in combined_df.columns:
-                                    col_idx = combined_df.columns.get_loc(col) + 1  # +1 porque en Excel las columnas comienzan en 1
-                                    worksheet.set_column(col_idx, col_idx, None, num_format)
-                            
-                            # Aplicar formato para la columna Estado (resaltar visualmente)
-                            if "Estado" in combined_df.columns:
-                                estado_col_idx = combined_df.columns.get_loc("Estado") + 1
-                                
-                                # Crear formatos para cada tipo de estado
-                                confirmado_format = workbook.add_format({'bg_color': '#C6EFCE', 'font_color': '#006100'})  # Verde claro
-                                pipeline_format = workbook.add_format({'bg_color': '#FFEB9C', 'font_color': '#9C6500'})    # Amarillo
-                                no_incluir_format = workbook.add_format({'bg_color': '#FFC7CE', 'font_color': '#9C0006'})  # Rojo claro
-                                
-                                # Aplicar formato condicional
-                                worksheet.conditional_format(1, estado_col_idx, len(combined_df)+1, estado_col_idx, {
-                                    'type': 'cell',
-                                    'criteria': 'equal to',
-                                    'value': '"CONFIRMADO"',
-                                    'format': confirmado_format
-                                })
-                                
-                                worksheet.conditional_format(1, estado_col_idx, len(combined_df)+1, estado_col_idx, {
-                                    'type': 'cell',
-                                    'criteria': 'equal to',
-                                    'value': '"PIPELINE"',
-                                    'format': pipeline_format
-                                })
-                                
-                                worksheet.conditional_format(1, estado_col_idx, len(combined_df)+1, estado_col_idx, {
-                                    'type': 'cell',
-                                    'criteria': 'equal to',
-                                    'value': '"NO INCLUIR"',
-                                    'format': no_incluir_format
-                                })
-                        
-                        # Botón para descargar como Excel
-                        excel_data = output.getvalue()
-                        st.download_button(
-                            label="⬇️ Descargar como Excel (.xlsx)",
-                            data=excel_data,
-                            file_name="datos_unificados.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                        )
-                    except Exception as e:
-                        st.warning(f"No se pudo crear el archivo Excel: {e}")
-                    
-                    # Generar link de descarga CSV
-                    st.markdown("<h4>O descarga como CSV:</h4>", unsafe_allow_html=True)
-                    st.markdown(get_csv_download_link(combined_df), unsafe_allow_html=True)
-                    
-                    # Guardar mapeo para futuros usos
-                    mapping_json = pd.Series(mapping).to_json()
-                    st.download_button(
-                        label="Guardar configuración de mapeo",
-                        data=mapping_json,
-                        file_name="mapeo_columnas.json",
-                        mime="application/json"
+        reconcile_policy = st.selectbox(
+            "Oportunidades de Salesforce que ya están en Netsuite",
+            options=list(RECONCILE_POLICIES),
+            index=list(RECONCILE_POLICIES).index("marcar"),
+            format_func=RECONCILE_POLICIES.get,
+            help="Una fila de Salesforce se considera ya registrada si coincide con una de Netsuite en proyecto/oportunidad, cliente y mes (sin distinguir mayúsculas ni acentos). Así no se cuenta dos veces."
+        )
+        
+        # Los tipos de cambio se leen una vez por contenido (ver fx.load_fx_rates)
+        fx_file = st.file_uploader(
+            "Tipos de cambio (opcional)",
+            type=["csv", "parquet"],
+            help="CSV o Parquet con moneda, fecha y tipo de cambio (USD por unidad de la moneda). Completa FX Rate, FX Rate Item y Consolidated FX Rate en las filas de Salesforce con el último tipo de cambio hasta el fin de mes de cada fila, y pasa su Total (el monto convertido a USD) a la moneda de la fila."
+        )
+        fx_rates = None
+        if fx_file is not None:
+            try:
+                fx_rates = load_fx_rates(fx_file.getvalue())
+            except (ValueError, ImportError) as e:
+                st.error(f"No se pudieron leer los tipos de cambio: {e}")
+            else:
+                table = fx_rates.table
+                st.caption(
+                    f"💱 {len(fx_rates):,} tipos de cambio de {', '.join(fx_rates.currencies)}, del "
+                    f"{table['Fecha'].min():%d/%m/%Y} al {table['Fecha'].max():%d/%m/%Y}"
+                    + (f" ({fx_rates.skipped:,} filas sin datos válidos se ignoraron)" if fx_rates.skipped else "")
+                )
+        
+        save_history = st.checkbox(
+            "Guardar en el historial",
+            value=False,
+            help=f"Guarda el resultado en el directorio '{HISTORY_DIR}' (Parquet particionado por origen, Estado y mes) para compararlo con otras corridas. Cada corrida se nombra con la fecha, la hora y el hash de los archivos, así no reemplaza a otras del mismo día."
+        )
+        history_dir = HISTORY_DIR if save_history else None
+        
+        unify_key = get_unify_key(
+            netsuite_files, salesforce_files, mapping, reconcile_policy, stream_mode, save_history, fx_rates
+        )
+        unified_results = st.session_state.get("unified_results", {})
+        
+        incremental = capture_cprofile = False
+        if not stream_mode:
+            incremental = st.checkbox(
+                "Unificación incremental",
+                value=False,
+                help="Reprocesa solo las filas nuevas o modificadas desde la última unificación incremental de la sesión. Conviene al volver a unificar versiones actualizadas de los mismos reportes. El resultado es el mismo que el de una unificación completa."
+            )
+            
+            capture_cprofile = st.checkbox(
+                "Capturar perfil detallado (cProfile)",
+                value=False,
+                help="Registra cada llamada durante la unificación para analizarla con pstats o snakeviz. Hace la unificación más lenta."
+            )
+        
+        # La unificación corre en segundo plano: la página se actualiza con su progreso
+        # hasta que termina y el resultado pasa a la sesión
+        job_info = st.session_state.get("unify_job")
+        running = job_info is not None and not job_info["job"].done()
+        
+        if st.button("Unificar datos", disabled=running):
+            if unify_key in unified_results:
+                unified_results.move_to_end(unify_key)
+            else:
+                history_run = run_name(content_hash(repr(unify_key).encode())) if save_history else None
+                if stream_mode:
+                    job = Job(
+                        stream_unify_data, [(file.name, file.getvalue()) for file in netsuite_files],
+                        [(file.name, file.getvalue()) for file in salesforce_files], mapping, reconcile_policy,
+                        memory_mb, history_dir, fx_rates, history_run,
+                    )
+                else:
+                    state = st.session_state.get("incremental_state") if incremental else None
+                    job = Job(
+                        unify_data, netsuite_df, salesforce_df, mapping, incremental, capture_cprofile,
+                        reconcile_policy, state, history_dir, fx_rates, history_run,
                     )
-                    
-                except Exception as e:
-                    st.error(f"Error al unificar los datos: {e}")
+                job_info = {
+                    "job": job.start(),
+                    "key": unify_key,
+                    "incremental": incremental,
+                }
+                st.session_state["unify_job"] = job_info
+                running = True
+            st.session_state["unified_key"] = unify_key
+        
+        if job_info is not None and job_info["job"].done():
+            del st.session_state["unify_job"]
+            collect_job(job_info)
+            running = False
+        elif running:
+            render_job_progress(job_info["job"])
+        
+        # Mostrar el resultado guardado mientras los archivos y el mapeo no cambien (y no
+        # haya una unificación en curso)
+        unified_results = st.session_state.get("unified_results", {})
+        if not running and st.session_state.get("unified_key") == unify_key and unify_key in unified_results:
+            render_unified_result(unified_results[unify_key])
+        elif not running and "unified_key" in st.session_state:
+            st.info("Los archivos, el mapeo o las opciones cambiaron desde la última unificación. Haz clic en 'Unificar datos' para actualizar el resultado.")
 else:
-    st.info("Por favor, carga ambos archivos CSV para continuar.")
+    st.info("Por favor, carga al menos un archivo CSV de cada reporte para continuar.")
+
+# Comparar dos corridas del historial (no hace falta cargar archivos). Solo se leen las
+# columnas y particiones que necesita la comparación.
+history_runs = list_runs(HISTORY_DIR)
+if len(history_runs) >= 2:
+    st.header("Comparar corridas del historial")
+    col1, col2 = st.columns(2)
+    with col1:
+        previous_run = st.selectbox("Corrida anterior", history_runs, index=len(history_runs) - 2)
+    with col2:
+        current_run = st.selectbox("Corrida actual", history_runs, index=len(history_runs) - 1)
+    
+    if st.button("Comparar corridas"):
+        try:
+            st.session_state["history_deltas"] = (
+                previous_run, current_run, compare_runs(HISTORY_DIR, previous_run, current_run)
+            )
+        except Exception as e:
+            st.error(f"Error al comparar las corridas: {e}")
+    
+    history_deltas = st.session_state.get("history_deltas")
+    if history_deltas is not None and history_deltas[:2] == (previous_run, current_run):
+        deltas = history_deltas[2]
+        labels = [f"{name} ({len(table):,})" for name, table in deltas.items()]
+        for tab, table in zip(st.tabs(labels), deltas.values()):
+            with tab:
+                st.dataframe(table, hide_index=True)
+        st.download_button(
+            label="⬇️ Descargar diferencias (CSV en .zip)",
+            data=lambda: read_file(build_summaries_zip(deltas, prefix="diferencias")),
+            file_name=f"diferencias_{previous_run}_{current_run}.zip",
+            mime="application/zip"
+        )
+
+# Estado de la caché de archivos
+st.sidebar.header("Caché de archivos")
+upload_cache = get_upload_cache()
+st.sidebar.write(
+    f"{len(upload_cache)} archivo(s) en caché, {upload_cache.total_bytes() / 1024 ** 2:,.1f} MB "
+    f"(aciertos: {upload_cache.hits}, fallos: {upload_cache.misses})"
+)
+if st.sidebar.button("Limpiar caché"):
+    upload_cache.clear()
+    st.session_state.pop("upload_hashes", None)
+    st.rerun()
 
 # Información adicional
 st.sidebar.header("Instrucciones")
@@ -673,11 +805,11 @@ Previamente debes descargar los siguientes reportes:
 Netsuite: "Delivery Tracking - Consolidated View"
 Salesforce: "Copy of Pipeline by Month (All Accounts)"
 
-1. Carga los archivos CSV de Netsuite y Salesforce.
-2. Revisa la vista previa de los datos.
+1. Carga los archivos CSV de Netsuite y Salesforce (uno o varios de cada reporte).
+2. Revisa la vista previa de los datos. Para reportes que no entran en memoria, marca "Procesar por partes" e indica la memoria disponible.
 3. Verifica el mapeo predefinido de columnas de Salesforce a Netsuite.
-4. Haz clic en 'Unificar datos' para incorporar la información de Salesforce al formato de Netsuite.
-5. Descarga el XLSX o CSV unificado con toda la información integrada.
+4. Haz clic en 'Unificar datos' para incorporar la información de Salesforce al formato de Netsuite. Opcionalmente, carga un archivo de tipos de cambio (moneda, fecha y tipo de cambio) para completar FX Rate en las filas de Salesforce.
+5. Explora el resultado por páginas, con filtros por Estado, cliente, PM y fechas, y ordenado por cualquier columna. Descarga el XLSX o CSV unificado con toda la información integrada. El XLSX incluye hojas de resumen (por Estado y mes, cliente, PM, Client Leader y confirmado vs. pipeline) que evitan armar tablas dinámicas sobre los datos completos. El reporte de calidad revisa todas las filas (vacíos, fechas y montos no interpretables, probabilidades fuera de rango, Estados desconocidos y claves repetidas) y se descarga como XLSX aparte. Si lo guardas en el historial, puedes compararlo con corridas anteriores (oportunidades nuevas, eliminadas o con otra probabilidad y movimiento de Total USD por cliente).
 
 **Importante**: Esta aplicación incorpora la información de Salesforce al CSV de Netsuite, respetando la estructura de columnas de Netsuite. El resultado es un único archivo XLSX o CSV que contiene tanto los datos originales de Netsuite como los datos de Salesforce mapeados al formato de Netsuite.
 """)
@@ -697,4 +829,5 @@ El mapeo predeterminado configurado es:
 Además, se añaden automáticamente:
 - Total USD = Total * (Probability / 100)
 - Estado = CONFIRMADO, PIPELINE o NO INCLUIR según procedencia y Probability
+- _Duplicado Netsuite = si la fila de Salesforce ya está en Netsuite (según la conciliación elegida)
 """)
\ No newline at end of file
@@ -0,0 +1,154 @@
+import argparse
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Generador de reportes sintéticos con la forma de los reales:
+# - Netsuite "Delivery Tracking - Consolidated View": fechas en formatos mezclados
+#   (05/01/2025, 2025-01-05, 5-Jan-2025, 5.1.2025), números con coma decimal (1.234,56)
+# - Salesforce "Copy of Pipeline by Month (All Accounts)": Client Leader como
+#   "Nombre Apellido", meses "Feb.2025" y montos con punto decimal (1,234.56)
+# Los valores se sortean de conjuntos precalculados, así generar millones de filas es rápido.
+
+FIRST_NAMES = ["Juan", "Ana", "Carlos", "María", "Lucía", "Martín", "Sofía", "Diego", "Valentina", "Pablo",
+               "Camila", "Federico", "Julieta", "Tomás", "Florencia", "Nicolás", "Agustina", "Matías"]
+LAST_NAMES = ["Pérez", "Gómez", "Díaz", "Fernández", "López", "Martínez", "Rodríguez", "Sánchez", "Romero",
+              "Álvarez", "Torres", "Ruiz", "Castro", "Moreno", "Acosta", "Medina", "Herrera", "Silva"]
+CUSTOMERS = ["ACME", "Globex", "Initech", "Umbrella", "Stark Industries", "Wayne Enterprises", "Hooli",
+             "Soylent", "Wonka", "Tyrell", "Cyberdyne", "Aperture", "Vandelay", "Massive Dynamic"]
+CURRENCIES = ["USD", "ARS", "EUR", "BRL", "MXN"]
+MONTH_ABBREVIATIONS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+SPANISH_MONTHS = {1: "Ene", 4: "Abr", 8: "Ago", 12: "Dic"}
+PROBABILITIES = [100, 90, 70, 50, 25, 10]
+
+SIZES = [10_000, 100_000, 1_000_000, 5_000_000]
+
+_POOL_SIZE = 20_000
+
+
+def _people(rng, size, last_first):
+    first = rng.choice(FIRST_NAMES, size)
+    last = rng.choice(LAST_NAMES, size)
+    if last_first:
+        return np.char.add(np.char.add(last.astype(str), ", "), first.astype(str)).astype(object)
+    return np.char.add(np.char.add(first.astype(str), " "), last.astype(str)).astype(object)
+
+
+# Montos con separador de miles y decimal según la convención ("1.234,56" o "1,234.56")
+def _amounts(rng, size, decimal, negative_share=0.0, scale=250_000):
+    values = np.round(rng.gamma(1.5, scale / 1.5, size), 2)
+    values[rng.random(size) < negative_share] *= -1
+    texts = [f"{value:,.2f}" for value in values]
+    if decimal == ",":
+        texts = [text.replace(",", "_").replace(".", ",").replace("_", ".") for text in texts]
+    return np.array(texts, dtype=object)
+
+
+def _date_pool():
+    start = date(2023, 1, 1)
+    days = [start + timedelta(days=i) for i in range(3 * 365)]
+    return {
+        "dd/mm/yyyy": [d.strftime("%d/%m/%Y") for d in days],
+        "yyyy-mm-dd": [d.strftime("%Y-%m-%d") for d in days],
+        "d-mmm-yyyy": [f"{d.day}-{MONTH_ABBREVIATIONS[d.month - 1]}-{d.year}" for d in days],
+        "d.m.yyyy": [f"{d.day}.{d.month}.{d.year}" for d in days],
+    }
+
+
+def _month_pool():
+    months = []
+    for year in range(2023, 2027):
+        for month in range(1, 13):
+            months.append(f"{MONTH_ABBREVIATIONS[month - 1]}.{year}")
+            if month in SPANISH_MONTHS:
+                months.append(f"{SPANISH_MONTHS[month]}.{year}")
+    return months
+
+
+def _sample(rng, pool, size, p=None):
+    pool = np.asarray(pool, dtype=object)
+    return pool[rng.choice(len(pool), size, p=p)]
+
+
+def generate_netsuite(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = _date_pool()
+    # 70 % DD/MM/YYYY, el resto repartido entre los demás formatos, y algunas vacías
+    date_formats = list(dates)
+    chosen_format = rng.choice(len(date_formats), rows, p=[0.7, 0.15, 0.1, 0.05])
+    day_index = rng.integers(0, len(dates[date_formats[0]]), rows)
+    date_values = np.empty(rows, dtype=object)
+    for i, fmt in enumerate(date_formats):
+        mask = chosen_format == i
+        date_values[mask] = np.asarray(dates[fmt], dtype=object)[day_index[mask]]
+    date_values[rng.random(rows) < 0.01] = None
+
+    totals = _amounts(rng, _POOL_SIZE, ",", negative_share=0.05)
+    totals_usd = _amounts(rng, _POOL_SIZE, ",", scale=200_000)
+    total_usd = _sample(rng, totals_usd, rows)
+    total_usd[rng.random(rows) < 0.2] = None
+
+    return pd.DataFrame({
+        "Project(PLAN)": _sample(rng, [f"Proyecto {i}" for i in range(1, 5001)], rows),
+        "Customer Parent": _sample(rng, CUSTOMERS, rows),
+        "Date": date_values,
+        "_PM": _sample(rng, _people(rng, 300, last_first=True), rows),
+        "_Client Leader AUX": _sample(rng, _people(rng, 300, last_first=True), rows),
+        "Proj. Currency": _sample(rng, CURRENCIES, rows),
+        "Quantity": _sample(rng, ["1", "2", "2,5", "10", "0,5", "160", "1.000"], rows),
+        "Total": _sample(rng, totals, rows),
+        "Total USD": total_usd,
+        "FX Rate": _sample(rng, ["1", "1,08", "0,0012", "950,5", "5,45"], rows),
+        "FX Rate Item": _sample(rng, ["1", "1,08"], rows),
+        "Consolidated FX Rate": "1",
+    })
+
+
+def generate_salesforce(rows, seed=0):
+    rng = np.random.default_rng(seed + 1)
+    amounts = _amounts(rng, _POOL_SIZE, ".")
+    # Algunos montos vienen con el símbolo de la moneda
+    with_symbol = rng.random(len(amounts)) < 0.3
+    amounts[with_symbol] = np.char.add("$", amounts[with_symbol].astype(str)).astype(object)
+
+    return pd.DataFrame({
+        "Opportunity Name": _sample(rng, [f"Oportunidad {i}" for i in range(1, 20001)], rows),
+        "Account Name": _sample(rng, CUSTOMERS, rows),
+        "Client Leader": _sample(rng, _people(rng, 300, last_first=False), rows),
+        "Project Manager": _sample(rng, _people(rng, 300, last_first=True), rows),
+        "Month": _sample(rng, _month_pool(), rows),
+        "Amount Currency": _sample(rng, CURRENCIES, rows),
+        "Amount (converted)": _sample(rng, amounts, rows),
+        "Probability (%)": _sample(rng, PROBABILITIES, rows),
+    })
+
+
+# Escribir (o reutilizar, si ya existen) los CSV de un tamaño dado.
+# Devuelve las rutas (netsuite, salesforce).
+def write_reports(rows, output_dir, seed=0, overwrite=False):
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    netsuite_path = output_dir / f"netsuite_{rows}.csv"
+    salesforce_path = output_dir / f"salesforce_{rows}.csv"
+    if overwrite or not netsuite_path.exists():
+        generate_netsuite(rows, seed).to_csv(netsuite_path, index=False)
+    if overwrite or not salesforce_path.exists():
+        generate_salesforce(rows, seed).to_csv(salesforce_path, index=False)
+    return netsuite_path, salesforce_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera reportes sintéticos de Netsuite y Salesforce.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="Cantidad de filas de cada reporte")
+    parser.add_argument("--output-dir", default="benchmarks/data", help="Directorio de los CSV generados")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    for rows in args.sizes:
+        for path in write_reports(rows, args.output_dir, args.seed, overwrite=True):
+            print(path)
+
+
+if __name__ == "__main__":
+    main()
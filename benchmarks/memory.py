@@ -0,0 +1,111 @@
+import argparse
+import gc
+
+from benchmarks.generate import write_reports
+from unificador.cache import frame_size
+from unificador.pipeline import build_mapping, enable_copy_on_write, read_report, unify
+from unificador.profiling import _RssSampler, current_rss
+from unificador.streaming import block_size, stream_unify
+
+# Control de regresión de memoria de la unificación: mide el pico de RSS que agrega
+# unify() sobre los reportes ya leídos (con sus esquemas) y lo compara con el tamaño de
+# referencia de esos reportes: el que ocupan leídos sin esquema, con los tipos que infiere
+# pandas. Así la referencia no cambia cuando cambia la representación de las columnas.
+#
+#   python -m benchmarks.memory --rows 300000 --max-ratio 2
+#
+# Termina con código 1 si el pico supera --max-ratio veces el tamaño de referencia.
+# Con --memoria-mb mide en cambio la unificación por partes (streaming.stream_unify) y
+# la compara con ese presupuesto.
+# Se mide el RSS (y no tracemalloc) porque las columnas de texto de pandas viven en
+# memoria de Arrow, que tracemalloc no registra.
+
+MAX_PEAK_RATIO = 2.0
+
+
+# Pico de RSS agregado por la unificación, junto al tamaño de las entradas
+def measure_unify(rows, data_dir, sample_interval=0.005):
+    netsuite_path, salesforce_path = write_reports(rows, data_dir)
+    reference = frame_size(read_report(netsuite_path)) + frame_size(read_report(salesforce_path))
+    netsuite_df = read_report(netsuite_path, "netsuite")
+    salesforce_df = read_report(salesforce_path, "salesforce")
+    mapping = build_mapping(salesforce_df.columns)
+    inputs = frame_size(netsuite_df) + frame_size(salesforce_df)
+
+    gc.collect()
+    rss_before = current_rss()
+    sampler = _RssSampler(sample_interval)
+    sampler.start()
+    result = unify(netsuite_df, salesforce_df, mapping)
+    peak = sampler.stop()
+    return {
+        "rows": rows,
+        "reference_mb": round(reference / 1024 ** 2, 1),
+        "inputs_mb": round(inputs / 1024 ** 2, 1),
+        "output_mb": round(frame_size(result["combined_df"]) / 1024 ** 2, 1),
+        "peak_increase_mb": round((peak - rss_before) / 1024 ** 2, 1),
+        "ratio": round((peak - rss_before) / reference, 2),
+    }
+
+
+# Pico de RSS agregado por la unificación por partes con el presupuesto memory_mb. Antes
+# se hace una unificación chica, para no contar la memoria que las bibliotecas reservan
+# la primera vez que se usan.
+def measure_streaming(rows, data_dir, memory_mb, output_dir, sample_interval=0.005):
+    netsuite_path, salesforce_path = write_reports(rows, data_dir)
+    warmup_netsuite, warmup_salesforce = write_reports(1000, data_dir)
+    stream_unify("warmup", warmup_netsuite, warmup_salesforce, output_dir, formats=("csv",))
+
+    gc.collect()
+    rss_before = current_rss()
+    sampler = _RssSampler(sample_interval)
+    sampler.start()
+    summary = stream_unify("streaming", netsuite_path, salesforce_path, output_dir, formats=("csv",),
+                           memory_mb=memory_mb)
+    peak = sampler.stop()
+    return {
+        "rows": rows,
+        "memory_mb": memory_mb,
+        "block_mb": round(block_size(memory_mb) / 1024 ** 2, 2),
+        "chunks": summary["streaming"]["chunks"],
+        "peak_increase_mb": round((peak - rss_before) / 1024 ** 2, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Control del pico de memoria de la unificación.")
+    parser.add_argument("--rows", type=int, default=300_000, help="Cantidad de filas de cada reporte")
+    parser.add_argument("--data-dir", default="benchmarks/data", help="Directorio de los CSV sintéticos")
+    parser.add_argument("--max-ratio", type=float, default=MAX_PEAK_RATIO,
+                        help="Pico máximo admitido, en veces el tamaño de referencia de las entradas")
+    parser.add_argument("--memoria-mb", type=int, default=None,
+                        help="Medir la unificación por partes con este presupuesto de memoria (en MB)")
+    parser.add_argument("--output-dir", default="benchmarks/output", help="Directorio de salida de --memoria-mb")
+    args = parser.parse_args(argv)
+
+    if current_rss() is None:
+        print("No se puede medir el RSS en esta plataforma.")
+        return 0
+
+    enable_copy_on_write()
+    if args.memoria_mb is not None:
+        record = measure_streaming(args.rows, args.data_dir, args.memoria_mb, args.output_dir)
+        print(f"{record['rows']:>10,} filas por partes: {record['chunks']} partes de {record['block_mb']} MB de CSV, "
+              f"pico +{record['peak_increase_mb']} MB (presupuesto {record['memory_mb']} MB)")
+        if record["peak_increase_mb"] > record["memory_mb"]:
+            print("⚠️ El pico de memoria supera el presupuesto")
+            return 1
+        return 0
+
+    record = measure_unify(args.rows, args.data_dir)
+    print(f"{record['rows']:>10,} filas: entradas {record['inputs_mb']} MB (sin esquema {record['reference_mb']} MB), "
+          f"resultado {record['output_mb']} MB, "
+          f"pico +{record['peak_increase_mb']} MB (x{record['ratio']:.2f}, máximo x{args.max_ratio:.2f})")
+    if record["ratio"] > args.max_ratio:
+        print("⚠️ El pico de memoria supera el máximo admitido")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
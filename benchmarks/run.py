@@ -0,0 +1,212 @@
+import argparse
+import gc
+import json
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generate import SIZES, write_reports
+from unificador.dates import normalize_dates
+from unificador.diagnostics import Diagnostics
+from unificador.export import write_csv, write_excel
+from unificador.numeric import parse_numeric_columns
+from unificador.pipeline import build_mapping, detect_decimals, normalize_null_strings, read_report
+from unificador.salesforce import transform_salesforce
+from unificador.schemas import concat_frames
+
+# Benchmark de cada etapa de la unificación sobre reportes sintéticos.
+#
+#   python -m benchmarks.run --sizes 10000 100000 --output resultados.json
+#   python -m benchmarks.run --sizes 10000 --compare resultados.json
+#
+# Cada etapa se mide por separado: tiempo (mejor de --repeat corridas) y, en una corrida
+# aparte con tracemalloc, el pico de memoria asignada por la etapa. También se registra el
+# RSS máximo del proceso.
+
+
+def _prepare_netsuite(ctx):
+    netsuite_df = ctx["netsuite_df"].copy()
+    if "Estado" not in netsuite_df.columns:
+        netsuite_df["Estado"] = "CONFIRMADO"
+    ctx["netsuite_ready"] = netsuite_df
+
+
+def _stage_read(ctx):
+    ctx["netsuite_df"] = read_report(ctx["netsuite_path"], "netsuite")
+    ctx["salesforce_df"] = read_report(ctx["salesforce_path"], "salesforce")
+    ctx["mapping"] = build_mapping(ctx["salesforce_df"].columns)
+    _prepare_netsuite(ctx)
+
+
+def _stage_transform(ctx):
+    netsuite_ready = ctx["netsuite_ready"]
+    ctx["salesforce_ready"] = transform_salesforce(
+        ctx["salesforce_df"], ctx["mapping"], netsuite_ready.columns, diagnostics=Diagnostics(),
+        target_dtypes=netsuite_ready.dtypes,
+    )
+
+
+def _stage_concat(ctx):
+    ctx["combined_df"] = concat_frames([ctx["netsuite_ready"], ctx["salesforce_ready"]])
+
+
+def _stage_replace_nan(ctx):
+    ctx["clean_df"] = normalize_null_strings(ctx["combined_df"].copy())
+
+
+def _stage_numbers(ctx):
+    parsed_df = ctx["clean_df"].copy()
+    decimals = detect_decimals(ctx["netsuite_df"], ctx["salesforce_df"], ctx["mapping"])
+    parse_numeric_columns(parsed_df, decimal=decimals)
+    ctx["parsed_df"] = parsed_df
+
+
+def _stage_dates(ctx):
+    ctx["unified_df"] = ctx["parsed_df"].assign(Date=normalize_dates(ctx["parsed_df"]["Date"]))
+
+
+def _stage_export_xlsx(ctx):
+    with tempfile.TemporaryFile() as output:
+        write_excel(ctx["unified_df"], output)
+
+
+def _stage_export_csv(ctx):
+    with tempfile.TemporaryFile() as output:
+        write_csv(ctx["unified_df"], output)
+
+
+# Etapas en orden de ejecución: (nombre, función, filas que procesa).
+# Cada etapa lee las salidas de las anteriores sin modificarlas, así puede repetirse.
+STAGES = [
+    ("read_csv", _stage_read, lambda ctx: len(ctx["netsuite_df"]) + len(ctx["salesforce_df"])),
+    ("transform_salesforce", _stage_transform, lambda ctx: len(ctx["salesforce_df"])),
+    ("concat", _stage_concat, lambda ctx: len(ctx["combined_df"])),
+    ("replace_nan", _stage_replace_nan, lambda ctx: len(ctx["combined_df"])),
+    ("parse_numbers", _stage_numbers, lambda ctx: len(ctx["combined_df"])),
+    ("normalize_dates", _stage_dates, lambda ctx: len(ctx["parsed_df"])),
+    ("export_xlsx", _stage_export_xlsx, lambda ctx: len(ctx["unified_df"])),
+    ("export_csv", _stage_export_csv, lambda ctx: len(ctx["unified_df"])),
+]
+
+
+def _max_rss_mb():
+    # En Linux ru_maxrss está en KB (en macOS, en bytes)
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / 1024 ** 2 if platform.system() == "Darwin" else max_rss / 1024
+
+
+def _measure(func, ctx, repeat):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func(ctx)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _measure_memory(func, ctx):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func(ctx)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024 ** 2
+
+
+def run_size(rows, data_dir, repeat=1, memory=True, skip=()):
+    netsuite_path, salesforce_path = write_reports(rows, data_dir)
+    ctx = {"netsuite_path": netsuite_path, "salesforce_path": salesforce_path}
+    results = []
+    for name, func, count_rows in STAGES:
+        if name in skip:
+            continue
+        seconds = _measure(func, ctx, repeat)
+        processed = count_rows(ctx)
+        record = {
+            "rows": rows,
+            "stage": name,
+            "rows_processed": processed,
+            "seconds": round(seconds, 4),
+            "rows_per_second": round(processed / seconds) if seconds > 0 else None,
+            "peak_traced_mb": round(_measure_memory(func, ctx), 1) if memory else None,
+            "max_rss_mb": round(_max_rss_mb(), 1),
+        }
+        results.append(record)
+        print(f"{rows:>10,} {name:<22} {record['seconds']:>9.3f} s  "
+              f"{record['peak_traced_mb'] if memory else '-':>8} MB  (RSS máx. {record['max_rss_mb']} MB)", flush=True)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _metadata():
+    return {
+        "commit": _git_commit(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+    }
+
+
+# Comparar con resultados anteriores: cociente de tiempos por (tamaño, etapa)
+def compare(results, baseline):
+    previous = {(record["rows"], record["stage"]): record for record in baseline["results"]}
+    print(f"\nComparación con {baseline['metadata'].get('commit') or 'la corrida anterior'}:")
+    for record in results:
+        before = previous.get((record["rows"], record["stage"]))
+        if before is None or not before["seconds"]:
+            continue
+        ratio = record["seconds"] / before["seconds"]
+        flag = "  ⚠️ más lento" if ratio > 1.2 else ""
+        print(f"{record['rows']:>10,} {record['stage']:<22} {before['seconds']:>9.3f} s → "
+              f"{record['seconds']:>9.3f} s  (x{ratio:.2f}){flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark por etapas de la unificación Netsuite-Salesforce.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="Cantidad de filas de cada reporte")
+    parser.add_argument("--data-dir", default="benchmarks/data", help="Directorio de los CSV sintéticos")
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados")
+    parser.add_argument("--repeat", type=int, default=1, help="Corridas por etapa (se toma el mejor tiempo)")
+    parser.add_argument("--no-memory", action="store_true", help="No medir memoria con tracemalloc")
+    parser.add_argument("--skip", nargs="+", default=[], choices=["export_xlsx", "export_csv"],
+                        help="Exportaciones a omitir (p. ej. export_xlsx en los tamaños grandes)")
+    parser.add_argument("--compare", help="JSON de una corrida anterior para comparar tiempos")
+    args = parser.parse_args(argv)
+
+    results = []
+    for rows in args.sizes:
+        results.extend(run_size(rows, args.data_dir, args.repeat, not args.no_memory, set(args.skip)))
+
+    report = {"metadata": _metadata(), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(results, json.load(f))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.generate import generate_netsuite
+from unificador.dates import month_of, normalize_dates
+
+
+# Conversión anterior de fechas (convert_date_format de app.py), sin el mensaje de
+# depuración. Es la referencia contra la que se compara normalize_dates.
+def reference_convert_date(date_str, source_format="netsuite"):
+    try:
+        if pd.isna(date_str) or date_str == "" or date_str is None:
+            return None
+
+        date_str = str(date_str).strip()
+
+        patterns = {
+            "dd_mm_yyyy": r'^(\d{1,2})[/\-\.](\d{1,2})[/\-\.](\d{4})$',
+            "mm_dd_yyyy": r'^(\d{1,2})[/\-\.](\d{1,2})[/\-\.](\d{4})$',
+            "yyyy_mm_dd": r'^(\d{4})[/\-\.](\d{1,2})[/\-\.](\d{1,2})$',
+            "dd_mmm_yyyy": r'^(\d{1,2})[\s\-\.]+([A-Za-z]{3})[\s\-\.]+(\d{4})$',
+        }
+
+        for pattern_name, pattern in patterns.items():
+            match = re.match(pattern, date_str)
+            if match:
+                if pattern_name == "dd_mm_yyyy":
+                    day, month, year = match.groups()
+                    return f"{int(day):02d}/{int(month):02d}/{year}"
+                elif pattern_name == "mm_dd_yyyy":
+                    month, day, year = match.groups()
+                    return f"{int(day):02d}/{int(month):02d}/{year}"
+                elif pattern_name == "yyyy_mm_dd":
+                    year, month, day = match.groups()
+                    return f"{int(day):02d}/{int(month):02d}/{year}"
+                elif pattern_name == "dd_mmm_yyyy":
+                    day, month_str, year = match.groups()
+                    month_dict = {
+                        'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+                        'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12,
+                        'Ene': 1, 'Feb': 2, 'Mar': 3, 'Abr': 4, 'May': 5, 'Jun': 6,
+                        'Jul': 7, 'Ago': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dic': 12
+                    }
+                    month = month_dict.get(month_str, 1)
+                    return f"{int(day):02d}/{month:02d}/{year}"
+
+        for fmt in ["%d/%m/%Y", "%m/%d/%Y", "%Y-%m-%d", "%d-%m-%Y", "%m-%d-%Y"]:
+            try:
+                dt = datetime.strptime(date_str, fmt)
+                return dt.strftime("%d/%m/%Y")
+            except ValueError:
+                continue
+
+        return date_str
+    except Exception:
+        return date_str
+
+
+# Formatos que emite el generador de reportes y los casos borde de los reportes reales
+VALUES = [
+    # DD/MM/YYYY (y MM/DD/YYYY, que se trata igual)
+    "05/01/2025", "31/12/2024", "5/1/2025", "12/31/2024", "01/02/2025", " 28/02/2025 ",
+    # ISO
+    "2025-01-05", "2024-12-31", "2025/1/5", "2025.01.05",
+    # d-Mon-YYYY, con meses en inglés y en castellano
+    "5-Jan-2025", "31-Dec-2024", "1 Feb 2025", "15.Mar.2025", "3-Ene-2025", "20-Abr-2024",
+    "7-Ago-2023", "24-Dic-2025", "9-Foo-2025",
+    # d.m.YYYY
+    "5.1.2025", "31.12.2024", "1.10.2023",
+    # Vacíos, nulos y basura
+    None, np.nan, "", " ", "sin fecha", "2025", "Feb.2025", "32/13/2025", "2025-13-45",
+    "5-January-2025", "05/01/25", 45000, 45000.5,
+]
+
+
+@pytest.mark.parametrize("value", VALUES, ids=repr)
+@pytest.mark.parametrize("source_format", ["netsuite", "salesforce"])
+def test_equivalente_a_convert_date_format(value, source_format):
+    expected = reference_convert_date(value, source_format)
+    actual = normalize_dates(pd.Series([value], dtype=object), source_format)
+    assert actual.tolist() == [expected]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_equivalente_en_reportes_generados(seed):
+    dates = generate_netsuite(2_000, seed)["Date"]
+    # Se agregan los casos borde para que se mezclen con los formatos del generador
+    values = pd.concat([dates, pd.Series(VALUES, dtype=object)], ignore_index=True)
+    values = values.sample(frac=1, random_state=seed).reset_index(drop=True)
+    expected = [reference_convert_date(value) for value in values]
+    assert normalize_dates(values).tolist() == expected
+
+
+def test_fechas_category():
+    values = pd.Series(VALUES * 3, dtype=object).astype("category")
+    actual = normalize_dates(values)
+    assert isinstance(actual.dtype, pd.CategoricalDtype)
+    expected = [reference_convert_date(value) for value in values]
+    # Los nulos de una columna category se leen como NaN
+    assert [None if pd.isna(value) else value for value in actual.tolist()] == expected
+
+
+def test_conserva_indice_y_nombre():
+    values = pd.Series(["5-Jan-2025", None, "2025-01-05"], index=[10, 3, 7], name="Date")
+    actual = normalize_dates(values)
+    assert actual.index.tolist() == [10, 3, 7]
+    assert actual.name == "Date"
+    assert actual.tolist() == ["05/01/2025", None, "05/01/2025"]
+
+
+def test_month_of():
+    assert month_of("31/01/2025") == month_of("5/1/2025") == month_of(" 15/01/2025 ") == "2025-01"
+    assert month_of("2025-01-31") is None
+    assert month_of(None) is None
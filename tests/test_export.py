@@ -0,0 +1,124 @@
+import io
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from unificador.export import write_csv, write_excel
+
+NUMERIC_COLUMNS = ["Total", "Total USD", "Quantity", "FX Rate", "FX Rate Item", "Consolidated FX Rate"]
+
+NUMBERS = [np.nan, 0.0, -0.0, 1.0, 1234.0, -1500.0, 1234.56, 0.1 + 0.2, 1e-7, 2.5, 1e20, 3e19, 123456789.123]
+TEXTS = [np.nan, "", "1.234,56", "1,5", "$1,234.56", "abc", "12", "-7,25", "1.000.000"]
+
+
+# Formateo anterior del CSV (format_number y format_number_for_excel de app.py), la
+# referencia contra la que se compara write_csv
+def reference_format_number(value):
+    try:
+        if isinstance(value, (int, float)):
+            return str(value)
+        if isinstance(value, str):
+            value = ''.join(c for c in value if c.isdigit() or c in '.,')
+            if '.' in value and ',' in value:
+                last_dot_pos = value.rfind('.')
+                last_comma_pos = value.rfind(',')
+                if last_dot_pos > last_comma_pos:
+                    value = value.replace(',', '')
+                else:
+                    value = value.replace('.', '')
+                    value = value[:last_comma_pos] + '.' + value[last_comma_pos+1:]
+            elif ',' in value:
+                last_comma_pos = value.rfind(',')
+                if last_comma_pos == len(value) - 3 or last_comma_pos == len(value) - 2:
+                    value = value.replace(',', '.')
+                else:
+                    value = value.replace(',', '')
+            try:
+                return str(float(value))
+            except ValueError:
+                return value
+        return value
+    except Exception:
+        return value
+
+
+def reference_format_number_for_excel(value):
+    try:
+        if pd.isna(value):
+            return ""
+        try:
+            cleaned_value = reference_format_number(value)
+            num_value = float(cleaned_value)
+            if num_value == int(num_value):
+                formatted = f'"{int(num_value)}"'
+            else:
+                formatted = f'"{str(num_value).replace(".", ",")}"'
+            return formatted
+        except:  # noqa: E722
+            return f'"{str(value)}"'
+    except Exception:
+        return value
+
+
+def reference_csv(df):
+    df_download = df.copy()
+    for col in NUMERIC_COLUMNS:
+        if col in df_download.columns:
+            df_download[col] = df_download[col].apply(
+                lambda x: reference_format_number_for_excel(x) if pd.notna(x) else x
+            )
+    return df_download.to_csv(index=False, sep=';', float_format='%.10f').encode()
+
+
+def random_result(rng, n_rows):
+    df = pd.DataFrame({
+        "Date": pd.Series([rng.choice(["31/01/2025", "28/02/2025", None]) for _ in range(n_rows)], dtype="category"),
+        "Customer Parent": [rng.choice(["ACME", "Globex; Inc", 'Dice "hola"']) for _ in range(n_rows)],
+        "Total": [rng.choice(NUMBERS) for _ in range(n_rows)],
+        "Total USD": [rng.choice(NUMBERS) for _ in range(n_rows)],
+        "Quantity": [float(rng.choice([0, 10, 50, 70, 100])) for _ in range(n_rows)],
+        "FX Rate": pd.Series([rng.choice(TEXTS) for _ in range(n_rows)], dtype=object),
+        "Estado": pd.Series([rng.choice(["CONFIRMADO", "PIPELINE", "NO INCLUIR"]) for _ in range(n_rows)],
+                            dtype="category"),
+    })
+    # Una columna numérica entera, como las que quedan sin nulos
+    df["FX Rate Item"] = np.array([rng.choice([1, 2, -3]) for _ in range(n_rows)], dtype=np.int64)
+    return df
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_csv_igual_al_formato_anterior(seed):
+    rng = random.Random(seed)
+    df = random_result(rng, rng.randint(1, 300))
+    # Los infinitos (posibles en Total USD) solo van al CSV: to_excel no los admite
+    df.loc[df.index[0], "Total USD"] = rng.choice([np.inf, -np.inf, np.nan])
+    output = io.BytesIO()
+    write_csv(df, output, chunk_rows=rng.choice([7, 100, 1000]))
+    assert output.getvalue() == reference_csv(df)
+
+
+def test_csv_vacio():
+    df = random_result(random.Random(0), 1).iloc[:0]
+    output = io.BytesIO()
+    write_csv(df, output)
+    assert output.getvalue() == reference_csv(df)
+
+
+def sheet_values(data):
+    openpyxl = pytest.importorskip("openpyxl")
+    worksheet = openpyxl.load_workbook(io.BytesIO(data), read_only=True).worksheets[0]
+    return [list(row) for row in worksheet.iter_rows(values_only=True)]
+
+
+# El XLSX no usa el formateo del CSV: los números se escriben como números, con los mismos
+# valores de celda que la exportación anterior (to_excel)
+def test_xlsx_mismos_valores_que_to_excel():
+    df = random_result(random.Random(1), 500)
+    expected = io.BytesIO()
+    with pd.ExcelWriter(expected, engine="xlsxwriter") as writer:
+        df.to_excel(writer, index=False, sheet_name="Datos Unificados")
+    output = io.BytesIO()
+    write_excel(df, output)
+    assert sheet_values(output.getvalue()) == sheet_values(expected.getvalue())
@@ -0,0 +1,122 @@
+import io
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from unificador.fx import load_fx_rates
+from unificador.pipeline import build_mapping, load_reports, unify
+
+# Tipos de cambio en USD por unidad: EUR cambia el 15/02, ARS tiene un solo valor y la
+# última fila repite ARS en la misma fecha (vale la última). Las dos filas sin moneda o
+# sin tipo de cambio válido se descartan.
+RATES_CSV = (
+    "currency;date;rate\n"
+    "eur;01/01/2025;1,10\n"
+    "EUR;2025-02-15;1,20\n"
+    "ARS;01/01/2025;0,002\n"
+    ";01/01/2025;5\n"
+    "BRL;01/01/2025;abc\n"
+    "ARS;01/01/2025;0,001\n"
+).encode()
+
+NETSUITE_CSV = (
+    b"Project(PLAN),Customer Parent,Date,Proj. Currency,Total,FX Rate,FX Rate Item,Consolidated FX Rate\n"
+    b"Proyecto 1,ACME,31/01/2025,EUR,\"100,00\",\"1,05\",\"1,05\",1\n"
+)
+SALESFORCE_CSV = (
+    b"Opportunity Name,Account Name,Month,Amount Currency,Amount (converted),Probability (%)\n"
+    b"O 1,ACME,Jan.2025,EUR,110,100\n"
+    b"O 2,ACME,Feb.2025,EUR,120,50\n"
+    b"O 3,ACME,Jan.2025,ARS,10,100\n"
+    b"O 4,ACME,Jan.2025,USD,30,100\n"
+    b"O 5,ACME,Jan.2025,JPY,40,100\n"
+    b"O 6,ACME,Dec.2024,EUR,50,100\n"
+)
+
+
+# Búsqueda de a un par, recorriendo la tabla: el último tipo de cambio de la moneda con
+# fecha menor o igual. Es la referencia contra la que se compara lookup.
+def reference_lookup(table, currency, date):
+    if currency is None or pd.isna(date):
+        return np.nan
+    rows = table[(table["Moneda"] == currency) & (table["Fecha"] <= date)]
+    if len(rows):
+        return rows.sort_values("Fecha")["Tipo de cambio"].iloc[-1]
+    return 1.0 if currency == "USD" else np.nan
+
+
+def test_load_fx_rates():
+    rates = load_fx_rates(RATES_CSV)
+    assert rates.currencies == ["ARS", "EUR"]
+    assert rates.skipped == 2
+    assert rates.table["Tipo de cambio"].tolist() == [1.1, 0.001, 1.2]
+    assert rates.table["Fecha"].is_monotonic_increasing
+    # El mismo contenido sale de la caché
+    assert load_fx_rates(io.BytesIO(RATES_CSV)).table is rates.table
+
+
+def test_load_fx_rates_parquet():
+    pytest.importorskip("pyarrow")
+    frame = pd.DataFrame({
+        "Moneda": ["EUR", "ARS"],
+        "Fecha": pd.to_datetime(["2025-01-01", "2025-01-01"]),
+        "Tipo de cambio": [1.1, 0.001],
+    })
+    buffer = io.BytesIO()
+    frame.to_parquet(buffer)
+    rates = load_fx_rates(buffer.getvalue())
+    assert rates.table.sort_values("Moneda")["Tipo de cambio"].tolist() == [0.001, 1.1]
+
+
+def test_load_fx_rates_sin_columnas():
+    with pytest.raises(ValueError):
+        load_fx_rates(b"Moneda,Valor\nEUR,1\n")
+
+
+def test_lookup():
+    rates = load_fx_rates(RATES_CSV)
+    currencies = ["EUR", "EUR", "EUR", "ARS", "USD", "JPY", None, "EUR"]
+    dates = pd.to_datetime(["2025-01-31", "2025-02-28", "2024-12-31", "2025-03-31", "2025-01-31", "2025-01-31",
+                            "2025-01-31", None])
+    result = rates.lookup(currencies, dates)
+    np.testing.assert_array_equal(result, [1.1, 1.2, np.nan, 0.001, 1.0, np.nan, np.nan, np.nan])
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_lookup_igual_a_recorrer_la_tabla(seed):
+    rng = random.Random(seed)
+    days = pd.date_range("2024-11-01", "2025-06-30")
+    csv = "Moneda,Fecha,Tipo de cambio\n" + "".join(
+        f"{rng.choice(['EUR', 'ARS', 'BRL'])},{rng.choice(days):%d/%m/%Y},{rng.uniform(0.001, 2):.4f}\n"
+        for _ in range(rng.randint(1, 30))
+    )
+    rates = load_fx_rates(csv.encode())
+    currencies = [rng.choice(["EUR", "ARS", "BRL", "USD", "JPY", None]) for _ in range(50)]
+    dates = pd.Series([rng.choice(list(days) + [pd.NaT]) for _ in range(50)], dtype="datetime64[ns]")
+    expected = [reference_lookup(rates.table, currency, date) for currency, date in zip(currencies, dates)]
+    np.testing.assert_array_equal(rates.lookup(currencies, dates), expected)
+
+
+def test_unify_con_tipos_de_cambio():
+    netsuite_df = load_reports(NETSUITE_CSV, "netsuite")
+    salesforce_df = load_reports(SALESFORCE_CSV, "salesforce")
+    result = unify(
+        netsuite_df, salesforce_df, build_mapping(salesforce_df.columns), fx_rates=load_fx_rates(RATES_CSV),
+    )
+    combined_df = result["combined_df"]
+    salesforce_rows = combined_df.iloc[1:]
+
+    # Tipo de cambio vigente al fin de mes de cada fila; sin tipo de cambio quedan vacíos
+    expected_rates = [1.1, 1.2, 0.001, 1.0, np.nan, np.nan]
+    for col in ("FX Rate", "FX Rate Item", "Consolidated FX Rate"):
+        np.testing.assert_array_equal(salesforce_rows[col].to_numpy(), expected_rates)
+    # El monto convertido (en USD) pasa a la moneda de la fila: Total ÷ tipo de cambio
+    np.testing.assert_allclose(salesforce_rows["Total"].to_numpy(), [100.0, 100.0, 10_000.0, 30.0, 40.0, 50.0])
+    # Las filas de Netsuite conservan sus valores
+    assert combined_df["FX Rate"].iloc[0] == 1.05
+    assert combined_df["Total"].iloc[0] == 100.0
+
+    assert {key: result["fx"][key] for key in ("rows", "missing")} == {"rows": 4, "missing": 2}
+    assert result["diagnostics"].count("Tipo de cambio faltante") == 2
@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+
+from benchmarks.generate import generate_netsuite, generate_salesforce
+from unificador.incremental import load_state, save_state
+from unificador.pipeline import build_mapping, load_reports, process_pair, state_path, unify, unify_incremental
+
+pytest.importorskip("pyarrow")
+
+
+def read(df, report):
+    return load_reports(df.to_csv(index=False).encode(), report)
+
+
+# Reportes de la primera ejecución y de la siguiente: filas agregadas, una editada y
+# otras eliminadas en cada reporte
+def report_versions():
+    netsuite, salesforce = generate_netsuite(400, seed=3), generate_salesforce(300, seed=3)
+    new_netsuite = pd.concat([netsuite.drop(index=[5, 17, 200]), generate_netsuite(30, seed=4)], ignore_index=True)
+    new_netsuite.loc[10, "Total"] = "99,99"
+    new_salesforce = pd.concat([salesforce.drop(index=[1, 150]), generate_salesforce(25, seed=4)], ignore_index=True)
+    new_salesforce.loc[40, "Probability (%)"] = "100"
+    return (netsuite, salesforce), (new_netsuite, new_salesforce)
+
+
+def test_incremental_igual_a_unificacion_completa(tmp_path):
+    (netsuite, salesforce), (new_netsuite, new_salesforce) = report_versions()
+    netsuite_df, salesforce_df = read(netsuite, "netsuite"), read(salesforce, "salesforce")
+    mapping = build_mapping(salesforce_df.columns)
+    _, state = unify_incremental(netsuite_df, salesforce_df, mapping)
+
+    # El estado pasa por disco, como entre dos ejecuciones del CLI
+    path = tmp_path / "par.estado"
+    save_state(state, path)
+    state = load_state(path)
+
+    netsuite_df, salesforce_df = read(new_netsuite, "netsuite"), read(new_salesforce, "salesforce")
+    result, _ = unify_incremental(netsuite_df, salesforce_df, mapping, state, reconcile_policy="marcar")
+    assert not result["incremental"]["full"]
+    assert result["incremental"]["reused"] > 0
+    expected = unify(netsuite_df, salesforce_df, mapping, reconcile_policy="marcar")
+    pd.testing.assert_frame_equal(result["combined_df"], expected["combined_df"])
+
+
+def test_estado_guardado_sin_pickle(tmp_path):
+    (netsuite, salesforce), _ = report_versions()
+    netsuite_df, salesforce_df = read(netsuite, "netsuite"), read(salesforce, "salesforce")
+    _, state = unify_incremental(netsuite_df, salesforce_df, build_mapping(salesforce_df.columns))
+    path = tmp_path / "par.estado"
+    save_state(state, path)
+    assert sorted(file.name for file in path.iterdir()) == ["estado.json", "huellas.npz", "resultado.parquet"]
+
+    loaded = load_state(path)
+    pd.testing.assert_frame_equal(loaded["combined_df"], state["combined_df"])
+    assert (loaded["netsuite_fingerprints"] == state["netsuite_fingerprints"]).all()
+    assert loaded["schemas"] == state["schemas"]
+    assert loaded["decimals"] == state["decimals"]
+
+
+def test_process_pair_incremental(tmp_path):
+    (netsuite, salesforce), (new_netsuite, new_salesforce) = report_versions()
+    netsuite_path, salesforce_path = tmp_path / "netsuite.csv", tmp_path / "salesforce.csv"
+    netsuite.to_csv(netsuite_path, index=False)
+    salesforce.to_csv(salesforce_path, index=False)
+    first = process_pair("par", netsuite_path, salesforce_path, tmp_path / "salida", formats=("csv",), incremental=True)
+    assert first["incremental"]["full"]
+    assert state_path(tmp_path / "salida", "par").is_dir()
+
+    new_netsuite.to_csv(netsuite_path, index=False)
+    new_salesforce.to_csv(salesforce_path, index=False)
+    second = process_pair("par", netsuite_path, salesforce_path, tmp_path / "salida", formats=("csv",), incremental=True)
+    assert not second["incremental"]["full"]
+    incremental_csv = (tmp_path / "salida" / "par.csv").read_bytes()
+    process_pair("par", netsuite_path, salesforce_path, tmp_path / "completo", formats=("csv",))
+    assert incremental_csv == (tmp_path / "completo" / "par.csv").read_bytes()
@@ -0,0 +1,30 @@
+import json
+
+import pytest
+
+from unificador.mapping import load_saved_mapping
+
+MAPPING = {"Account Name": "No mapear", "Month": "No mapear"}
+TARGET_COLUMNS = ["Customer Parent", "Date"]
+
+
+def test_load_saved_mapping():
+    data = json.dumps({"Account name": "Customer Parent", "Month": "Date", "Stage": "Date"})
+    mapping, ignored = load_saved_mapping(data, MAPPING, TARGET_COLUMNS)
+    assert mapping == {"Account Name": "Customer Parent", "Month": "Date"}
+    assert ignored == ["Stage"]
+
+
+@pytest.mark.parametrize("data", [
+    "[]",
+    '"Customer Parent"',
+    '{"Month": ["Date"]}',
+    '{"Month": {"columna": "Date"}}',
+    '{"Month": null}',
+    '{"Month": 3}',
+    "{",
+    b"\xff\xfe{",
+])
+def test_load_saved_mapping_invalido(data):
+    with pytest.raises(ValueError):
+        load_saved_mapping(data, MAPPING, TARGET_COLUMNS)
@@ -0,0 +1,26 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from benchmarks.memory import MAX_PEAK_RATIO
+from unificador.profiling import current_rss
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Filas de cada reporte: con menos, la memoria que las bibliotecas reservan la primera vez
+# pesa más que la de los datos y el cociente deja de ser representativo
+ROWS = 200_000
+
+
+# El control de memoria corre en un proceso aparte, para que el RSS medido no dependa de
+# lo que reservaron las pruebas anteriores
+@pytest.mark.skipif(current_rss() is None, reason="No se puede medir el RSS en esta plataforma")
+def test_pico_de_memoria_de_unify(tmp_path):
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.memory", "--rows", str(ROWS), "--data-dir", str(tmp_path),
+         "--max-ratio", str(MAX_PEAK_RATIO)],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    assert completed.returncode == 0, completed.stdout + completed.stderr
@@ -0,0 +1,54 @@
+import io
+
+import pandas as pd
+
+from unificador.pipeline import build_mapping, load_reports, unify
+from unificador.schemas import SOURCE_COLUMN
+from unificador.streaming import stream_unify
+
+NETSUITE_CSV = b"Date,Customer Parent,Total\n31/01/2025,ACME,10\n28/02/2025,Globex,20\n"
+
+
+def test_load_reports_bytes():
+    df = load_reports(NETSUITE_CSV, "netsuite")
+    assert len(df) == 2
+    assert SOURCE_COLUMN not in df.columns
+
+
+def test_load_reports_archivo_abierto():
+    df = load_reports(io.BytesIO(NETSUITE_CSV), "netsuite")
+    assert len(df) == 2
+
+
+def test_load_reports_nombres_sin_ruta(tmp_path):
+    path = tmp_path / "netsuite.csv"
+    path.write_bytes(NETSUITE_CSV)
+    with open(path, "rb") as opened:
+        df = load_reports([NETSUITE_CSV, io.BytesIO(NETSUITE_CSV), opened], "netsuite")
+    names = ["archivo 1", "archivo 2", "netsuite.csv"]
+    assert [file["name"] for file in df.attrs["files"]] == names
+    assert df[SOURCE_COLUMN].tolist() == [name for name in names for _ in range(2)]
+
+
+def test_load_reports_nombres_repetidos(tmp_path):
+    paths = []
+    for folder in ("enero", "febrero"):
+        (tmp_path / folder).mkdir()
+        paths.append(tmp_path / folder / "netsuite.csv")
+        paths[-1].write_bytes(NETSUITE_CSV)
+    df = load_reports(paths, "netsuite")
+    assert [file["name"] for file in df.attrs["files"]] == [str(path) for path in paths]
+
+
+def test_unify_sin_filas_de_salesforce(tmp_path):
+    netsuite_csv = b'Date,Customer Parent,Total,Quantity\n31/01/2025,ACME,"1.234,56","2,5"\n28/02/2025,Globex,"10,00",1\n'
+    salesforce_csv = b"Month,Account Name,Amount (converted),Probability (%)\n"
+    salesforce_df = load_reports(salesforce_csv, "salesforce")
+    result = unify(load_reports(netsuite_csv, "netsuite"), salesforce_df, build_mapping(salesforce_df.columns))
+    combined_df = result["combined_df"]
+    assert combined_df["Total"].tolist() == [1234.56, 10.0]
+    assert combined_df["Quantity"].tolist() == [2.5, 1.0]
+
+    # Igual que la unificación por partes, que siempre convierte los números
+    summary = stream_unify("resultado", netsuite_csv, salesforce_csv, tmp_path, formats=("parquet",))
+    pd.testing.assert_frame_equal(pd.read_parquet(summary["outputs"][0]), combined_df)
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from unificador.pipeline import build_mapping, load_reports, unify
+from unificador.quality import (
+    SAMPLE_TABLE,
+    QualityCheck,
+    check_quality,
+    empty_mask,
+    problem_counts,
+)
+from unificador.salesforce import compile_mapping
+
+# Un problema de cada control: fila 2 de Netsuite con monto ilegible y la misma clave
+# que la fila 1 (otro día del mismo mes), fila 3 con fecha y estado desconocidos; en
+# Salesforce, fila 1 con probabilidad 150 y fila 2 con monto ilegible
+NETSUITE_CSV = (
+    b"Project(PLAN),Customer Parent,Date,Total,Quantity,Estado\n"
+    b"Proyecto 1,ACME,31/01/2025,10,1,CONFIRMADO\n"
+    b"proyecto 1,Acme,15/01/2025,abc,1,CONFIRMADO\n"
+    b"Proyecto 2,ACME,sin fecha,20,1,FOO\n"
+    b"Proyecto 3,ACME,,30,1,PIPELINE\n"
+)
+SALESFORCE_CSV = (
+    b"Opportunity Name,Account Name,Month,Amount (converted),Probability (%)\n"
+    b"Oportunidad 1,ACME,Jan.2025,100,150\n"
+    b"Oportunidad 2,ACME,Feb.2025,xyz,50\n"
+)
+
+
+def unify_reports(netsuite_csv, salesforce_csv):
+    netsuite_df = load_reports(netsuite_csv, "netsuite")
+    salesforce_df = load_reports(salesforce_csv, "salesforce")
+    mapping = build_mapping(salesforce_df.columns)
+    return netsuite_df, salesforce_df, mapping, unify(netsuite_df, salesforce_df, mapping)
+
+
+def test_controles():
+    _, _, _, result = unify_reports(NETSUITE_CSV, SALESFORCE_CSV)
+    assert problem_counts(result["quality"]) == {
+        "Fecha no interpretable": 1,
+        "Monto no interpretable": 2,
+        "Probabilidad fuera de 0-100": 1,
+        "Estado desconocido": 1,
+        "Clave duplicada": 1,
+    }
+    samples = result["quality"][SAMPLE_TABLE]
+    assert samples[["Control", "Origen", "Fila", "Valor"]].values.tolist() == [
+        ["Fecha no interpretable", "Netsuite", 3, "sin fecha"],
+        ["Monto no interpretable", "Netsuite", 2, "abc"],
+        ["Estado desconocido", "Netsuite", 3, "FOO"],
+        ["Clave duplicada", "Netsuite", 2, None],
+        ["Monto no interpretable", "Salesforce", 2, "xyz"],
+        ["Probabilidad fuera de 0-100", "Salesforce", 1, 150.0],
+    ]
+    assert result["column_warnings"] == ["⚠️ La columna 'Total' quedó vacía en 1 de 2 filas de Salesforce."]
+
+
+def test_sin_problemas():
+    netsuite_csv = b"Project(PLAN),Customer Parent,Date,Total,Estado\nProyecto 1,ACME,31/01/2025,10,CONFIRMADO\n"
+    salesforce_csv = b"Opportunity Name,Account Name,Month,Amount (converted),Probability (%)\nO 1,ACME,Jan.2025,5,50\n"
+    _, _, _, result = unify_reports(netsuite_csv, salesforce_csv)
+    assert problem_counts(result["quality"]) == {}
+    assert result["quality"][SAMPLE_TABLE].empty
+
+
+# Revisar por partes (como en streaming) da el mismo reporte que revisar todo junto
+def test_por_partes_igual_que_completo():
+    netsuite_df, salesforce_df, mapping, result = unify_reports(NETSUITE_CSV, SALESFORCE_CSV)
+    combined_df = result["combined_df"]
+    plan = compile_mapping(mapping, combined_df.columns)
+    expected = check_quality(netsuite_df, salesforce_df, combined_df, plan)
+
+    quality = QualityCheck(plan)
+    netsuite_rows = len(netsuite_df)
+    for start, stop in ((0, 1), (1, 3), (3, netsuite_rows)):
+        quality.scan_source("netsuite", netsuite_df.iloc[start:stop], combined_df.iloc[start:stop], start)
+        quality.scan_result("netsuite", combined_df.iloc[start:stop], start)
+    for start, stop in ((0, 1), (1, len(salesforce_df))):
+        part = combined_df.iloc[netsuite_rows + start:netsuite_rows + stop]
+        quality.scan_source("salesforce", salesforce_df.iloc[start:stop], part, start)
+        quality.scan_result("salesforce", part, start)
+    for name, table in quality.tables().items():
+        pd.testing.assert_frame_equal(table, expected[name])
+
+
+def test_empty_mask():
+    values = pd.Series(["a", "", "  ", "nan", "None", None, "b"], dtype=object)
+    assert empty_mask(values).tolist() == [False, True, True, True, True, True, False]
+    assert empty_mask(values.astype("category")).tolist() == [False, True, True, True, True, True, False]
+    assert empty_mask(pd.Series([1.0, np.nan])).tolist() == [False, True]
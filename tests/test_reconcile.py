@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from unificador.diagnostics import Diagnostics
+from unificador.pipeline import build_mapping, load_reports, unify
+from unificador.reconcile import (
+    DUPLICATE_COLUMN,
+    find_duplicates,
+    key_hashes,
+    month_key,
+    reconcile,
+)
+from unificador.text import normalize_key
+
+# Resultado combinado: 3 filas de Netsuite seguidas de 5 de Salesforce. Las dos primeras
+# de Salesforce están en Netsuite (con otros acentos, mayúsculas, espacios y día del mes);
+# las demás difieren en el mes, en el cliente o tienen la clave incompleta.
+NETSUITE_ROWS = 3
+COMBINED = pd.DataFrame({
+    "Project(PLAN)": ["Proyecto Ñandú", "Proyecto 2", "Proyecto 3", "proyecto nandu", "PROYECTO  2", "Proyecto 3",
+                      "Proyecto 2", None],
+    "Customer Parent": ["ACME", "Globex", "Initech", " acme ", "Globex", "Initech", "Hooli", "ACME"],
+    "Date": ["31/01/2025", "28/02/2025", "31/03/2025", "15/1/2025", "01/02/2025", "30/04/2025", "28/02/2025",
+             "31/01/2025"],
+    "Estado": ["CONFIRMADO", "CONFIRMADO", "CONFIRMADO", "CONFIRMADO", "PIPELINE", "PIPELINE", "PIPELINE",
+               "PIPELINE"],
+    "Total": [10.0, 20.0, 30.0, 1.0, 2.0, 3.0, 4.0, 5.0],
+})
+DUPLICATES = [True, True, False, False, False]
+
+
+def test_normalize_key():
+    assert normalize_key("  Proyecto   Ñandú ") == "proyecto nandu"
+    assert normalize_key("GLOBEX") == normalize_key("globex")
+
+
+def test_month_key():
+    assert month_key("5/1/2025") == month_key("31/01/2025") == "2025-01"
+    assert month_key(" 28/02/2025 ") == "2025-02"
+    # Los demás formatos se comparan como texto
+    assert month_key("Feb.2025") == "feb.2025"
+
+
+def test_find_duplicates():
+    assert find_duplicates(COMBINED, NETSUITE_ROWS).tolist() == DUPLICATES
+
+
+def test_key_hashes_coincide_con_find_duplicates():
+    hashes, valid = key_hashes(COMBINED)
+    booked = set(hashes[:NETSUITE_ROWS][valid[:NETSUITE_ROWS]].tolist())
+    found = [bool(ok) and value in booked for value, ok in zip(hashes[NETSUITE_ROWS:].tolist(), valid[NETSUITE_ROWS:])]
+    assert found == DUPLICATES
+
+
+def test_key_hashes_categorias_y_cache():
+    cache = {}
+    hashes, valid = key_hashes(COMBINED, cache=cache)
+    categorical = COMBINED.astype({"Project(PLAN)": "category", "Customer Parent": "category"})
+    assert np.array_equal(key_hashes(categorical, cache=cache)[0][valid], hashes[valid])
+    assert cache["Customer Parent"][" acme "] == "acme"
+
+
+def test_politica_ninguna():
+    result, summary = reconcile(COMBINED, NETSUITE_ROWS, "ninguna")
+    assert result is COMBINED
+    assert summary is None
+
+
+def test_politica_marcar():
+    diagnostics = Diagnostics()
+    result, summary = reconcile(COMBINED, NETSUITE_ROWS, "marcar", diagnostics)
+    assert result[DUPLICATE_COLUMN].tolist() == [False] * NETSUITE_ROWS + DUPLICATES
+    assert result["Estado"].tolist() == COMBINED["Estado"].tolist()
+    assert summary == {"policy": "marcar", "matched": 2, "by_estado": {"CONFIRMADO": 1, "PIPELINE": 1}}
+    assert diagnostics.count("Conciliación") == 2
+    assert DUPLICATE_COLUMN not in COMBINED.columns
+
+
+def test_politica_excluir():
+    result, summary = reconcile(COMBINED, NETSUITE_ROWS, "excluir")
+    assert result[DUPLICATE_COLUMN].tolist() == [False] * NETSUITE_ROWS + DUPLICATES
+    expected = COMBINED["Estado"].where(~result[DUPLICATE_COLUMN], "NO INCLUIR")
+    assert result["Estado"].astype(str).tolist() == expected.tolist()
+    assert summary["matched"] == 2
+
+
+def test_politica_eliminar():
+    result, summary = reconcile(COMBINED, NETSUITE_ROWS, "eliminar")
+    expected = COMBINED[[True] * NETSUITE_ROWS + [not flag for flag in DUPLICATES]]
+    assert result["Total"].tolist() == expected["Total"].tolist()
+    assert result.index.tolist() == list(range(len(expected)))
+    assert DUPLICATE_COLUMN not in result.columns
+    assert summary["matched"] == 2
+
+
+def test_faltan_columnas_de_la_clave():
+    diagnostics = Diagnostics()
+    result, summary = reconcile(COMBINED.drop(columns="Project(PLAN)"), NETSUITE_ROWS, "eliminar", diagnostics)
+    assert len(result) == len(COMBINED)
+    assert summary == {"policy": "eliminar", "matched": 0, "by_estado": {}}
+    assert diagnostics.has_warnings()
+
+
+def test_politica_desconocida():
+    with pytest.raises(ValueError):
+        reconcile(COMBINED, NETSUITE_ROWS, "borrar")
+
+
+def test_unify_con_conciliacion():
+    netsuite_csv = (
+        b"Project(PLAN),Customer Parent,Date,Total,Quantity,Estado\n"
+        b"Proyecto 1,ACME,31/01/2025,10,1,CONFIRMADO\n"
+    )
+    salesforce_csv = (
+        b"Opportunity Name,Account Name,Month,Amount (converted),Probability (%)\n"
+        b"proyecto 1,Acme,Jan.2025,10,100\n"
+        b"Proyecto 2,ACME,Jan.2025,20,50\n"
+    )
+    netsuite_df = load_reports(netsuite_csv, "netsuite")
+    salesforce_df = load_reports(salesforce_csv, "salesforce")
+    mapping = build_mapping(salesforce_df.columns)
+    result = unify(netsuite_df, salesforce_df, mapping, reconcile_policy="eliminar")
+    assert result["combined_df"]["Project(PLAN)"].astype(str).tolist() == ["Proyecto 1", "Proyecto 2"]
+    assert result["reconciliation"]["matched"] == 1
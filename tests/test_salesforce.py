@@ -0,0 +1,211 @@
+import calendar
+import random
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from unificador.salesforce import transform_salesforce
+
+# Columnas de Netsuite que reciben los datos de Salesforce en las pruebas
+TARGET_COLUMNS = ["Date", "Customer Parent", "_PM", "_Client Leader AUX", "Total", "Quantity", "Estado"]
+
+MAPPING = {
+    "Client Leader": "_Client Leader AUX",
+    "Project Manager": "_PM",
+    "Month": "Date",
+    "Amount (converted)": "Total",
+    "Probability (%)": "Quantity",
+    "Account Name": "Customer Parent",
+    "Stage": "No mapear",
+}
+
+# Valores posibles de cada columna de Salesforce, con los casos borde de los reportes reales.
+# Los nulos son NaN, como al leer un CSV (iterrows() convierte None en NaN según los tipos
+# de las demás columnas, así que la referencia no está definida para None).
+VALUES = {
+    "Client Leader": [np.nan, "", "  ", "Ana", "Ana Pérez", " Juan Carlos Gómez ", 3.0],
+    "Project Manager": [np.nan, "", " Laura Díaz ", "Pedro", 7],
+    "Month": [
+        np.nan, "", " ", "Feb.2025", "Abr.2024", "Dic2023", "Sep 2025", "2/2025", "12-2024",
+        "0/2025", "13/2025", "00.2025", "Foo.2025", "2025", "sin fecha", 202502.0,
+    ],
+    "Amount (converted)": [
+        np.nan, "", "  ", "$1,234.56", "1.234,56", "-0", "1e3", "nan", "inf", "(100)", "abc",
+        "$ 99", 0, 1500.5, -20.0,
+    ],
+    "Probability (%)": [np.nan, "", "100%", "50", "70 %", "1,00", "abc", 100.0, 50, 70.0, 0, 10],
+    "Account Name": [np.nan, "", "ACME", "Globex", 12],
+    "Stage": ["Closed Won", np.nan],
+}
+
+
+# Lógica anterior de la unificación (el recorrido con iterrows() de app.py), sin los
+# mensajes de depuración. Es la referencia contra la que se compara transform_salesforce.
+def reference_transform(salesforce_df, mapping, target_columns):
+    salesforce_rows = []
+    for idx, row in salesforce_df.iterrows():
+        new_row = {col: None for col in target_columns}
+
+        for sf_col, ns_col in mapping.items():
+            if ns_col != "No mapear" and ns_col in new_row:
+                if (sf_col == "Client Leader" or "Client Leader" in sf_col) and ("_Client Leader AUX" in ns_col or "_Client Leader" in ns_col):
+                    if pd.notna(row[sf_col]) and str(row[sf_col]).strip() != "":
+                        try:
+                            name_str = str(row[sf_col]).strip()
+                            parts = name_str.split(maxsplit=1)
+                            if len(parts) > 1:
+                                new_row[ns_col] = f"{parts[1]}, {parts[0]}"
+                            else:
+                                new_row[ns_col] = name_str
+                        except Exception:
+                            new_row[ns_col] = row[sf_col]
+                elif (sf_col == "Project Manager" or "Project Manager" in sf_col) and ("_PM" in ns_col or ns_col.endswith("PM")):
+                    if pd.notna(row[sf_col]):
+                        try:
+                            new_row[ns_col] = str(row[sf_col]).strip()
+                        except Exception:
+                            new_row[ns_col] = str(row[sf_col])
+                elif (sf_col == "Month" or "Month" in sf_col) and "Date" in ns_col:
+                    if pd.notna(row[sf_col]) and str(row[sf_col]) != "":
+                        try:
+                            month_str = str(row[sf_col])
+                            patterns = [
+                                r'([A-Za-z]+)\.(\d{4})',
+                                r'([A-Za-z]+)(\d{4})',
+                                r'([A-Za-z]+)[^0-9]+(\d{4})',
+                                r'(\d{1,2})[/\-](\d{4})'
+                            ]
+                            month_num = None
+                            year_num = None
+                            for pattern in patterns:
+                                match = re.match(pattern, month_str)
+                                if match:
+                                    part1, part2 = match.groups()
+                                    month_dict = {
+                                        'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+                                        'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12,
+                                        'Ene': 1, 'Feb': 2, 'Mar': 3, 'Abr': 4, 'May': 5, 'Jun': 6,
+                                        'Jul': 7, 'Ago': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dic': 12
+                                    }
+                                    if part1 in month_dict:
+                                        month_num = month_dict[part1]
+                                        year_num = int(part2)
+                                    elif part1.isdigit() and int(part1) >= 1 and int(part1) <= 12:
+                                        month_num = int(part1)
+                                        year_num = int(part2)
+                                    break
+                            if month_num is None or year_num is None:
+                                year_match = re.search(r'(\d{4})', month_str)
+                                if year_match:
+                                    year_num = int(year_match.group(1))
+                                    month_match = re.search(r'(?<!\d)([1-9]|1[0-2])(?!\d)', month_str)
+                                    if month_match:
+                                        month_num = int(month_match.group(1))
+                            if month_num is not None and year_num is not None:
+                                last_day = calendar.monthrange(year_num, month_num)[1]
+                                new_row[ns_col] = f"{last_day:02d}/{month_num:02d}/{year_num}"
+                            else:
+                                new_row[ns_col] = month_str
+                        except Exception:
+                            new_row[ns_col] = row[sf_col]
+                elif ("Amount" in sf_col and "converted" in sf_col) and ("Total" in ns_col):
+                    if pd.notna(row[sf_col]):
+                        try:
+                            value_str = str(row[sf_col])
+                            value_clean = value_str.replace(',', '').replace('$', '').strip()
+                            new_row[ns_col] = float(value_clean) if value_clean else None
+                        except Exception:
+                            new_row[ns_col] = row[sf_col]
+                else:
+                    new_row[ns_col] = row[sf_col]
+
+        if "Total" in new_row and new_row["Total"] is not None and "Quantity" in new_row and new_row["Quantity"] is not None:
+            try:
+                total_value = new_row["Total"]
+                qty_value = new_row["Quantity"]
+                if isinstance(total_value, str):
+                    total_value = total_value.replace(',', '').replace('$', '').strip()
+                    total_value = float(total_value) if total_value else 0
+                if isinstance(qty_value, str):
+                    qty_value = qty_value.replace('%', '').replace(',', '').strip()
+                    qty_value = float(qty_value) if qty_value else 0
+                if isinstance(total_value, (int, float)) and isinstance(qty_value, (int, float)):
+                    new_row["Total USD"] = float(total_value) * (float(qty_value) / 100)
+                    if qty_value == 100:
+                        new_row["Estado"] = "CONFIRMADO"
+                    elif qty_value in [50, 70]:
+                        new_row["Estado"] = "PIPELINE"
+                    else:
+                        new_row["Estado"] = "NO INCLUIR"
+            except Exception:
+                new_row["Total USD"] = None
+                new_row["Estado"] = "NO INCLUIR"
+        else:
+            new_row["Estado"] = "NO INCLUIR"
+
+        salesforce_rows.append(new_row)
+    return pd.DataFrame(salesforce_rows)
+
+
+def random_salesforce(rng, n_rows):
+    data = {}
+    for col, pool in VALUES.items():
+        values = [pool[rng.randrange(len(pool))] for _ in range(n_rows)]
+        data[col] = pd.Series(values, dtype=object)
+        # Las columnas solo de texto a veces llegan con el tipo str, como al leer un CSV
+        if rng.random() < 0.5 and all(isinstance(v, str) or pd.isna(v) for v in values):
+            data[col] = data[col].astype("str")
+    # Índice no consecutivo, como el de un DataFrame filtrado
+    return pd.DataFrame(data, index=rng.sample(range(n_rows * 3), n_rows))
+
+
+def same_value(expected, actual):
+    if not isinstance(expected, str) and pd.isna(expected):
+        return not isinstance(actual, str) and pd.isna(actual)
+    if isinstance(expected, (int, float)) and not isinstance(expected, bool):
+        return isinstance(actual, (int, float, np.number)) and (
+            expected == actual or (np.isinf(expected) and np.isinf(actual) and np.sign(expected) == np.sign(actual))
+        )
+    return expected == actual
+
+
+def assert_equivalent(salesforce_df, mapping, target_columns):
+    expected = reference_transform(salesforce_df, mapping, target_columns)
+    actual = transform_salesforce(salesforce_df, mapping, target_columns)
+    if expected.empty:
+        assert len(actual) == 0
+        return
+    assert set(actual.columns) == set(expected.columns)
+    assert len(actual) == len(expected)
+    for col in expected.columns:
+        for i, (old, new) in enumerate(zip(expected[col].tolist(), actual[col].tolist())):
+            assert same_value(old, new), f"{col}, fila {i}: {old!r} != {new!r}"
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_equivalente_a_iterrows(seed):
+    rng = random.Random(seed)
+    salesforce_df = random_salesforce(rng, rng.randint(1, 40))
+    # Algunas columnas de destino pueden faltar en el reporte de Netsuite
+    target_columns = [col for col in TARGET_COLUMNS if rng.random() < 0.85 or col in ("Total", "Quantity")]
+    if rng.random() < 0.3:
+        target_columns.remove("Quantity")
+    assert_equivalent(salesforce_df, MAPPING, target_columns)
+
+
+def test_equivalente_con_total_usd_previo():
+    rng = random.Random(1234)
+    salesforce_df = random_salesforce(rng, 60)
+    amounts = VALUES["Amount (converted)"]
+    salesforce_df["Total USD"] = [amounts[i % len(amounts)] for i in range(60)]
+    mapping = dict(MAPPING, **{"Total USD": "Total USD"})
+    assert_equivalent(salesforce_df, mapping, TARGET_COLUMNS + ["Total USD"])
+
+
+def test_reporte_vacio():
+    salesforce_df = pd.DataFrame({col: pd.Series([], dtype=object) for col in VALUES})
+    result = transform_salesforce(salesforce_df, MAPPING, TARGET_COLUMNS)
+    assert len(result) == 0
+    assert set(TARGET_COLUMNS) <= set(result.columns)
@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+
+from benchmarks.generate import generate_netsuite, generate_salesforce
+from unificador import streaming
+from unificador.dates import normalize_dates
+from unificador.pipeline import build_mapping, load_reports, unify
+from unificador.schemas import SOURCE_COLUMN
+from unificador.streaming import BASE_MEMORY_MB, stream_unify
+
+NETSUITE_CSV = b"Date,Customer Parent,Total,Quantity\n31/01/2025,ACME,\"1.234,56\",\"2,5\"\n28/02/2025,Globex,\"10,00\",1\n"
+SALESFORCE_CSV = b"Month,Account Name,Amount (converted),Probability (%)\nFeb.2025,ACME,100,50\n"
+
+
+def read_output(summary):
+    return pd.read_parquet(next(path for path in summary["outputs"] if path.endswith(".parquet")))
+
+
+def test_stream_unify_nombres_de_bytes(tmp_path):
+    summary = stream_unify("resultado", [NETSUITE_CSV, NETSUITE_CSV], SALESFORCE_CSV, tmp_path, formats=("parquet",))
+    df = read_output(summary)
+    assert df[SOURCE_COLUMN].tolist() == ["archivo 1"] * 2 + ["archivo 2"] * 2 + ["archivo 1"]
+
+
+# Las categorías de las columnas category se arman en otro orden al leer por partes: se
+# comparan los valores
+def without_categories(df):
+    return df.astype({col: object for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+
+
+# Reportes generados en varios archivos y partes chicas, con algunas oportunidades de
+# Salesforce que ya están en Netsuite (mismo proyecto, cliente y mes)
+@pytest.fixture(scope="module")
+def reports(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp("reportes")
+    netsuite_df = generate_netsuite(3_000, seed=5)
+    salesforce_df = generate_salesforce(1_500, seed=5)
+    booked = netsuite_df.iloc[:300]
+    dates = pd.to_datetime(normalize_dates(booked["Date"]), format="%d/%m/%Y")
+    salesforce_df.loc[:299, "Opportunity Name"] = booked["Project(PLAN)"].to_numpy()
+    salesforce_df.loc[:299, "Account Name"] = booked["Customer Parent"].to_numpy()
+    salesforce_df.loc[:299, "Month"] = dates.dt.strftime("%b.%Y").fillna("").to_numpy()
+    paths = {"netsuite": [], "salesforce": []}
+    for report, df in (("netsuite", netsuite_df), ("salesforce", salesforce_df)):
+        for i, part in enumerate((df.iloc[: len(df) // 3], df.iloc[len(df) // 3:])):
+            paths[report].append(data_dir / f"{report}_{i}.csv")
+            part.to_csv(paths[report][-1], index=False)
+    return paths
+
+
+@pytest.mark.parametrize("policy", ["ninguna", "marcar", "excluir", "eliminar"])
+def test_stream_unify_igual_a_unify(reports, policy, tmp_path, monkeypatch):
+    # Partes de 32 KB: cada archivo se lee en varias partes
+    monkeypatch.setattr(streaming, "MIN_BLOCK_BYTES", 32 * 1024)
+    summary = stream_unify(
+        "resultado", reports["netsuite"], reports["salesforce"], tmp_path, formats=("parquet",),
+        reconcile_policy=policy, memory_mb=BASE_MEMORY_MB,
+    )
+    assert summary["streaming"]["block_bytes"] == 32 * 1024
+    assert summary["streaming"]["chunks"] > 10
+
+    netsuite_df = load_reports(reports["netsuite"], "netsuite")
+    salesforce_df = load_reports(reports["salesforce"], "salesforce")
+    result = unify(netsuite_df, salesforce_df, build_mapping(salesforce_df.columns), reconcile_policy=policy)
+    combined_df = result["combined_df"]
+    pd.testing.assert_frame_equal(without_categories(read_output(summary)), without_categories(combined_df))
+    assert summary["rows"] == len(combined_df)
+    assert summary["reconciliation"] == result["reconciliation"]
+    if policy != "ninguna":
+        assert summary["reconciliation"]["matched"] > 0
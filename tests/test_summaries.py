@@ -0,0 +1,76 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from unificador.reconcile import DUPLICATE_COLUMN
+from unificador.summaries import EMPTY_LABEL, SUMMARY_VALUE, aggregate, build_summaries, month_labels
+
+VALUES = {
+    "Estado": ["CONFIRMADO", "PIPELINE", "NO INCLUIR", "OTRO", None],
+    "Date": ["31/01/2025", "5/2/2025", "28/02/2025", "31/12/2024", "sin fecha", None],
+    "Customer Parent": ["ACME", "Globex", "Initech", None],
+    "_PM": ["Pérez, Juan", "Gómez, Ana", None],
+    "_Client Leader AUX": ["Díaz, Laura", "López, Pedro", "Ruiz, Sofía"],
+    SUMMARY_VALUE: [10.0, 2.5, -7.0, 0.0, np.nan],
+}
+
+
+# Agregados base con un groupby por dimensión: la referencia contra la que se compara
+# aggregate, que agrupa una sola vez
+def reference_aggregate(combined_df):
+    frame = combined_df.reset_index(drop=True)
+    if DUPLICATE_COLUMN in frame.columns:
+        frame = frame[~frame[DUPLICATE_COLUMN].to_numpy(dtype=bool)]
+    frame = frame.assign(Mes=np.asarray(month_labels(frame["Date"]), dtype=object))
+    aggregates = {}
+    for name in ("Mes", "Customer Parent", "_PM", "_Client Leader AUX"):
+        keys = [frame["Estado"].astype(object), frame[name].astype(object)]
+        grouped = frame[SUMMARY_VALUE].groupby(keys, dropna=False, sort=False)
+        base = grouped.agg(["sum", "size"]).reset_index()
+        base.columns = ["Estado", name, SUMMARY_VALUE, "Filas"]
+        for col in ("Estado", name):
+            base[col] = base[col].astype(object).where(base[col].notna(), EMPTY_LABEL)
+        aggregates[name] = base
+    return aggregates
+
+
+def random_result(rng, rows):
+    data = {col: [pool[rng.randrange(len(pool))] for _ in range(rows)] for col, pool in VALUES.items()}
+    df = pd.DataFrame({col: pd.Series(values, dtype=object) for col, values in data.items()})
+    df[SUMMARY_VALUE] = df[SUMMARY_VALUE].astype(float)
+    # Las columnas de texto del resultado a veces son category, como después de compact_columns
+    for col in VALUES:
+        if col != SUMMARY_VALUE and rng.random() < 0.5:
+            df[col] = df[col].astype("category")
+    if rng.random() < 0.5:
+        df[DUPLICATE_COLUMN] = [rng.random() < 0.2 for _ in range(rows)]
+    df.index = rng.sample(range(rows * 3), rows)
+    return df
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_aggregate_igual_a_un_groupby_por_dimension(seed):
+    rng = random.Random(seed)
+    combined_df = random_result(rng, rng.randint(1, 300))
+    expected = reference_aggregate(combined_df)
+    actual = aggregate(combined_df)
+    assert list(actual) == list(expected)
+    for name, base in expected.items():
+        pd.testing.assert_frame_equal(actual[name], base, check_exact=False)
+
+
+def test_aggregate_sin_filas():
+    combined_df = pd.DataFrame({col: pd.Series([], dtype=object) for col in VALUES})
+    assert all(len(base) == 0 for base in aggregate(combined_df).values())
+    assert all(len(table) == 0 for table in build_summaries(combined_df).values())
+
+
+def test_aggregate_sin_estado():
+    assert aggregate(pd.DataFrame({SUMMARY_VALUE: [1.0]})) == {}
+
+
+def test_month_labels():
+    dates = pd.Series(["31/01/2025", "5/2/2025", " 28/02/2025 ", "sin fecha", None])
+    assert list(month_labels(dates)) == ["2025-01", "2025-02", "2025-02", EMPTY_LABEL, EMPTY_LABEL]
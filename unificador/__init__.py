@@ -0,0 +1,32 @@
+from unificador.dates import normalize_dates
+from unificador.diagnostics import Diagnostics
+from unificador.export import build_csv_file, build_excel_file, write_csv, write_excel
+from unificador.mapping import DEFAULT_MAPPING
+from unificador.numeric import NUMERIC_COLUMNS, parse_numeric, parse_numeric_columns
+from unificador.pipeline import build_mapping, load_reports, process_pair, unify, unify_incremental
+from unificador.profiling import StageProfiler
+from unificador.salesforce import NO_MAPEAR, transform_salesforce
+from unificador.schemas import SCHEMAS, match_schema
+
+__all__ = [
+    "DEFAULT_MAPPING",
+    "Diagnostics",
+    "NO_MAPEAR",
+    "NUMERIC_COLUMNS",
+    "SCHEMAS",
+    "StageProfiler",
+    "build_csv_file",
+    "build_excel_file",
+    "build_mapping",
+    "load_reports",
+    "match_schema",
+    "normalize_dates",
+    "parse_numeric",
+    "parse_numeric_columns",
+    "process_pair",
+    "transform_salesforce",
+    "unify",
+    "unify_incremental",
+    "write_csv",
+    "write_excel",
+]
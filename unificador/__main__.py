@@ -0,0 +1,3 @@
+from unificador.cli import main
+
+raise SystemExit(main())
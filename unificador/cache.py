@@ -0,0 +1,63 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+# Hash del contenido de un archivo, usado como clave de caché
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+# Tamaño aproximado en memoria de un DataFrame
+def frame_size(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+# Caché LRU en memoria de DataFrames, con desalojo por tamaño total.
+# Es compartida entre sesiones de Streamlit, por eso las operaciones usan un lock.
+# Los DataFrames se devuelven sin copiar: quien los recibe no debe modificarlos.
+class DataFrameCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, df, size=None):
+        size = frame_size(df) if size is None else size
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (df, size)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def total_bytes(self):
+        return self._total_bytes
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,211 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from unificador.fx import load_fx_rates
+from unificador.pipeline import DEFAULT_FORMATS, OUTPUT_FORMATS, QUALITY_SUFFIX, process_pair
+from unificador.quality import problem_counts
+from unificador.reconcile import RECONCILE_POLICIES
+from unificador.streaming import MIN_MEMORY_MB, stream_unify
+
+
+# CSV de un directorio cuyo nombre empieza con prefix (sin distinguir mayúsculas), ordenados
+def _find_reports(directory, prefix):
+    return sorted(
+        path for path in directory.iterdir()
+        if path.is_file() and path.suffix.lower() == ".csv" and path.name.lower().startswith(prefix)
+    )
+
+
+# Pares de reportes de un directorio: el propio directorio y cada subdirectorio que
+# contengan netsuite*.csv y salesforce*.csv. Si hay varios archivos de un reporte (por
+# ejemplo, uno por subsidiaria o por trimestre) se combinan. El nombre del par es el
+# del directorio.
+def find_pairs(directory):
+    directory = Path(directory)
+    pairs = []
+    for candidate in [directory] + sorted(path for path in directory.iterdir() if path.is_dir()):
+        netsuite = _find_reports(candidate, "netsuite")
+        salesforce = _find_reports(candidate, "salesforce")
+        if netsuite and salesforce:
+            pairs.append({"name": candidate.name, "netsuite": netsuite, "salesforce": salesforce, "mapping": None})
+    return pairs
+
+
+# Pares de reportes de un manifiesto JSON:
+# [{"name": "...", "netsuite": "...", "salesforce": "...", "mapping": {...} o "mapeo.json"}]
+# "netsuite" y "salesforce" pueden ser una ruta o una lista de rutas que se combinan.
+# Las rutas relativas se resuelven desde el directorio del manifiesto. El mapeo es
+# opcional y puede ser el JSON guardado desde la aplicación.
+def load_manifest(path):
+    path = Path(path)
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    pairs = []
+    for index, entry in enumerate(entries):
+        mapping = entry.get("mapping")
+        if isinstance(mapping, str):
+            with open(path.parent / mapping, encoding="utf-8") as f:
+                mapping = json.load(f)
+        pairs.append({
+            "name": entry.get("name") or f"par_{index + 1}",
+            "netsuite": _manifest_paths(path.parent, entry["netsuite"]),
+            "salesforce": _manifest_paths(path.parent, entry["salesforce"]),
+            "mapping": mapping,
+        })
+    return pairs
+
+
+def _manifest_paths(base, value):
+    if isinstance(value, list):
+        return [base / item for item in value]
+    return [base / value]
+
+
+def _format_summary(summary):
+    timings = summary["timings"]
+    stages = ", ".join(f"{stage} {seconds:.2f} s" for stage, seconds in timings.items() if stage != "total")
+    line = f"✔ {summary['name']}: {summary['rows']:,} filas en {timings['total']:.2f} s ({stages})"
+    streaming = summary.get("streaming")
+    if streaming is not None:
+        line += (f"\n    por partes: {streaming['chunks']:,} partes de hasta {streaming['block_bytes'] / 1024 ** 2:.1f} MB "
+                 f"de CSV (presupuesto {streaming['memory_mb']:,} MB)")
+    if summary["netsuite_files"] > 1 or summary["salesforce_files"] > 1:
+        line += (f"\n    archivos combinados: {summary['netsuite_files']} de Netsuite, "
+                 f"{summary['salesforce_files']} de Salesforce")
+    reconciliation = summary["reconciliation"]
+    if reconciliation is not None:
+        line += (f"\n    conciliación ({reconciliation['policy']}): "
+                 f"{reconciliation['matched']:,} filas de Salesforce ya estaban en Netsuite")
+    incremental = summary["incremental"]
+    if incremental is not None:
+        if incremental["full"]:
+            line += f"\n    unificación completa: {incremental['reason']}"
+        else:
+            line += (f"\n    incremental: {incremental['reprocessed']:,} filas reprocesadas, "
+                     f"{incremental['reused']:,} reutilizadas, {incremental['discarded']:,} descartadas")
+    fx = summary.get("fx")
+    if fx is not None:
+        line += (f"\n    tipos de cambio: {fx['rows']:,} filas de Salesforce completadas"
+                 + (f", {fx['missing']:,} sin tipo de cambio" if fx["missing"] else ""))
+    quality = summary.get("quality")
+    if quality is not None:
+        counts = problem_counts(quality)
+        detail = ", ".join(f"{control.lower()}: {rows:,}" for control, rows in counts.items()) or "sin problemas"
+        line += f"\n    calidad: {detail} (detalle en {summary['name']}{QUALITY_SUFFIX})"
+    history = summary.get("history")
+    if history is not None:
+        line += f"\n    historial: corrida {history['run']} guardada"
+        if history["previous"] is not None:
+            counts = ", ".join(f"{name.lower()}: {rows:,}" for name, rows in history["rows"].items() if name != "Movimiento por cliente")
+            line += f"; frente a {history['previous']}: {counts}; Total USD del forecast {history['movement']:+,.2f}"
+    return line
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m unificador",
+        description="Unifica pares de reportes de Netsuite y Salesforce sin la interfaz de Streamlit.",
+    )
+    parser.add_argument("source", help="Directorio con los pares de reportes o manifiesto JSON")
+    parser.add_argument("-o", "--output", default="unificados", help="Directorio de salida (por defecto: unificados)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Cantidad de procesos en paralelo (por defecto: un proceso por CPU)")
+    parser.add_argument("--formats", nargs="+", choices=list(OUTPUT_FORMATS), default=list(DEFAULT_FORMATS),
+                        help="Formatos de salida (por defecto: xlsx csv; parquet requiere pyarrow)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Reprocesar solo las filas nuevas o modificadas desde la ejecución anterior "
+                             "(el estado se guarda junto a cada resultado)")
+    parser.add_argument("--conciliar", choices=list(RECONCILE_POLICIES), default="ninguna",
+                        help="Qué hacer con las filas de Salesforce que ya están en Netsuite (mismo proyecto, "
+                             "cliente y mes): " + "; ".join(f"{key}: {label}" for key, label in RECONCILE_POLICIES.items()))
+    parser.add_argument("--resumenes-csv", action="store_true",
+                        help="Escribir también cada resumen (los de las hojas adicionales del XLSX) como CSV separado")
+    parser.add_argument("--memoria-mb", type=int, default=None,
+                        help="Procesar por partes sin cargar los reportes completos, con este presupuesto de "
+                             "memoria (en MB) por par: para resultados que no entran en memoria")
+    parser.add_argument("--historial", default=None,
+                        help="Guardar cada resultado en este directorio de historial (Parquet particionado, un "
+                             "subdirectorio por par) y escribir las diferencias con la corrida anterior; requiere pyarrow")
+    parser.add_argument("--tipos-cambio", default=None,
+                        help="CSV o Parquet con los tipos de cambio (moneda, fecha y USD por unidad de la moneda) "
+                             "para completar FX Rate, FX Rate Item y Consolidated FX Rate en las filas de Salesforce; "
+                             "vale el último tipo de cambio hasta el fin de mes de cada fila")
+    parser.add_argument("--corrida", default=None,
+                        help="Nombre de la corrida en el historial (por defecto, la fecha de hoy); si ya existe se reemplaza")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers debe ser al menos 1")
+    if args.memoria_mb is not None and args.memoria_mb < MIN_MEMORY_MB:
+        parser.error(f"--memoria-mb debe ser al menos {MIN_MEMORY_MB}")
+    if args.memoria_mb is not None and args.incremental:
+        parser.error("--memoria-mb no se puede combinar con --incremental")
+    if args.corrida is not None and args.historial is None:
+        parser.error("--corrida requiere --historial")
+    return args
+
+
+# Historial de un par: un subdirectorio de --historial con el nombre del par
+def _history_dir(args, pair):
+    return Path(args.historial) / pair["name"] if args.historial is not None else None
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    source = Path(args.source)
+    pairs = find_pairs(source) if source.is_dir() else load_manifest(source)
+    if not pairs:
+        print(f"No se encontraron pares de reportes en {source}", file=sys.stderr)
+        return 1
+
+    fx_rates = None
+    if args.tipos_cambio is not None:
+        try:
+            fx_rates = load_fx_rates(args.tipos_cambio)
+        except (OSError, ValueError, ImportError) as e:
+            print(f"No se pudieron leer los tipos de cambio de {args.tipos_cambio}: {e}", file=sys.stderr)
+            return 1
+        if fx_rates.skipped:
+            print(f"Tipos de cambio: {fx_rates.skipped:,} filas sin moneda, fecha o tipo de cambio válidos se ignoraron")
+
+    workers = min(args.workers, len(pairs))
+    print(f"Procesando {len(pairs)} par(es) de reportes con {workers} proceso(s)...")
+    start = time.perf_counter()
+    failures = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        if args.memoria_mb is not None:
+            futures = {
+                executor.submit(
+                    stream_unify, pair["name"], pair["netsuite"], pair["salesforce"], args.output, pair["mapping"],
+                    args.formats, args.conciliar, args.resumenes_csv, args.memoria_mb,
+                    history_dir=_history_dir(args, pair), run=args.corrida, fx_rates=fx_rates,
+                ): pair["name"]
+                for pair in pairs
+            }
+        else:
+            futures = {
+                executor.submit(
+                    process_pair, pair["name"], pair["netsuite"], pair["salesforce"],
+                    args.output, pair["mapping"], args.formats, args.incremental, args.conciliar, args.resumenes_csv,
+                    _history_dir(args, pair), args.corrida, fx_rates,
+                ): pair["name"]
+                for pair in pairs
+            }
+        for future in as_completed(futures):
+            try:
+                summary = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"✘ {futures[future]}: {e}", file=sys.stderr)
+                continue
+            print(_format_summary(summary))
+            for warning in summary["warnings"] + summary.get("column_warnings", []):
+                print(f"    {warning}")
+
+    print(f"{len(pairs) - failures} de {len(pairs)} par(es) unificados en {time.perf_counter() - start:.2f} s")
+    return 1 if failures else 0
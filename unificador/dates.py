@@ -0,0 +1,118 @@
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from unificador.salesforce import MONTH_NUMBERS
+
+# Formatos de fecha reconocidos (se normalizan a DD/MM/YYYY)
+DATE_PATTERNS = {
+    # DD/MM/YYYY (también MM/DD/YYYY, que se trata igual)
+    "dd_mm_yyyy": r'^(\d{1,2})[/\-\.](\d{1,2})[/\-\.](\d{4})$',
+    # YYYY/MM/DD
+    "yyyy_mm_dd": r'^(\d{4})[/\-\.](\d{1,2})[/\-\.](\d{1,2})$',
+    # DD-MMM-YYYY o DD MMM YYYY
+    "dd_mmm_yyyy": r'^(\d{1,2})[\s\-\.]+([A-Za-z]{3})[\s\-\.]+(\d{4})$',
+}
+
+# Fechas que ya están en el formato unificado y no hace falta volver a procesar
+_NORMALIZED = r'^[0-9]{2}/[0-9]{2}/[0-9]{4}$'
+
+# Formatos que se prueban con datetime para los valores que no coinciden con ningún patrón
+_FALLBACK_FORMATS = ["%d/%m/%Y", "%m/%d/%Y", "%Y-%m-%d", "%d-%m-%Y", "%m-%d-%Y"]
+
+# Fecha DD/MM/YYYY, con el mes y el año como grupos
+_DATE_MONTH = re.compile(r'^\d{1,2}/(\d{1,2})/(\d{4})$')
+
+_SAMPLE_SIZE = 200
+
+
+def _two_digits(parts):
+    return parts.astype(int).astype(str).str.zfill(2)
+
+
+# Convertir las coincidencias de un patrón (grupos extraídos) a DD/MM/YYYY
+def _format_matches(pattern_name, groups):
+    if pattern_name == "dd_mm_yyyy":
+        day, month, year = groups[0], groups[1], groups[2]
+        return _two_digits(day) + "/" + _two_digits(month) + "/" + year
+    if pattern_name == "yyyy_mm_dd":
+        year, month, day = groups[0], groups[1], groups[2]
+        return _two_digits(day) + "/" + _two_digits(month) + "/" + year
+    day, month_str, year = groups[0], groups[1], groups[2]
+    month = month_str.map(MONTH_NUMBERS).fillna(1).astype(int).astype(str).str.zfill(2)
+    return _two_digits(day) + "/" + month + "/" + year
+
+
+# Último recurso para un valor que no coincide con ningún patrón: probar con datetime y,
+# si tampoco funciona, devolver el valor original
+def _fallback(date_str):
+    for fmt in _FALLBACK_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt).strftime("%d/%m/%Y")
+        except ValueError:
+            continue
+    return date_str
+
+
+# Mes (YYYY-MM) de una fecha DD/MM/YYYY, o None si el valor no tiene ese formato. Es la
+# clave de mes de los resúmenes, la conciliación y el control de calidad de las fechas.
+def month_of(value):
+    match = _DATE_MONTH.match(str(value).strip())
+    if match is None:
+        return None
+    return f"{match.group(2)}-{int(match.group(1)):02d}"
+
+
+# Detectar los formatos presentes en una muestra, del más frecuente al menos frecuente
+def detect_date_formats(texts):
+    sample = texts.iloc[:_SAMPLE_SIZE]
+    counts = {name: int(sample.str.match(pattern).sum()) for name, pattern in DATE_PATTERNS.items()}
+    return sorted(DATE_PATTERNS, key=lambda name: -counts[name])
+
+
+# Normalizar una columna de fechas a DD/MM/YYYY. Trabaja sobre los valores únicos:
+# detecta el formato dominante una sola vez, convierte en bloque con cada patrón y solo
+# los valores restantes pasan por el camino lento. Las fechas ya normalizadas no se
+# vuelven a procesar. Los nulos y vacíos quedan como None. Si la columna es category, el
+# resultado también lo es.
+# Tanto para "netsuite" como para "salesforce" el primer número de DD/MM/YYYY es el día:
+# si el mes es > 12 el formato es claramente DD/MM/YYYY y, en caso de duda, se mantiene.
+def normalize_dates(values, source_format="netsuite"):
+    values = pd.Series(values)
+    categorical = isinstance(values.dtype, pd.CategoricalDtype)
+    if categorical:
+        # En una columna category basta con convertir sus categorías
+        codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    converted = np.empty(len(uniques) + 1, dtype=object)
+    converted[-1] = None
+
+    raw = pd.Series(np.asarray(uniques, dtype=object), dtype=object).astype(str)
+    texts = raw.str.strip()
+    converted[:-1] = texts.to_numpy(dtype=object)
+    converted[:-1][(raw == "").to_numpy()] = None
+
+    pending = (raw != "") & ~texts.str.match(_NORMALIZED)
+    if pending.any():
+        for pattern_name in detect_date_formats(texts[pending]):
+            if not pending.any():
+                break
+            groups = texts[pending].str.extract(DATE_PATTERNS[pattern_name])
+            matched = groups[0].notna()
+            if matched.any():
+                formatted = _format_matches(pattern_name, groups[matched])
+                converted[formatted.index.to_numpy()] = formatted.to_numpy(dtype=object)
+                pending[formatted.index] = False
+
+        for i in np.flatnonzero(pending.to_numpy()):
+            converted[i] = _fallback(converted[i])
+
+    if categorical:
+        # Las fechas categóricas siguen siendo category, sin expandir los textos por fila
+        normalized = pd.Categorical(converted)
+        normalized = pd.Categorical.from_codes(normalized.codes[codes], dtype=normalized.dtype)
+        return pd.Series(normalized, index=values.index, name=values.name)
+    return pd.Series(converted[codes], index=values.index, name=values.name, dtype=object)
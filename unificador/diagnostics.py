@@ -0,0 +1,98 @@
+import json
+import random
+import threading
+
+import pandas as pd
+
+# Cantidad máxima de ejemplos que se guardan por categoría
+SAMPLE_SIZE = 20
+
+LEVEL_ICONS = {"info": "ℹ️", "warning": "⚠️"}
+
+
+# Colector de diagnósticos de una unificación: cuenta los eventos por categoría y guarda
+# una muestra acotada de mensajes de cada una (reservoir sampling, algoritmo R), de modo
+# que la memoria no crece con la cantidad de filas. Cada unificación usa su propia
+# instancia; el lock permite registrar eventos desde varios hilos.
+class Diagnostics:
+    def __init__(self, sample_size=SAMPLE_SIZE, seed=None):
+        self.sample_size = sample_size
+        self._categories = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    # El lock no se puede serializar: se descarta al enviar los diagnósticos a otro
+    # proceso (por ejemplo, desde los procesos del CLI) y se crea uno nuevo al recibirlos
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    # Registrar un evento. count es la cantidad de filas que representa el mensaje
+    # (p. ej. todas las filas con el mismo valor convertido).
+    def record(self, level, category, message, count=1):
+        with self._lock:
+            entry = self._categories.get(category)
+            if entry is None:
+                entry = {"level": level, "events": 0, "messages": 0, "samples": []}
+                self._categories[category] = entry
+            entry["events"] += count
+            entry["messages"] += 1
+            # Algoritmo R: el mensaje n reemplaza a uno de la muestra con probabilidad k/n
+            if len(entry["samples"]) < self.sample_size:
+                entry["samples"].append(message)
+            else:
+                slot = self._random.randrange(entry["messages"])
+                if slot < self.sample_size:
+                    entry["samples"][slot] = message
+
+    def info(self, category, message, count=1):
+        self.record("info", category, message, count)
+
+    def warning(self, category, message, count=1):
+        self.record("warning", category, message, count)
+
+    def count(self, category):
+        entry = self._categories.get(category)
+        return entry["events"] if entry is not None else 0
+
+    def has_warnings(self):
+        return any(entry["level"] == "warning" for entry in self._categories.values())
+
+    # Tabla resumen: una fila por categoría, con las advertencias primero
+    def summary(self):
+        with self._lock:
+            rows = [
+                {
+                    "Nivel": f"{LEVEL_ICONS.get(entry['level'], '')} {entry['level']}",
+                    "Categoría": category,
+                    "Filas": entry["events"],
+                    "Mensajes": entry["messages"],
+                    "Ejemplo": entry["samples"][0] if entry["samples"] else "",
+                }
+                for category, entry in sorted(self._categories.items(), key=lambda item: item[1]["level"] != "warning")
+            ]
+        return pd.DataFrame(rows, columns=["Nivel", "Categoría", "Filas", "Mensajes", "Ejemplo"])
+
+    # Detalle completo: los conteos y los mensajes de muestra de cada categoría
+    def to_dict(self):
+        with self._lock:
+            return {
+                category: {
+                    "level": entry["level"],
+                    "rows": entry["events"],
+                    "messages": entry["messages"],
+                    "samples": list(entry["samples"]),
+                }
+                for category, entry in self._categories.items()
+            }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+    def __len__(self):
+        return len(self._categories)
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+# Columnas del resultado que se pueden filtrar por valor
+FILTER_COLUMNS = ["Estado", "Customer Parent", "_PM"]
+
+# Columna de fechas (DD/MM/YYYY) que se filtra por rango
+DATE_COLUMN = "Date"
+
+# Filas por página si no se indica otra cantidad
+PAGE_SIZE = 50
+
+
+# Fechas DD/MM/YYYY como datetime64; las que no se pueden interpretar quedan como NaT.
+# En una columna category se interpretan solo sus categorías.
+def _parse_dates(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = pd.to_datetime(pd.Series(values.cat.categories, dtype=object), format="%d/%m/%Y", errors="coerce")
+        parsed = np.append(categories.to_numpy(dtype="datetime64[ns]"), np.datetime64("NaT", "ns"))
+        return parsed[values.cat.codes.to_numpy()]
+    return pd.to_datetime(values.astype(object), format="%d/%m/%Y", errors="coerce").to_numpy(dtype="datetime64[ns]")
+
+
+# Valores distintos hasta los que conviene ordenar una columna numérica por sus códigos
+_RADIX_VALUES = 2 ** 16
+
+
+# Posiciones de las filas ordenadas por values (los nulos al final; en un empate se
+# conserva el orden original). Se ordenan códigos enteros, que con pocos valores distintos
+# numpy ordena por radix, mucho más rápido que comparando: en las category, el orden de
+# sus categorías (compact_columns las deja ordenadas); en las fechas, el día; en el texto y
+# en los números, el puesto de cada valor distinto. Los números con demasiados valores
+# distintos se ordenan directamente como float.
+def _sort_order(values, ascending, dates=None):
+    if dates is not None:
+        codes, uniques = pd.factorize(dates, sort=True)
+    elif isinstance(values.dtype, pd.CategoricalDtype):
+        codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+    elif pd.api.types.is_numeric_dtype(values):
+        numbers = values.to_numpy(dtype=float)
+        codes, uniques = pd.factorize(numbers)
+        if len(uniques) >= _RADIX_VALUES:
+            return np.argsort(numbers if ascending else -numbers, kind="stable")
+        ranks = np.empty(len(uniques), dtype=np.int64)
+        ranks[np.argsort(uniques, kind="stable")] = np.arange(len(uniques))
+        codes = np.where(codes >= 0, ranks[codes], -1)
+    else:
+        codes, uniques = pd.factorize(values.astype(object), sort=True)
+    count = len(uniques)
+    keys = codes.astype(np.min_scalar_type(count))
+    if not ascending:
+        keys = (count - 1 - keys).astype(keys.dtype)
+    keys[codes < 0] = count
+    return np.argsort(keys, kind="stable")
+
+
+# Índice de un resultado unificado para explorarlo por páginas sin mandar todas las filas
+# al navegador. Se arma una vez por resultado: los códigos de cada columna de
+# FILTER_COLUMNS y las fechas interpretadas de DATE_COLUMN. Así cada filtro es una
+# operación vectorizada sobre enteros y cada orden (un argsort por columna y sentido) se
+# calcula la primera vez que se pide y se reutiliza. El DataFrame no se copia ni se
+# modifica.
+class ResultIndex:
+    def __init__(self, df):
+        self.df = df
+        self._codes = {}
+        self.options = {}
+        for col in FILTER_COLUMNS:
+            if col not in df.columns:
+                continue
+            values = df[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes, categories = values.cat.codes.to_numpy(), values.cat.categories
+            else:
+                codes, categories = pd.factorize(values, sort=True)
+            self._codes[col] = codes
+            self.options[col] = list(categories)
+        self.dates = _parse_dates(df[DATE_COLUMN]) if DATE_COLUMN in df.columns else None
+        self._orders = {}
+
+    def __len__(self):
+        return len(self.df)
+
+    # Primera y última fecha del resultado (None si no hay fechas)
+    def date_range(self):
+        if self.dates is None or np.isnat(self.dates).all():
+            return None
+        return pd.Timestamp(np.nanmin(self.dates)).date(), pd.Timestamp(np.nanmax(self.dates)).date()
+
+    # Filas que cumplen los filtros, como máscara booleana. filters es {columna: valores
+    # elegidos} (una lista vacía no filtra); start y end limitan las fechas, incluidas. Con
+    # un rango de fechas las filas sin fecha quedan fuera.
+    def filter(self, filters=None, start=None, end=None):
+        mask = np.ones(len(self.df), dtype=bool)
+        for col, selected in (filters or {}).items():
+            if not selected or col not in self._codes:
+                continue
+            # Tabla de categorías elegidas; la última posición es la de los nulos (código -1)
+            allowed = np.zeros(len(self.options[col]) + 1, dtype=bool)
+            positions = pd.Index(self.options[col]).get_indexer(list(selected))
+            allowed[positions[positions >= 0]] = True
+            mask &= allowed[self._codes[col]]
+        if self.dates is not None:
+            if start is not None:
+                mask &= self.dates >= np.datetime64(pd.Timestamp(start), "ns")
+            if end is not None:
+                mask &= self.dates <= np.datetime64(pd.Timestamp(end), "ns")
+        return mask
+
+    # Posiciones de todas las filas ordenadas por col (los nulos al final; en un empate se
+    # conserva el orden del resultado)
+    def order(self, col, ascending=True):
+        key = (col, ascending)
+        if key not in self._orders:
+            dates = self.dates if col == DATE_COLUMN else None
+            self._orders[key] = _sort_order(self.df[col], ascending, dates)
+        return self._orders[key]
+
+    # Página number (desde 0) de las filas de mask, ordenadas por sort_by (o en el orden del
+    # resultado). Devuelve (filas de la página, total de filas que cumplen los filtros).
+    def page(self, mask, sort_by=None, ascending=True, number=0, page_size=PAGE_SIZE):
+        if sort_by is None:
+            rows = np.flatnonzero(mask)
+        else:
+            order = self.order(sort_by, ascending)
+            rows = order[mask[order]]
+        start = number * page_size
+        return self.df.iloc[rows[start:start + page_size]], len(rows)
@@ -0,0 +1,380 @@
+import gzip
+import io
+import tempfile
+import zipfile
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+# pyarrow es opcional: solo se necesita para el formato Parquet
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from unificador.numeric import NUMERIC_COLUMNS, format_number
+from unificador.summaries import summary_slug
+
+# Límite de filas de una hoja de Excel (incluye la fila de encabezados)
+EXCEL_MAX_ROWS = 1048576
+
+# Los archivos temporales pasan a disco cuando superan este tamaño
+SPOOL_MAX_BYTES = 64 * 1024 ** 2
+
+_CHUNK_ROWS = 10000
+
+# Formatos de compresión disponibles para el CSV: (extensión, tipo MIME)
+CSV_COMPRESSIONS = {
+    None: (".csv", "text/csv"),
+    "gzip": (".csv.gz", "application/gzip"),
+    "zip": (".zip", "application/zip"),
+}
+
+_CSV_CHUNK_ROWS = 100000
+
+_PARQUET_ROW_GROUP = 128 * 1024
+
+
+# Formatos para cada tipo de estado
+_ESTADO_FORMATS = {
+    "CONFIRMADO": {'bg_color': '#C6EFCE', 'font_color': '#006100'},  # Verde claro
+    "PIPELINE": {'bg_color': '#FFEB9C', 'font_color': '#9C6500'},    # Amarillo
+    "NO INCLUIR": {'bg_color': '#FFC7CE', 'font_color': '#9C0006'},  # Rojo claro
+}
+
+
+# Función para formatear números específicamente para Excel
+def format_number_for_excel(value):
+    try:
+        if pd.isna(value):
+            return ""
+            
+        # Si es un número o puede convertirse a uno
+        try:
+            # Primero limpiar el valor usando la función anterior
+            cleaned_value = format_number(value)
+            # Convertir a número
+            num_value = float(cleaned_value)
+            
+            # Formatear el número con el formato español (coma como decimal)
+            # Y asegurar que tenga comillas para que Excel no lo convierta
+            if num_value == int(num_value):
+                # Es un entero
+                formatted = f'"{int(num_value)}"'
+            else:
+                # Es un decimal - usar 2 decimales y coma como separador
+                formatted = f'"{str(num_value).replace(".", ",")}"'
+                
+            return formatted
+        except:
+            # Si no se puede convertir a número, devolver como string con comillas
+            return f'"{str(value)}"'
+    except (ValueError, TypeError):
+        # Si no se puede formatear (p. ej. pd.isna de una lista), devolver el valor original
+        return value
+
+
+# Nombre de la hoja n (0, 1, ...) cuando los datos se reparten en varias hojas
+def _sheet_name(base_name, index):
+    if index == 0:
+        return base_name
+    suffix = f" ({index + 1})"
+    return base_name[:31 - len(suffix)] + suffix
+
+
+# Crear una hoja con encabezados, formato numérico y formato condicional de Estado
+def _add_data_sheet(workbook, name, columns, n_rows, formats):
+    worksheet = workbook.add_worksheet(name)
+
+    # El formato de columna se define antes de escribir filas (modo constant_memory)
+    for col in NUMERIC_COLUMNS:
+        if col in columns:
+            col_idx = columns.index(col)
+            worksheet.set_column(col_idx, col_idx, None, formats["number"])
+
+    worksheet.write_row(0, 0, columns, formats["header"])
+
+    if "Estado" in columns and n_rows > 0:
+        estado_col_idx = columns.index("Estado")
+        for estado, estado_format in formats["estado"].items():
+            worksheet.conditional_format(1, estado_col_idx, n_rows, estado_col_idx, {
+                'type': 'cell',
+                'criteria': 'equal to',
+                'value': f'"{estado}"',
+                'format': estado_format
+            })
+    return worksheet
+
+
+# Hoja con una tabla de resumen (ver summaries.build_summaries): encabezados fijos,
+# montos con separador de miles y porcentajes
+def _add_summary_sheet(workbook, name, table, formats):
+    worksheet = workbook.add_worksheet(name)
+    columns = [str(col) for col in table.columns]
+    for col_idx, col in enumerate(columns):
+        dtype = table.dtypes.iloc[col_idx]
+        if col.startswith("%"):
+            worksheet.set_column(col_idx, col_idx, 14, formats["percent"])
+        elif col == "Filas":
+            worksheet.set_column(col_idx, col_idx, 10, formats["count"])
+        elif pd.api.types.is_integer_dtype(dtype):
+            worksheet.set_column(col_idx, col_idx, 14, formats["count"])
+        elif pd.api.types.is_float_dtype(dtype):
+            worksheet.set_column(col_idx, col_idx, 16, formats["number"])
+        else:
+            worksheet.set_column(col_idx, col_idx, 28)
+    worksheet.write_row(0, 0, columns, formats["header"])
+    worksheet.freeze_panes(1, 1)
+    values = table.astype(object).where(table.notna(), None)
+    for row_idx, row in enumerate(values.to_numpy().tolist(), start=1):
+        worksheet.write_row(row_idx, 0, row)
+    return worksheet
+
+
+# Formatos compartidos por las hojas de datos y de resumen de un libro
+def _workbook_formats(workbook):
+    return {
+        "header": workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'}),
+        "number": workbook.add_format({'num_format': '#,##0.00'}),
+        "count": workbook.add_format({'num_format': '#,##0'}),
+        "percent": workbook.add_format({'num_format': '0.0%'}),
+        "estado": {estado: workbook.add_format(fmt) for estado, fmt in _ESTADO_FORMATS.items()},
+    }
+
+
+# Escritor de XLSX por partes, fila por fila en modo constant_memory de xlsxwriter: la
+# memoria no crece con la cantidad de filas. Las filas se escriben a medida que llegan
+# (write) y, al superar el límite de filas de Excel, siguen en una hoja nueva. Si se
+# conoce total_rows, el formato condicional de Estado cubre solo las filas con datos.
+# close(summaries) agrega las hojas de resumen y cierra el archivo.
+class ExcelStreamWriter:
+    def __init__(self, output, columns, sheet_name="Datos Unificados", total_rows=None):
+        self.workbook = xlsxwriter.Workbook(output, {
+            'constant_memory': True,
+            'nan_inf_to_errors': True,
+            'default_date_format': 'dd/mm/yyyy',
+        })
+        self.formats = _workbook_formats(self.workbook)
+        self.columns = [str(col) for col in columns]
+        self.sheet_name = sheet_name
+        self.total_rows = total_rows
+        self.rows_per_sheet = EXCEL_MAX_ROWS - 1
+        self.rows = 0
+        self._sheets = 0
+        self._worksheet = None
+        self._row_idx = 0
+
+    def _next_sheet(self):
+        remaining = self.rows_per_sheet if self.total_rows is None else self.total_rows - self.rows
+        self._worksheet = _add_data_sheet(
+            self.workbook, _sheet_name(self.sheet_name, self._sheets), self.columns,
+            min(self.rows_per_sheet, remaining), self.formats,
+        )
+        self._sheets += 1
+        self._row_idx = 1
+
+    def write(self, df):
+        for start in range(0, len(df), _CHUNK_ROWS):
+            chunk = df.iloc[start:start + _CHUNK_ROWS]
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            for values in chunk.to_numpy().tolist():
+                if self._worksheet is None or self._row_idx > self.rows_per_sheet:
+                    self._next_sheet()
+                self._worksheet.write_row(self._row_idx, 0, values)
+                self._row_idx += 1
+                self.rows += 1
+
+    def close(self, summaries=None):
+        if self._worksheet is None:
+            # Sin filas: la hoja de datos queda solo con los encabezados
+            self._next_sheet()
+        for index, (name, table) in enumerate((summaries or {}).items()):
+            worksheet = _add_summary_sheet(self.workbook, name, table, self.formats)
+            if index == 0:
+                worksheet.activate()
+        self.workbook.close()
+
+
+# Escribir un DataFrame como XLSX con ExcelStreamWriter: si los datos superan el límite
+# de filas de Excel se reparten automáticamente en varias hojas. summaries (nombre →
+# DataFrame, ver summaries.build_summaries) se agregan como hojas después de los datos y
+# la primera queda activa al abrir el archivo. progress (un jobs.Progress, opcional)
+# recibe el avance después de cada bloque de filas.
+def write_excel(df, output, sheet_name="Datos Unificados", progress=None, summaries=None):
+    writer = ExcelStreamWriter(output, df.columns, sheet_name, total_rows=len(df))
+    for start in range(0, len(df), _CHUNK_ROWS):
+        writer.write(df.iloc[start:start + _CHUNK_ROWS])
+        if progress is not None:
+            progress.advance(min(start + _CHUNK_ROWS, len(df)) / len(df))
+    writer.close(summaries)
+
+
+# Generar el XLSX en un archivo temporal (en memoria hasta SPOOL_MAX_BYTES, luego en disco)
+def build_excel_file(df, sheet_name="Datos Unificados", progress=None, summaries=None):
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    try:
+        write_excel(df, output, sheet_name, progress, summaries)
+    except BaseException:
+        # Cancelado o con error: el archivo temporal se descarta
+        output.close()
+        raise
+    output.seek(0)
+    return output
+
+
+# Escribir tablas chicas (nombre → DataFrame, como el reporte de calidad) como un XLSX
+# con una hoja por tabla, con el mismo formato que las hojas de resumen
+def write_tables_excel(tables, output):
+    workbook = xlsxwriter.Workbook(output, {'nan_inf_to_errors': True})
+    formats = _workbook_formats(workbook)
+    for name, table in tables.items():
+        _add_summary_sheet(workbook, name, table, formats)
+    workbook.close()
+
+
+# Generar el XLSX de write_tables_excel en un archivo temporal
+def build_tables_excel_file(tables):
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    write_tables_excel(tables, output)
+    output.seek(0)
+    return output
+
+
+# Leer el contenido completo de un archivo temporal generado para descarga
+def read_file(output):
+    output.seek(0)
+    return output.read()
+
+
+# Versión vectorizada de format_number_for_excel para una columna completa: los números
+# enteros quedan como "1234" y los decimales con coma ("1234,5"), entre comillas.
+# Los nulos se conservan. Las columnas no numéricas se formatean sobre los valores únicos.
+def format_numbers_for_excel(values):
+    if pd.api.types.is_bool_dtype(values) or not pd.api.types.is_numeric_dtype(values):
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        formatted = np.empty(len(uniques) + 1, dtype=object)
+        for i, value in enumerate(uniques):
+            formatted[i] = format_number_for_excel(value)
+        formatted[-1] = np.nan
+        return pd.Series(formatted[codes], index=values.index, name=values.name, dtype=object)
+
+    numbers = values.to_numpy(dtype=float)
+    formatted = np.full(len(numbers), np.nan, dtype=object)
+    present = ~np.isnan(numbers)
+    whole = present & np.isfinite(numbers) & (np.trunc(numbers) == numbers) & (np.abs(numbers) < 2 ** 63)
+    decimal = present & ~whole
+    if whole.any():
+        formatted[whole] = '"' + pd.Series(numbers[whole].astype(np.int64)).astype(str).to_numpy(dtype=object) + '"'
+    if decimal.any():
+        # repr de float (como str()), con coma como separador decimal. Los montos se repiten
+        # mucho: se formatea cada valor distinto una vez y se expande a sus filas.
+        codes, uniques = pd.factorize(numbers[decimal])
+        texts = pd.Series([repr(number) for number in uniques.tolist()], dtype=object)
+        texts = '"' + texts.str.replace(".", ",", regex=False).to_numpy(dtype=object) + '"'
+        formatted[decimal] = texts[codes]
+    # Enteros enormes o infinitos: mismo resultado que la versión por celda
+    for i in np.flatnonzero(present & ~whole & (~np.isfinite(numbers) | (np.abs(numbers) >= 2 ** 63))):
+        formatted[i] = format_number_for_excel(numbers[i])
+    return pd.Series(formatted, index=values.index, name=values.name, dtype=object)
+
+
+# Escribir el CSV para Excel por bloques: separador ";", números con coma decimal y
+# entre comillas en las columnas numéricas. output es un archivo binario. Con
+# header=False se omiten los encabezados (para seguir un CSV escrito por partes).
+def write_csv(df, output, chunk_rows=_CSV_CHUNK_ROWS, header=True):
+    text_output = io.TextIOWrapper(output, encoding="utf-8", newline="")
+    numeric_columns = [col for col in NUMERIC_COLUMNS if col in df.columns]
+    for start in range(0, max(len(df), 1), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        chunk = chunk.assign(**{col: format_numbers_for_excel(chunk[col]) for col in numeric_columns})
+        # Asegurar que los números no se conviertan a notación científica
+        chunk.to_csv(text_output, index=False, header=header and start == 0, sep=';', float_format='%.10f')
+    text_output.flush()
+    text_output.detach()
+
+
+# Tipo de pyarrow de cada columna del resultado. Se fija a partir de los tipos de pandas
+# (y no de los valores) para que todas las partes de un Parquet escrito por partes
+# tengan el mismo esquema, aunque alguna tenga una columna vacía.
+def parquet_type(dtype):
+    if isinstance(dtype, pd.CategoricalDtype):
+        return pa.dictionary(pa.int32(), pa.string())
+    if pd.api.types.is_bool_dtype(dtype):
+        return pa.bool_()
+    if pd.api.types.is_integer_dtype(dtype):
+        return pa.int64()
+    if pd.api.types.is_float_dtype(dtype):
+        return pa.float64()
+    return pa.string()
+
+
+# Escritor de Parquet por partes (requiere pyarrow): cada llamada a write agrega grupos
+# de filas al archivo. El esquema sale de los tipos de columns_df (un DataFrame con las
+# columnas y tipos del resultado; alcanza con una parte).
+class ParquetStreamWriter:
+    def __init__(self, output, columns_df):
+        if pq is None:
+            raise ImportError("Se necesita pyarrow para escribir archivos Parquet")
+        self.schema = pa.schema(
+            [(str(col), parquet_type(dtype)) for col, dtype in columns_df.dtypes.items()]
+        )
+        self._writer = pq.ParquetWriter(output, self.schema, compression="zstd")
+        self.rows = 0
+
+    def write(self, df):
+        if len(df) == 0:
+            return
+        table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        self._writer.write_table(table, row_group_size=_PARQUET_ROW_GROUP)
+        self.rows += len(df)
+
+    def close(self):
+        self._writer.close()
+
+
+# Escribir un DataFrame como Parquet (requiere pyarrow)
+def write_parquet(df, output):
+    writer = ParquetStreamWriter(output, df)
+    try:
+        writer.write(df)
+    finally:
+        writer.close()
+
+
+# Escribir una tabla de resumen como CSV para Excel: separador ";" y coma decimal
+def write_summary_csv(table, output):
+    text_output = io.TextIOWrapper(output, encoding="utf-8", newline="")
+    table.to_csv(text_output, index=False, sep=';', decimal=',', float_format='%.2f')
+    text_output.flush()
+    text_output.detach()
+
+
+# Generar un ZIP con un CSV por resumen (<prefijo>_<resumen>.csv)
+def build_summaries_zip(summaries, prefix="datos_unificados"):
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, table in summaries.items():
+            with archive.open(f"{prefix}_{summary_slug(name)}.csv", "w") as member:
+                write_summary_csv(table, member)
+    output.seek(0)
+    return output
+
+
+# Generar el CSV en un archivo temporal, opcionalmente comprimido con gzip o zip
+def build_csv_file(df, compression=None, filename="datos_unificados.csv"):
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    if compression == "gzip":
+        with gzip.GzipFile(filename=filename, fileobj=output, mode="wb", mtime=0) as compressed:
+            write_csv(df, compressed)
+    elif compression == "zip":
+        with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            with archive.open(filename, "w", force_zip64=True) as compressed:
+                write_csv(df, compressed)
+    elif compression is None:
+        write_csv(df, output)
+    else:
+        raise ValueError(f"Compresión no soportada: {compression}")
+    output.seek(0)
+    return output
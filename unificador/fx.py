@@ -0,0 +1,216 @@
+import io
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from unificador.cache import DataFrameCache, content_hash
+from unificador.dates import normalize_dates
+from unificador.ingest import read_csv
+from unificador.mapping import normalize_column
+from unificador.numeric import parse_numeric
+
+# pyarrow es opcional: solo se necesita para leer tipos de cambio en Parquet
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Columnas de Netsuite que reciben el tipo de cambio en las filas de Salesforce
+FX_COLUMNS = ["FX Rate", "FX Rate Item", "Consolidated FX Rate"]
+
+# Columna con la moneda de cada fila del resultado (Amount Currency en Salesforce)
+CURRENCY_COLUMN = "Proj. Currency"
+
+# Moneda de los montos convertidos de Salesforce y de Total USD: su tipo de cambio es 1
+# aunque no esté en el archivo
+BASE_CURRENCY = "USD"
+
+# Nombres aceptados (normalizados como en mapping.normalize_column) para las columnas del
+# archivo de tipos de cambio. El tipo de cambio es en USD por unidad de la moneda, como
+# FX Rate en Netsuite (Total × FX Rate = monto en USD).
+RATE_FILE_COLUMNS = {
+    "Moneda": ["moneda", "currency", "divisa", "proj currency"],
+    "Fecha": ["fecha", "date", "mes", "month"],
+    "Tipo de cambio": ["tipo de cambio", "rate", "fx rate", "tasa", "cotizacion"],
+}
+
+# Tablas de tipos de cambio ya leídas, por contenido del archivo: se comparten entre
+# unificaciones (y sesiones de Streamlit) sin volver a leer ni ordenar el archivo
+CACHE_MAX_BYTES = 256 * 1024 ** 2
+_cache = DataFrameCache(max_bytes=CACHE_MAX_BYTES)
+
+_PARQUET_MAGIC = b"PAR1"
+
+
+# Tabla de tipos de cambio preparada para uniones as-of: una fila por moneda y fecha
+# (Moneda, Fecha, Tipo de cambio), ordenada por fecha. key identifica el contenido del
+# archivo (la unificación incremental reprocesa todo si cambia) y skipped es la cantidad
+# de filas del archivo descartadas por no tener moneda, fecha o un tipo de cambio válido.
+class FxRates:
+    def __init__(self, table, key, skipped=0):
+        self.table = table
+        self.key = key
+        self.skipped = skipped
+
+    def __len__(self):
+        return len(self.table)
+
+    @property
+    def currencies(self):
+        return sorted(self.table["Moneda"].unique())
+
+    # Tipo de cambio vigente (el último con fecha menor o igual) para cada par de
+    # currencies y dates, con una sola unión as-of ordenada. NaN si la moneda no está en
+    # la tabla o la fecha es anterior a su primer tipo de cambio; BASE_CURRENCY vale 1.
+    def lookup(self, currencies, dates):
+        left = pd.DataFrame({
+            "Moneda": pd.Series(currencies, dtype=object),
+            "Fecha": pd.to_datetime(pd.Series(dates)).astype(self.table["Fecha"].dtype),
+            "_posicion": np.arange(len(currencies)),
+        })
+        rates = np.full(len(left), np.nan)
+        left = left[left["Moneda"].notna() & left["Fecha"].notna()].astype({"Moneda": "str"})
+        if len(left) and len(self.table):
+            merged = pd.merge_asof(
+                left.sort_values("Fecha", kind="stable"), self.table, on="Fecha", by="Moneda", direction="backward",
+            )
+            rates[merged["_posicion"].to_numpy()] = merged["Tipo de cambio"].to_numpy(dtype=float)
+        base = np.isnan(rates) & (pd.Series(currencies, dtype=object) == BASE_CURRENCY).to_numpy()
+        rates[base] = 1.0
+        return rates
+
+
+def _source_bytes(source):
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if hasattr(source, "read"):
+        return source.read()
+    return Path(source).read_bytes()
+
+
+# Columna del archivo que corresponde a cada columna de la tabla (ver RATE_FILE_COLUMNS)
+def _rate_columns(columns):
+    normalized = {normalize_column(col): col for col in reversed(list(columns))}
+    found = {}
+    for name, aliases in RATE_FILE_COLUMNS.items():
+        col = next((normalized[alias] for alias in aliases if alias in normalized), None)
+        if col is None:
+            raise ValueError(
+                f"El archivo de tipos de cambio no tiene la columna '{name}' "
+                f"(se aceptan: {', '.join(aliases)})"
+            )
+        found[name] = col
+    return found
+
+
+# Leer y preparar la tabla de un archivo de tipos de cambio (CSV o Parquet). Las monedas
+# se pasan a mayúsculas, las fechas en cualquiera de los formatos de dates se normalizan y
+# los tipos de cambio se leen con el separador decimal que corresponda. Si una moneda
+# tiene más de un tipo de cambio en la misma fecha, vale el último. Devuelve (tabla,
+# filas descartadas).
+def _read_rates(data):
+    if data[:len(_PARQUET_MAGIC)] == _PARQUET_MAGIC:
+        if pa is None:
+            raise ImportError("Se necesita pyarrow para leer tipos de cambio en Parquet")
+        raw = pd.read_parquet(io.BytesIO(data))
+    else:
+        raw = read_csv(data, lambda header: {col: "str" for col in header})
+    columns = _rate_columns(raw.columns)
+
+    currencies = raw[columns["Moneda"]].astype(object).where(raw[columns["Moneda"]].notna())
+    currencies = currencies.map(lambda value: str(value).strip().upper() or None, na_action="ignore")
+    dates = raw[columns["Fecha"]]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(normalize_dates(dates.astype(object)), format="%d/%m/%Y", errors="coerce")
+    rates, _, _ = parse_numeric(raw[columns["Tipo de cambio"]])
+
+    table = pd.DataFrame({
+        "Moneda": currencies.to_numpy(dtype=object),
+        "Fecha": pd.to_datetime(dates).dt.tz_localize(None).astype("datetime64[ns]").to_numpy(),
+        "Tipo de cambio": rates.to_numpy(dtype=float),
+    })
+    valid = table["Moneda"].notna() & table["Fecha"].notna() & (table["Tipo de cambio"] > 0)
+    skipped = int((~valid).sum())
+    table = table[valid].astype({"Moneda": "str"}).drop_duplicates(["Moneda", "Fecha"], keep="last")
+    if table.empty:
+        raise ValueError("El archivo de tipos de cambio no tiene filas con moneda, fecha y tipo de cambio válidos")
+    return table.sort_values("Fecha", kind="stable").reset_index(drop=True), skipped
+
+
+# Tabla de tipos de cambio de un archivo CSV o Parquet (ruta, archivo abierto o su
+# contenido en bytes). Las tablas quedan en una caché por contenido: leer el mismo
+# archivo otra vez no lo vuelve a procesar. La tabla no debe modificarse.
+def load_fx_rates(source):
+    data = _source_bytes(source)
+    key = content_hash(data)
+    cached = _cache.get(key)
+    if cached is None:
+        table, skipped = _read_rates(data)
+        cached = table
+        cached.attrs["skipped"] = skipped
+        _cache.put(key, cached)
+    return FxRates(cached, key, cached.attrs["skipped"])
+
+
+# Completar en una parte de Salesforce ya convertida (números como float, en el mismo
+# DataFrame) las columnas FX_COLUMNS con el tipo de cambio de rates vigente al fin de mes
+# de cada fila (Date) para su moneda (CURRENCY_COLUMN). Las filas se agrupan por moneda y
+# fecha, que se repiten mucho, así la unión as-of es una sola y sobre pocos pares. Los
+# valores que ya traen las filas se conservan. Si Total sale del monto convertido de
+# Salesforce (en BASE_CURRENCY, según el plan de compile_mapping) se recalcula en la
+# moneda de la fila: Total / FX Rate. Los pares sin tipo de cambio se registran en
+# diagnostics y sus filas quedan como estaban.
+def apply_fx_rates(part, rates, plan, diagnostics=None):
+    if len(part) == 0 or CURRENCY_COLUMN not in part.columns or "Date" not in part.columns:
+        return part
+    # Monedas y fechas distintas, con el nulo en la posición 0
+    currency_codes, currency_values = pd.factorize(part[CURRENCY_COLUMN])
+    date_codes, date_values = pd.factorize(part["Date"])
+    currency_values = pd.Series([None] + list(np.asarray(currency_values, dtype=object)), dtype=object)
+    currency_values = currency_values.map(lambda value: str(value).strip().upper() or None, na_action="ignore")
+    date_values = pd.Series([None] + list(np.asarray(date_values, dtype=object)), dtype=object)
+    parsed_dates = pd.to_datetime(normalize_dates(date_values), format="%d/%m/%Y", errors="coerce")
+
+    # Pares (moneda, fecha) distintos y el par de cada fila
+    date_slots = len(date_values)
+    keys = (currency_codes.astype(np.int64) + 1) * date_slots + (date_codes + 1)
+    inverse, pairs = pd.factorize(keys)
+    pair_currency, pair_date = pairs // date_slots, pairs % date_slots
+    currencies = currency_values.to_numpy(dtype=object)[pair_currency]
+    pair_rates = rates.lookup(currencies, parsed_dates.to_numpy()[pair_date])
+    row_rates = pair_rates[inverse]
+
+    for col in FX_COLUMNS:
+        if col in part.columns:
+            values = part[col].to_numpy(dtype=float, copy=True)
+            empty = np.isnan(values) & ~np.isnan(row_rates)
+            values[empty] = row_rates[empty]
+            part[col] = values
+
+    converted_total = any(kind == "amount" and ns_col == "Total" for _, ns_col, kind in plan)
+    if converted_total and "Total" in part.columns:
+        applied = part[FX_COLUMNS[0]].to_numpy(dtype=float) if FX_COLUMNS[0] in part.columns else row_rates
+        total = part["Total"].to_numpy(dtype=float, copy=True)
+        recompute = ~np.isnan(total) & ~np.isnan(applied) & (applied != 0) & (applied != 1)
+        total[recompute] = total[recompute] / applied[recompute]
+        part["Total"] = total
+
+    if diagnostics is not None:
+        missing = np.isnan(pair_rates) & pd.notna(currencies)
+        if missing.any():
+            counts = np.bincount(inverse, minlength=len(pairs))
+            for i in np.flatnonzero(missing):
+                when = f"al {date_values[pair_date[i]]}" if pair_date[i] > 0 else "(filas sin fecha)"
+                diagnostics.warning(
+                    "Tipo de cambio faltante", f"No hay tipo de cambio para {currencies[i]} {when}", int(counts[i]),
+                )
+    return part
+
+
+# Filas de Salesforce del resultado con y sin tipo de cambio (FX Rate): {"rows", "missing"}
+def fx_counts(salesforce_part):
+    if FX_COLUMNS[0] not in salesforce_part.columns:
+        return {"rows": 0, "missing": len(salesforce_part)}
+    missing = int(salesforce_part[FX_COLUMNS[0]].isna().sum())
+    return {"rows": len(salesforce_part) - missing, "missing": missing}
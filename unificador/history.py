@@ -0,0 +1,271 @@
+import re
+import shutil
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# pyarrow es opcional: solo se necesita para guardar y consultar el historial
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = ds = pq = None
+
+from unificador.export import parquet_type, write_summary_csv
+from unificador.reconcile import DUPLICATE_COLUMN, RECONCILE_KEYS, key_hashes
+from unificador.summaries import EMPTY_LABEL, SUMMARY_VALUE, month_labels, summary_slug
+
+# Historial de corridas: cada unificación guardada queda en <historial>/run=<corrida>/,
+# particionada en directorios Origen=.../Estado=.../Mes=... (Mes es el YYYY-MM de Date).
+# Las consultas leen solo las corridas, particiones y columnas que necesitan.
+PARTITIONS = ["Origen", "Estado", "Mes"]
+
+# Origen de cada fila: en el resultado combinado van primero las filas de Netsuite
+ORIGINS = ["Netsuite", "Salesforce"]
+
+# Estados que suman al forecast (los de "Confirmado vs Pipeline")
+FORECAST_ESTADOS = ["CONFIRMADO", "PIPELINE"]
+
+# Columna del resultado con la probabilidad de las oportunidades de Salesforce
+# (Probability (%) → Quantity en el mapeo predeterminado)
+PROBABILITY_COLUMN = "Quantity"
+
+_RUN = re.compile(r'^[\w.-]+$')
+
+
+# Nombre único para una corrida: fecha y hora (así list_runs las ordena) y, si se indica,
+# el comienzo de key (p. ej. un hash de los archivos de entrada). Sirve cuando varias
+# corridas del mismo día no deben reemplazarse entre sí.
+def run_name(key=None):
+    name = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+    return f"{name}-{key[:8]}" if key else name
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Se necesita pyarrow para usar el historial de corridas")
+
+
+def _partitioning():
+    return ds.partitioning(pa.schema([(col, pa.string()) for col in PARTITIONS]), flavor="hive")
+
+
+def _run_path(history_dir, run):
+    if not _RUN.match(str(run)):
+        raise ValueError(f"Nombre de corrida inválido: {run} (solo letras, números, '.', '-' y '_')")
+    return Path(history_dir) / f"run={run}"
+
+
+# Escritor de una corrida del historial (requiere pyarrow). Las partes se escriben en un
+# directorio oculto que reemplaza a la corrida recién en close, así una corrida con el
+# mismo nombre (por defecto, la fecha de hoy) no queda a medio escribir si algo falla.
+# Cada llamada a write agrega un archivo por partición, y close los junta en uno.
+class HistoryWriter:
+    def __init__(self, history_dir, run=None):
+        _require_pyarrow()
+        self.run = str(run or date.today().isoformat())
+        self.path = _run_path(history_dir, self.run)
+        self._staging = self.path.with_name(f".{self.path.name}.parcial")
+        shutil.rmtree(self._staging, ignore_errors=True)
+        self._staging.mkdir(parents=True)
+        self._schema = None
+        self._parts = 0
+        self.rows = 0
+
+    # df es un resultado combinado (o una parte) cuyas primeras netsuite_rows filas son
+    # de Netsuite y las demás de Salesforce
+    def write(self, df, netsuite_rows):
+        if len(df) == 0:
+            return
+        frame = df.copy(deep=False)
+        origins = np.ones(len(frame), dtype=np.int8)
+        origins[:netsuite_rows] = 0
+        frame["Origen"] = np.array(ORIGINS, dtype=object)[origins]
+        estado = frame["Estado"] if "Estado" in frame.columns else pd.Series(np.nan, index=frame.index)
+        frame["Estado"] = estado.astype(object).where(estado.notna(), EMPTY_LABEL)
+        if "Date" in frame.columns:
+            frame["Mes"] = np.asarray(month_labels(frame["Date"]), dtype=object)
+        else:
+            frame["Mes"] = EMPTY_LABEL
+        # Las columnas categóricas se guardan como texto (Parquet igual las codifica por
+        # diccionario): como categorías, cada archivo llevaría todas las del resultado
+        if self._schema is None:
+            self._schema = pa.schema([
+                (str(col), pa.string() if col in PARTITIONS or isinstance(dtype, pd.CategoricalDtype)
+                 else parquet_type(dtype))
+                for col, dtype in frame.dtypes.items()
+            ])
+        ds.write_dataset(
+            pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False),
+            self._staging,
+            format="parquet",
+            partitioning=_partitioning(),
+            basename_template=f"parte-{self._parts}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+        )
+        self._parts += 1
+        self.rows += len(frame)
+
+    # Juntar los archivos de cada partición (de a un archivo, sin cargar la partición
+    # entera) y publicar la corrida. Devuelve el nombre de la corrida.
+    def close(self):
+        for directory in sorted({path.parent for path in self._staging.rglob("*.parquet")}):
+            files = sorted(directory.glob("*.parquet"))
+            if len(files) < 2:
+                continue
+            merged = directory / "datos.parquet.tmp"
+            with pq.ParquetWriter(merged, pq.read_schema(files[0]), compression="zstd") as writer:
+                for file in files:
+                    writer.write_table(pq.read_table(file))
+            for file in files:
+                file.unlink()
+            merged.rename(directory / "datos.parquet")
+        if self.path.exists():
+            shutil.rmtree(self.path)
+        self._staging.rename(self.path)
+        return self.run
+
+    def abort(self):
+        shutil.rmtree(self._staging, ignore_errors=True)
+
+
+# Guardar un resultado combinado como corrida del historial. Devuelve su nombre.
+def save_run(combined_df, history_dir, netsuite_rows, run=None):
+    writer = HistoryWriter(history_dir, run)
+    try:
+        writer.write(combined_df, netsuite_rows)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.close()
+
+
+# Corridas guardadas en el historial, ordenadas (con fechas ISO, de la más vieja a la
+# más nueva)
+def list_runs(history_dir):
+    history_dir = Path(history_dir)
+    if not history_dir.is_dir():
+        return []
+    return sorted(
+        path.name.split("=", 1)[1] for path in history_dir.iterdir()
+        if path.is_dir() and path.name.startswith("run=")
+    )
+
+
+# Leer una corrida del historial, solo con las columnas pedidas (las que no están en la
+# corrida se omiten) y las filas de los orígenes, Estados y meses indicados. Los filtros
+# sobre las particiones hacen que ni siquiera se abran los archivos de las demás.
+def load_run(history_dir, run, columns=None, origins=None, estados=None, months=None):
+    _require_pyarrow()
+    path = _run_path(history_dir, run)
+    if not path.is_dir():
+        raise FileNotFoundError(f"No existe la corrida {run} en el historial {history_dir}")
+    dataset = ds.dataset(path, format="parquet", partitioning=_partitioning())
+    if columns is not None:
+        columns = [col for col in columns if col in dataset.schema.names]
+    condition = None
+    for col, values in (("Origen", origins), ("Estado", estados), ("Mes", months)):
+        if values is not None:
+            expression = ds.field(col).isin([str(value) for value in values])
+            condition = expression if condition is None else condition & expression
+    return dataset.to_table(columns=columns, filter=condition).to_pandas()
+
+
+# Oportunidades de Salesforce de una corrida, una fila por clave de conciliación
+# (proyecto, cliente y mes normalizados): la probabilidad máxima y la suma de Total USD
+def _opportunities(history_dir, run, months):
+    columns = RECONCILE_KEYS + ["Estado", PROBABILITY_COLUMN, SUMMARY_VALUE]
+    df = load_run(history_dir, run, columns, origins=["Salesforce"], months=months)
+    if any(col not in df.columns for col in columns):
+        return pd.DataFrame(columns=columns).rename_axis("clave")
+    hashes, valid = key_hashes(df)
+    df = df[valid]
+    values = {col: pd.to_numeric(df[col], errors="coerce") for col in (PROBABILITY_COLUMN, SUMMARY_VALUE)}
+    df = df.assign(clave=hashes[valid], **values)
+    return df.groupby("clave", sort=False).agg(
+        **{col: (col, "first") for col in RECONCILE_KEYS + ["Estado"]},
+        **{PROBABILITY_COLUMN: (PROBABILITY_COLUMN, "max"), SUMMARY_VALUE: (SUMMARY_VALUE, "sum")},
+    )
+
+
+# Total USD del forecast por cliente en una corrida (sin las filas de Salesforce marcadas
+# como ya registradas en Netsuite, como en los resúmenes)
+def _customer_totals(history_dir, run, months):
+    df = load_run(
+        history_dir, run, ["Customer Parent", SUMMARY_VALUE, DUPLICATE_COLUMN], estados=FORECAST_ESTADOS, months=months,
+    )
+    if "Customer Parent" not in df.columns or SUMMARY_VALUE not in df.columns:
+        return pd.Series(dtype=float)
+    if DUPLICATE_COLUMN in df.columns:
+        df = df[~df[DUPLICATE_COLUMN].fillna(False).astype(bool)]
+    customers = df["Customer Parent"].astype(object).where(df["Customer Parent"].notna(), EMPTY_LABEL)
+    return pd.to_numeric(df[SUMMARY_VALUE], errors="coerce").groupby(customers.to_numpy()).sum()
+
+
+# Diferencias entre dos corridas del historial (por ejemplo, el forecast de este mes y el
+# del anterior), opcionalmente solo para algunos meses: oportunidades de Salesforce
+# nuevas, eliminadas y con otra probabilidad, y el movimiento de Total USD del forecast
+# por cliente. Devuelve nombre → DataFrame, como los resúmenes.
+def compare_runs(history_dir, previous, current, months=None):
+    before = _opportunities(history_dir, previous, months)
+    after = _opportunities(history_dir, current, months)
+    display = RECONCILE_KEYS + ["Estado", PROBABILITY_COLUMN, SUMMARY_VALUE]
+
+    added = after[~after.index.isin(before.index)][display]
+    removed = before[~before.index.isin(after.index)][display]
+
+    both = before.join(after, how="inner", lsuffix=" anterior", rsuffix=" actual")
+    old_probability, new_probability = both[f"{PROBABILITY_COLUMN} anterior"], both[f"{PROBABILITY_COLUMN} actual"]
+    changed = both[(old_probability != new_probability) & ~(old_probability.isna() & new_probability.isna())]
+    changed = pd.DataFrame({
+        **{col: changed[f"{col} actual"] for col in RECONCILE_KEYS},
+        "Probabilidad anterior": changed[f"{PROBABILITY_COLUMN} anterior"],
+        "Probabilidad actual": changed[f"{PROBABILITY_COLUMN} actual"],
+        f"{SUMMARY_VALUE} anterior": changed[f"{SUMMARY_VALUE} anterior"],
+        f"{SUMMARY_VALUE} actual": changed[f"{SUMMARY_VALUE} actual"],
+    })
+    changed["Diferencia"] = changed[f"{SUMMARY_VALUE} actual"].fillna(0) - changed[f"{SUMMARY_VALUE} anterior"].fillna(0)
+
+    movement = pd.DataFrame({
+        f"{SUMMARY_VALUE} anterior": _customer_totals(history_dir, previous, months),
+        f"{SUMMARY_VALUE} actual": _customer_totals(history_dir, current, months),
+    }).fillna(0.0)
+    movement["Diferencia"] = movement[f"{SUMMARY_VALUE} actual"] - movement[f"{SUMMARY_VALUE} anterior"]
+    movement = movement.rename_axis("Customer Parent").reset_index()
+
+    def by_size(table, col):
+        order = table[col].abs().sort_values(ascending=False, kind="stable").index
+        return table.loc[order].reset_index(drop=True)
+
+    return {
+        "Oportunidades nuevas": by_size(added, SUMMARY_VALUE),
+        "Oportunidades eliminadas": by_size(removed, SUMMARY_VALUE),
+        "Cambios de probabilidad": by_size(changed, "Diferencia"),
+        "Movimiento por cliente": by_size(movement, "Diferencia"),
+    }
+
+
+# Comparar la corrida run con la anterior del historial (si hay) y escribir las
+# diferencias en output_dir como <name>_delta_<tabla>.csv. Devuelve un resumen para el
+# CLI (la corrida, la anterior, las filas de cada tabla y el movimiento total de Total
+# USD) y las rutas generadas.
+def write_run_deltas(history_dir, run, output_dir, name):
+    runs = list_runs(history_dir)
+    earlier = [other for other in runs if other < run]
+    summary = {"run": run, "previous": earlier[-1] if earlier else None, "rows": {}, "movement": 0.0}
+    if summary["previous"] is None:
+        return summary, []
+    deltas = compare_runs(history_dir, summary["previous"], run)
+    paths = []
+    for table_name, table in deltas.items():
+        path = Path(output_dir) / f"{name}_delta_{summary_slug(table_name)}.csv"
+        with open(path, "wb") as output:
+            write_summary_csv(table, output)
+        paths.append(path)
+        summary["rows"][table_name] = len(table)
+    summary["movement"] = float(deltas["Movimiento por cliente"]["Diferencia"].sum())
+    return summary, paths
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# pyarrow es opcional: solo se necesita para guardar y leer el estado en disco
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+from unificador.schemas import concat_frames
+
+# Versión del formato del estado guardado; si cambia, se reconstruye todo
+STATE_VERSION = 2
+
+# Archivos del directorio de un estado guardado: el resultado en Parquet, las huellas de
+# las filas como arrays de NumPy y las convenciones usadas en JSON
+_STATE_RESULT = "resultado.parquet"
+_STATE_FINGERPRINTS = "huellas.npz"
+_STATE_METADATA = "estado.json"
+_STATE_KEYS = ["version", "mapping", "decimals", "fx", "schemas"]
+
+
+# Huella de contenido de cada fila (hash de 64 bits de todos sus valores)
+def row_fingerprints(df):
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+# Clave única de cada fila: (huella, n.º de aparición), para que las filas idénticas
+# repetidas se emparejen una a una
+def _row_keys(fingerprints):
+    occurrence = pd.Series(fingerprints).groupby(fingerprints, sort=False).cumcount().to_numpy()
+    return pd.MultiIndex.from_arrays([fingerprints, occurrence])
+
+
+def _schema(df):
+    return [(str(col), str(dtype)) for col, dtype in df.dtypes.items()]
+
+
+def _mapping_hash(mapping):
+    canonical = json.dumps(mapping, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# Estado de una unificación, necesario para la siguiente ejecución incremental:
+# el resultado, las huellas de las filas de origen y las convenciones usadas.
+# fingerprints permite pasar las huellas (Netsuite, Salesforce) ya calculadas.
+def build_state(netsuite_df, salesforce_df, mapping, result, fingerprints=None):
+    if fingerprints is None:
+        fingerprints = (row_fingerprints(netsuite_df), row_fingerprints(salesforce_df))
+    return {
+        "version": STATE_VERSION,
+        "mapping": _mapping_hash(mapping),
+        "decimals": result["decimals"],
+        "fx": result["fx"]["key"] if result.get("fx") else None,
+        "schemas": (_schema(netsuite_df), _schema(salesforce_df)),
+        "netsuite_fingerprints": fingerprints[0],
+        "salesforce_fingerprints": fingerprints[1],
+        "combined_df": result["combined_df"],
+    }
+
+
+# Guardar el estado en el directorio path (requiere pyarrow). Se escribe en un directorio
+# oculto que reemplaza al anterior recién al terminar, así un estado a medio escribir
+# nunca se lee. Ningún archivo es un pickle: leer un estado no ejecuta código.
+def save_state(state, path):
+    if pa is None:
+        raise ImportError("Se necesita pyarrow para guardar el estado de la unificación incremental")
+    path = Path(path)
+    staging = path.with_name(f".{path.name}.parcial")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    try:
+        state["combined_df"].to_parquet(staging / _STATE_RESULT, index=False, compression="zstd")
+        np.savez(
+            staging / _STATE_FINGERPRINTS,
+            netsuite=state["netsuite_fingerprints"], salesforce=state["salesforce_fingerprints"],
+        )
+        metadata = {key: state[key] for key in _STATE_KEYS}
+        (staging / _STATE_METADATA).write_text(json.dumps(metadata, ensure_ascii=False), encoding="utf-8")
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    if path.exists():
+        shutil.rmtree(path)
+    staging.rename(path)
+
+
+# Leer un estado guardado con save_state. Si es de otra versión solo se lee su versión
+# (rebuild_reason pide entonces una unificación completa).
+def load_state(path):
+    path = Path(path)
+    metadata = json.loads((path / _STATE_METADATA).read_text(encoding="utf-8"))
+    if metadata.get("version") != STATE_VERSION:
+        return {"version": metadata.get("version")}
+    with np.load(path / _STATE_FINGERPRINTS, allow_pickle=False) as fingerprints:
+        netsuite_fingerprints = fingerprints["netsuite"]
+        salesforce_fingerprints = fingerprints["salesforce"]
+    return {
+        **metadata,
+        # JSON no tiene tuplas: los esquemas vuelven a la forma de _schema
+        "schemas": tuple([tuple(column) for column in schema] for schema in metadata["schemas"]),
+        "netsuite_fingerprints": netsuite_fingerprints,
+        "salesforce_fingerprints": salesforce_fingerprints,
+        "combined_df": pd.read_parquet(path / _STATE_RESULT),
+    }
+
+
+# Motivo por el que el estado previo no puede reutilizarse (None si se puede). fx_key
+# identifica los tipos de cambio usados (fx.FxRates.key, None si no se usan).
+def rebuild_reason(state, netsuite_df, salesforce_df, mapping, decimals, fx_key=None):
+    if state is None:
+        return "no hay una unificación previa"
+    if state.get("version") != STATE_VERSION:
+        return "el estado previo es de otra versión"
+    if state["mapping"] != _mapping_hash(mapping):
+        return "el mapeo cambió"
+    if state["schemas"] != (_schema(netsuite_df), _schema(salesforce_df)):
+        return "las columnas o sus tipos cambiaron"
+    if state["decimals"] != decimals:
+        return "cambió el separador decimal de alguna columna"
+    if state.get("fx") != fx_key:
+        return "cambiaron los tipos de cambio"
+    if len(salesforce_df) == 0 or len(state["salesforce_fingerprints"]) == 0:
+        return "uno de los reportes de Salesforce está vacío"
+    return None
+
+
+# Posición en el origen previo de cada fila actual (-1 si es nueva o cambió)
+def match_rows(previous_fingerprints, fingerprints):
+    return _row_keys(previous_fingerprints).get_indexer(_row_keys(fingerprints))
+
+
+# Armar el resultado completo a partir de las filas reutilizadas del resultado previo y
+# de las reprocesadas (partial_df: primero las de Netsuite, luego las de Salesforce),
+# respetando el orden de los reportes actuales. Las filas eliminadas quedan fuera.
+def assemble_rows(previous_df, previous_netsuite_rows, partial_df, netsuite_positions, salesforce_positions):
+    new_netsuite = netsuite_positions < 0
+    new_salesforce = salesforce_positions < 0
+    partial_start = len(previous_df)
+
+    netsuite_order = netsuite_positions.copy()
+    netsuite_order[new_netsuite] = partial_start + np.arange(new_netsuite.sum())
+    salesforce_order = salesforce_positions + previous_netsuite_rows
+    salesforce_order[new_salesforce] = partial_start + new_netsuite.sum() + np.arange(new_salesforce.sum())
+
+    combined = concat_frames([previous_df, partial_df])
+    order = np.concatenate([netsuite_order, salesforce_order])
+    return combined.take(order).reset_index(drop=True)
@@ -0,0 +1,310 @@
+import codecs
+import csv
+import io
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from unificador.numeric import detect_decimal_separator
+
+# pyarrow es opcional: sin él (o si no puede leer el archivo) se usa el motor C de pandas
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+# Bytes del comienzo del archivo que se usan para detectar el formato
+SNIFF_BYTES = 64 * 1024
+
+# Separadores candidatos, en orden de preferencia ante un empate
+DELIMITERS = [",", ";", "\t", "|"]
+
+# Textos que se leen como nulos (los mismos que usa pandas por defecto)
+NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+_SNIFF_ROWS = 50
+_NUMBER = re.compile(r'^[-+(]?[$€£]?\s*\d[\d.,]*\)?%?$')
+
+
+# Codificación del archivo: UTF-8 (con o sin BOM) o, si no es UTF-8 válido, la de
+# Windows para Europa occidental (cp1252) o latin-1, que acepta cualquier byte
+def sniff_encoding(sample):
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        # final=False: un carácter cortado al final de la muestra no es un error
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    try:
+        sample.decode("cp1252")
+        return "cp1252"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+# Separador de campos: el candidato que da más columnas con la misma cantidad de campos
+# en todas las filas de la muestra
+def sniff_delimiter(lines):
+    best, best_score = DELIMITERS[0], None
+    for delimiter in DELIMITERS:
+        widths = [len(row) for row in csv.reader(lines, delimiter=delimiter)]
+        if not widths or widths[0] <= 1:
+            continue
+        consistency = sum(width == widths[0] for width in widths) / len(widths)
+        score = (consistency, widths[0])
+        if best_score is None or score > best_score:
+            best, best_score = delimiter, score
+    return best
+
+
+# Separador decimal de los números de la muestra. Sin votos, los archivos separados por
+# ";" (configuración regional en español) usan coma.
+def sniff_decimal(rows, delimiter):
+    texts = [value.strip() for row in rows[1:] for value in row if _NUMBER.match(value.strip())]
+    default = "," if delimiter == ";" else "."
+    return detect_decimal_separator(texts, default=default)
+
+
+# Nombres de columna únicos, como los genera pandas: "a", "a.1", "a.2"...
+def _unique_names(names):
+    counts = {}
+    result = []
+    for i, name in enumerate(names):
+        name = name if name != "" else f"Unnamed: {i}"
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[name] = count + 1
+            name = f"{name}.{count}"
+            count = counts.get(name, 0)
+        counts[name] = count + 1
+        result.append(name)
+    return result
+
+
+# Detectar el formato de un CSV a partir del comienzo del archivo: codificación,
+# separador de campos, separador decimal y encabezado
+def sniff_format(sample):
+    encoding = sniff_encoding(sample)
+    text = codecs.getincrementaldecoder(encoding)(errors="replace").decode(sample, final=False)
+    lines = text.splitlines()
+    if len(sample) >= SNIFF_BYTES and len(lines) > 1:
+        # La última línea puede estar cortada
+        lines = lines[:-1]
+    lines = [line for line in lines[:_SNIFF_ROWS + 1] if line.strip()]
+    delimiter = sniff_delimiter(lines)
+    rows = list(csv.reader(lines, delimiter=delimiter))
+    return {
+        "encoding": encoding,
+        "delimiter": delimiter,
+        "decimal": sniff_decimal(rows, delimiter),
+        "header": _unique_names(rows[0]) if rows else [],
+    }
+
+
+# Contenido o ruta del archivo, y los primeros bytes para detectar el formato
+def _open_source(source):
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source), bytes(source[:SNIFF_BYTES])
+    if hasattr(source, "read"):
+        data = source.read()
+        return data, data[:SNIFF_BYTES]
+    with open(source, "rb") as f:
+        return Path(source), f.read(SNIFF_BYTES)
+
+
+# Tipos de columna de pandas (de los esquemas) a tipos de pyarrow
+def _arrow_type(dtype):
+    if dtype == "category":
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.string()
+
+
+def _types_mapper():
+    string_dtype = pd.api.types.pandas_dtype("str")
+    if isinstance(string_dtype, pd.StringDtype):
+        return {pa.string(): string_dtype, pa.large_string(): string_dtype}.get
+    return None
+
+
+def _read_pyarrow(data, fmt, dtypes):
+    def read(column_types, newlines_in_values):
+        source = pa.BufferReader(data) if isinstance(data, bytes) else str(data)
+        return pa_csv.read_csv(
+            source,
+            read_options=pa_csv.ReadOptions(
+                encoding="utf8" if fmt["encoding"] in ("utf-8", "utf-8-sig") else fmt["encoding"],
+                column_names=fmt["header"],
+                skip_rows=1,
+            ),
+            parse_options=pa_csv.ParseOptions(
+                delimiter=fmt["delimiter"], newlines_in_values=newlines_in_values,
+            ),
+            convert_options=pa_csv.ConvertOptions(
+                column_types=column_types,
+                null_values=NA_VALUES,
+                strings_can_be_null=True,
+                quoted_strings_can_be_null=True,
+                decimal_point=fmt["number_decimal"],
+            ),
+        )
+
+    column_types = {col: _arrow_type(dtype) for col, dtype in dtypes.items()}
+    # Admitir saltos de línea dentro de valores entre comillas hace mucho más lenta la
+    # lectura, así que solo se activa si hace falta: sin esa opción un valor así parte la
+    # fila y pyarrow la rechaza por tener menos campos que el encabezado
+    newlines_in_values = len(fmt["header"]) <= 1
+    try:
+        table = read(column_types, newlines_in_values)
+    except pa.ArrowInvalid:
+        if newlines_in_values:
+            raise
+        newlines_in_values = True
+        table = read(column_types, newlines_in_values)
+    # pyarrow reconoce fechas ISO; el motor C las deja como texto
+    temporal = [field.name for field in table.schema if pa.types.is_temporal(field.type)]
+    if temporal:
+        table = read({**column_types, **{col: pa.string() for col in temporal}}, newlines_in_values)
+    # Columnas vacías: float64 con NaN, como en el motor C
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            table = table.set_column(i, field.name, pa.nulls(len(table), pa.float64()))
+    return table.to_pandas(types_mapper=_types_mapper())
+
+
+def _read_c(data, fmt, dtypes):
+    source = io.BytesIO(data) if isinstance(data, bytes) else data
+    return pd.read_csv(
+        source, sep=fmt["delimiter"], encoding=fmt["encoding"], decimal=fmt["number_decimal"], dtype=dtypes,
+    )
+
+
+# Leer un CSV desde una ruta, un archivo abierto o su contenido en bytes, detectando
+# antes su formato. dtypes(encabezado) devuelve los tipos de las columnas conocidas; las
+# demás se infieren. Se usa pyarrow (multihilo) y, si no está disponible o falla, el
+# motor C de pandas. El formato detectado queda en df.attrs["ingest"].
+def read_csv(source, dtypes=None, engine=None):
+    data, sample = _open_source(source)
+    fmt = sniff_format(sample)
+    # Los números de las columnas inferidas usan el decimal detectado solo si no se
+    # confunde con el separador de campos
+    fmt["number_decimal"] = fmt["decimal"] if fmt["decimal"] != fmt["delimiter"] else "."
+    column_dtypes = dtypes(fmt["header"]) if dtypes is not None else {}
+
+    df = None
+    if engine in (None, "pyarrow") and pa is not None and fmt["header"]:
+        try:
+            df = _read_pyarrow(data, fmt, column_dtypes)
+            fmt["engine"] = "pyarrow"
+        except (pa.ArrowException, ValueError, LookupError):
+            df = None
+    if df is None:
+        df = _read_c(data, fmt, column_dtypes)
+        fmt["engine"] = "c"
+
+    df.attrs["ingest"] = {key: fmt[key] for key in ("encoding", "delimiter", "decimal", "engine")}
+    return df
+
+
+# Partes de unos block_bytes bytes de un CSV, cortadas al final de una fila, sin el
+# encabezado. Un salto de línea termina una fila si antes hay una cantidad par de
+# comillas (un valor entre comillas puede tener saltos de línea, y cada "" escapada suma
+# dos). Las codificaciones que detecta sniff_encoding escriben las comillas y los saltos
+# de línea como en ASCII, así que se puede cortar sobre los bytes. Cada parte se lee
+# entera con read_csv: el lector por partes de pyarrow lee por adelantado decenas de
+# bloques, lo que no respeta un presupuesto de memoria. Devuelve (bytes de la parte,
+# si tiene saltos de línea dentro de valores).
+def _iter_blocks(stream, block_bytes):
+    rest, header = b"", True
+    while True:
+        data = stream.read(block_bytes)
+        if not data:
+            break
+        block = rest + data
+        newlines, ends = _row_ends(block)
+        if header and len(ends):
+            block, header = block[ends[0] + 1:], False
+            newlines, ends = _row_ends(block)
+        if header or not len(ends):
+            rest = block
+            continue
+        end = ends[-1] + 1
+        rest = block[end:]
+        yield block[:end], len(ends) < np.count_nonzero(newlines < end)
+    if rest.strip() and not header:
+        newlines, ends = _row_ends(rest)
+        yield rest, len(ends) < len(newlines)
+
+
+# Posiciones de los saltos de línea de un bloque y de los que terminan una fila
+def _row_ends(block):
+    buffer = np.frombuffer(block, dtype=np.uint8)
+    newlines = np.flatnonzero(buffer == ord("\n"))
+    quotes = np.flatnonzero(buffer == ord('"'))
+    return newlines, newlines[np.searchsorted(quotes, newlines) % 2 == 0]
+
+
+def _read_block_pyarrow(block, fmt, dtypes, newlines_in_values):
+    table = pa_csv.read_csv(
+        pa.BufferReader(block),
+        read_options=pa_csv.ReadOptions(
+            encoding="utf8" if fmt["encoding"] in ("utf-8", "utf-8-sig") else fmt["encoding"],
+            column_names=fmt["header"],
+        ),
+        parse_options=pa_csv.ParseOptions(delimiter=fmt["delimiter"], newlines_in_values=newlines_in_values),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={col: _arrow_type(dtype) for col, dtype in dtypes.items()},
+            null_values=NA_VALUES,
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=True,
+        ),
+    )
+    return table.to_pandas(types_mapper=_types_mapper())
+
+
+def _read_block_c(block, fmt, dtypes):
+    return pd.read_csv(
+        io.BytesIO(block), sep=fmt["delimiter"], encoding=fmt["encoding"], header=None, names=fmt["header"],
+        dtype=dtypes,
+    )
+
+
+def _iter_chunks(data, fmt, dtypes, block_bytes):
+    with (io.BytesIO(data) if isinstance(data, bytes) else open(data, "rb")) as stream:
+        for block, newlines_in_values in _iter_blocks(stream, block_bytes):
+            if fmt["engine"] == "pyarrow":
+                yield _read_block_pyarrow(block, fmt, dtypes, newlines_in_values)
+            else:
+                yield _read_block_c(block, fmt, dtypes)
+
+
+# Leer un CSV por partes de unos block_bytes bytes de texto, para procesar archivos que
+# no entran en memoria. Detecta el formato como read_csv y lee las columnas conocidas con
+# los tipos de dtypes(encabezado), pero las demás se leen como texto: cada parte no puede
+# inferir su propio tipo. Devuelve (formato detectado, encabezado, iterador de
+# DataFrames); cada DataFrame lleva el formato en attrs["ingest"].
+def iter_csv(source, dtypes=None, block_bytes=1 << 24, engine=None):
+    data, sample = _open_source(source)
+    fmt = sniff_format(sample)
+    if not fmt["header"]:
+        raise ValueError("El archivo no tiene encabezado")
+    column_dtypes = dtypes(fmt["header"]) if dtypes is not None else {}
+    column_dtypes = {col: column_dtypes.get(col, "str") for col in fmt["header"]}
+
+    fmt["engine"] = "pyarrow" if engine in (None, "pyarrow") and pa is not None else "c"
+    chunks = _iter_chunks(data, fmt, column_dtypes, block_bytes)
+    info = {key: fmt[key] for key in ("encoding", "delimiter", "decimal", "engine")}
+
+    def tagged():
+        for chunk in chunks:
+            chunk.attrs["ingest"] = info
+            yield chunk
+
+    return info, fmt["header"], tagged()
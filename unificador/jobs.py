@@ -0,0 +1,103 @@
+import threading
+import time
+
+
+# Se lanza en el trabajo cuando se pidió cancelarlo, en el próximo punto de control.
+# Hereda de BaseException (como asyncio.CancelledError) para que los manejadores de
+# errores del pipeline (except Exception) no la confundan con una falla.
+class JobCancelled(BaseException):
+    pass
+
+
+# Progreso de un trabajo en segundo plano: la etapa actual y el avance dentro de ella
+# (de 0 a 1). El trabajo lo actualiza desde su hilo y la interfaz lo lee desde otro.
+# Cada actualización es también un punto de control donde se atiende la cancelación.
+class Progress:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancel_event = threading.Event()
+        self.stage = None
+        self.stage_number = 0
+        self.fraction = 0.0
+
+    def start_stage(self, name):
+        self.check()
+        with self._lock:
+            self.stage = name
+            self.stage_number += 1
+            self.fraction = 0.0
+
+    def advance(self, fraction):
+        self.check()
+        with self._lock:
+            self.fraction = min(max(float(fraction), 0.0), 1.0)
+
+    def check(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def snapshot(self):
+        with self._lock:
+            return {"stage": self.stage, "stage_number": self.stage_number, "fraction": self.fraction}
+
+
+# Trabajo en segundo plano: ejecuta func(*args, progress=..., **kwargs) en un hilo, de
+# modo que quien lo lanzó puede seguir atendiendo la interfaz y consultar el progreso.
+# Se usa un hilo (y no un proceso) porque pandas y pyarrow liberan el GIL en las
+# operaciones pesadas y así el resultado no tiene que serializarse para devolverlo.
+#
+#     job = Job(unify, netsuite_df, salesforce_df, mapping).start()
+#     ...
+#     if job.done() and job.status == "done":
+#         result = job.result
+class Job:
+    def __init__(self, func, *args, **kwargs):
+        self.progress = Progress()
+        self.status = "pending"
+        self.result = None
+        self.error = None
+        self.started = None
+        self.finished = None
+        self._thread = threading.Thread(target=self._run, args=(func, args, kwargs), daemon=True)
+
+    def _run(self, func, args, kwargs):
+        try:
+            self.result = func(*args, progress=self.progress, **kwargs)
+            self.status = "done"
+        except JobCancelled:
+            self.status = "cancelled"
+        except Exception as e:
+            self.error = e
+            self.status = "failed"
+        finally:
+            self.finished = time.perf_counter()
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.status = "running"
+        self._thread.start()
+        return self
+
+    # Pedir la cancelación: el trabajo se detiene en el próximo punto de control
+    def cancel(self):
+        self.progress.cancel()
+
+    def done(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+        return self.done()
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return end - self.started
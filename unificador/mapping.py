@@ -0,0 +1,90 @@
+import difflib
+import json
+import re
+
+from unificador.salesforce import NO_MAPEAR
+from unificador.schemas import SOURCE_COLUMN
+from unificador.text import normalize_key
+
+# Mapeo predeterminado de columnas Salesforce a Netsuite
+DEFAULT_MAPPING = {
+    "Probability (%)": "Quantity",
+    "Client Leader": "_Client Leader AUX",  # Nombre exacto de la columna
+    "Project Manager": "_PM",              # Nombre exacto de la columna
+    "Amount Currency": "Proj. Currency",
+    "Amount (converted)": "Total",
+    "Account Name": "Customer Parent",
+    "Opportunity Name": "Project(PLAN)",
+    "Month": "Date"
+}
+
+# Similitud mínima (de difflib, entre 0 y 1) para aceptar una columna parecida cuando
+# no hay ninguna con el mismo nombre normalizado ni que lo contenga
+FUZZY_CUTOFF = 0.8
+
+_SEPARATORS = re.compile(r'[^0-9a-z%]+')
+
+
+# Nombre de columna normalizado para compararlo: sin acentos, mayúsculas, paréntesis ni
+# otros signos ("Amount (converted)" → "amount converted")
+def normalize_column(name):
+    return _SEPARATORS.sub(" ", normalize_key(name)).strip()
+
+
+# Columna de columns que corresponde a cada nombre de names: primero la que tiene el
+# mismo nombre normalizado (con un índice, sin comparar todos contra todos); para los
+# nombres que quedan, la primera que lo contiene y por último la más parecida según
+# difflib. Cada columna se asigna a un solo nombre. Devuelve {nombre: columna}.
+def match_columns(names, columns, cutoff=FUZZY_CUTOFF):
+    index = {}
+    for col in columns:
+        index.setdefault(normalize_column(col), col)
+    matches, pending = {}, []
+    for name in names:
+        col = index.pop(normalize_column(name), None)
+        if col is None:
+            pending.append(name)
+        else:
+            matches[name] = col
+    for name in pending:
+        normalized = normalize_column(name)
+        contained = [key for key in index if normalized and normalized in key]
+        close = contained or difflib.get_close_matches(normalized, list(index), n=1, cutoff=cutoff)
+        if close:
+            matches[name] = index.pop(close[0])
+    return matches
+
+
+# Crear el mapeo de las columnas de Salesforce a partir del mapeo predeterminado.
+# Las columnas sin correspondencia quedan como "No mapear". La columna del archivo de
+# origen no se mapea: pasa directamente al resultado.
+def build_mapping(salesforce_columns, base_mapping=DEFAULT_MAPPING):
+    salesforce_columns = [col for col in salesforce_columns if col != SOURCE_COLUMN]
+    mapping = {col: NO_MAPEAR for col in salesforce_columns}
+    for name, col in match_columns(list(base_mapping), salesforce_columns).items():
+        mapping[col] = base_mapping[name]
+    return mapping
+
+
+# Aplicar un mapeo guardado (el JSON que descarga la aplicación, {columna Salesforce:
+# columna Netsuite}) sobre el mapeo de las columnas actuales. Las columnas guardadas se
+# buscan como en match_columns, así que sirve aunque cambie levemente algún nombre. Se
+# ignoran las que no aparecen y los destinos que no están en target_columns. Devuelve
+# (mapeo, columnas guardadas que se ignoraron).
+def load_saved_mapping(data, mapping, target_columns):
+    saved = json.loads(data)
+    if not isinstance(saved, dict) or not all(isinstance(ns_col, str) for ns_col in saved.values()):
+        raise ValueError(
+            "El mapeo guardado debe ser un objeto JSON {columna Salesforce: columna Netsuite} "
+            "con los nombres de columna como texto"
+        )
+    mapping = dict(mapping)
+    target_columns = set(target_columns)
+    matches = match_columns(list(saved), list(mapping))
+    ignored = []
+    for name, ns_col in saved.items():
+        if name not in matches or (ns_col != NO_MAPEAR and ns_col not in target_columns):
+            ignored.append(name)
+        else:
+            mapping[matches[name]] = ns_col
+    return mapping, ignored
@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+# Columnas numéricas del formato de Netsuite
+NUMERIC_COLUMNS = ["Total", "Total USD", "Quantity", "FX Rate", "FX Rate Item", "Consolidated FX Rate"]
+
+_SAMPLE_SIZE = 1000
+_SCIENTIFIC = r'[+-]?\d+(?:\.\d+)?[eE][+-]?\d+'
+
+
+# Decidir el separador decimal de una columna de texto a partir de una muestra.
+# Cada valor "vota" solo cuando no es ambiguo:
+# - "1.234,56" / "1,234.56": el último separador es el decimal
+# - "1.234.567" / "1,234,567": el separador repetido es el de miles
+# - "12,5" / "12.50": un único separador que no va seguido de 3 dígitos es el decimal
+# Si no hay votos (p. ej. solo "1,234") se usa default.
+def detect_decimal_separator(texts, default="."):
+    sample = pd.Series(texts, dtype=object).dropna().astype(str).iloc[:_SAMPLE_SIZE]
+    if sample.empty:
+        return default
+    cleaned = sample.str.replace(r'[^0-9.,]', '', regex=True)
+    last_dot = cleaned.str.rfind('.')
+    last_comma = cleaned.str.rfind(',')
+    dots = cleaned.str.count(r'\.')
+    commas = cleaned.str.count(',')
+    has_dot = dots > 0
+    has_comma = commas > 0
+    digits_after = cleaned.str.len() - np.maximum(last_dot, last_comma) - 1
+
+    dot_votes = (
+        (has_dot & has_comma & (last_dot > last_comma))
+        | (has_comma & ~has_dot & (commas > 1))
+        | (has_dot & ~has_comma & (dots == 1) & (digits_after != 3))
+    ).sum()
+    comma_votes = (
+        (has_dot & has_comma & (last_comma > last_dot))
+        | (has_dot & ~has_comma & (dots > 1))
+        | (has_comma & ~has_dot & (commas == 1) & (digits_after != 3))
+    ).sum()
+
+    if dot_votes > comma_votes:
+        return "."
+    if comma_votes > dot_votes:
+        return ","
+    return default
+
+
+# Convertir textos con separadores a float según la convención de la columna.
+# Conserva el signo negativo ("-1.234,56" o "(1.234,56)").
+def _parse_texts(texts, decimal):
+    texts = texts.str.strip()
+    negative = texts.str.startswith('-') | (texts.str.startswith('(') & texts.str.endswith(')'))
+    thousands = "," if decimal == "." else "."
+    cleaned = texts.str.replace(r'[^0-9.,]', '', regex=True).str.replace(thousands, '', regex=False)
+    if decimal == ",":
+        cleaned = cleaned.str.replace(',', '.', regex=False)
+    numbers = pd.to_numeric(cleaned, errors="coerce").to_numpy(dtype=float, copy=True)
+    numbers[negative.to_numpy(dtype=bool)] *= -1
+
+    # Notación científica ("1.5E-05"): se interpreta directamente
+    scientific = texts.str.fullmatch(_SCIENTIFIC).to_numpy(dtype=bool)
+    if scientific.any():
+        numbers[scientific] = pd.to_numeric(texts[scientific], errors="coerce").to_numpy(dtype=float)
+
+    invalid = np.isnan(numbers) & (texts != "").to_numpy(dtype=bool)
+    return numbers, invalid
+
+
+# Convertir una columna a float64 en bloque. Los textos se procesan sobre los valores
+# únicos con operaciones vectorizadas de strings. Devuelve (serie float64, separador
+# decimal usado, cantidad de celdas no convertibles).
+def parse_numeric(values, decimal=None):
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype("float64"), decimal or ".", 0
+
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    uniques = pd.Series(np.asarray(uniques, dtype=object), dtype=object)
+    is_text = np.fromiter((isinstance(v, str) for v in uniques), dtype=bool, count=len(uniques))
+    if decimal is None:
+        decimal = detect_decimal_separator(uniques[is_text])
+
+    numbers = np.full(len(uniques) + 1, np.nan)
+    invalid = np.zeros(len(uniques) + 1, dtype=bool)
+    if is_text.any():
+        text_numbers, text_invalid = _parse_texts(uniques[is_text].astype(str), decimal)
+        numbers[:-1][is_text] = text_numbers
+        invalid[:-1][is_text] = text_invalid
+    if (~is_text).any():
+        others = pd.to_numeric(uniques[~is_text], errors="coerce").to_numpy(dtype=float)
+        numbers[:-1][~is_text] = others
+        invalid[:-1][~is_text] = np.isnan(others)
+
+    result = pd.Series(numbers[codes], index=values.index, name=values.name, dtype="float64")
+    return result, decimal, int(invalid[codes].sum())
+
+
+# Convertir las columnas numéricas de un DataFrame a float64 (en el mismo DataFrame).
+# decimal puede ser un separador para todas las columnas o un diccionario por columna.
+# Devuelve un reporte {columna: {"decimal": ",", "invalid": n}}.
+def parse_numeric_columns(df, columns=NUMERIC_COLUMNS, decimal=None):
+    report = {}
+    for col in columns:
+        if col in df.columns:
+            col_decimal = decimal.get(col) if isinstance(decimal, dict) else decimal
+            df[col], used_decimal, invalid = parse_numeric(df[col], col_decimal)
+            report[col] = {"decimal": used_decimal, "invalid": invalid}
+    return report
+
+
+# Función para formatear números (eliminar separadores de miles y mantener punto decimal)
+def format_number(value):
+    try:
+        # Si es un número, convertir a string primero
+        if isinstance(value, (int, float)):
+            return str(value)
+        
+        # Si ya es string, procesar
+        if isinstance(value, str):
+            # Eliminar caracteres no numéricos excepto punto y coma
+            value = ''.join(c for c in value if c.isdigit() or c in '.,')
+            
+            # Si hay puntos y comas, asumir que el último es el decimal
+            if '.' in value and ',' in value:
+                # Determinar cuál es el separador decimal (el último)
+                last_dot_pos = value.rfind('.')
+                last_comma_pos = value.rfind(',')
+                
+                if last_dot_pos > last_comma_pos:  # El punto es el separador decimal
+                    # Eliminar todas las comas (separadores de miles)
+                    value = value.replace(',', '')
+                else:  # La coma es el separador decimal
+                    # Eliminar todos los puntos (separadores de miles) y cambiar la última coma por punto
+                    value = value.replace('.', '')
+                    value = value[:last_comma_pos] + '.' + value[last_comma_pos+1:]
+            elif ',' in value:
+                # Si solo hay comas, la última es el separador decimal
+                last_comma_pos = value.rfind(',')
+                if last_comma_pos == len(value) - 3 or last_comma_pos == len(value) - 2:
+                    # Parece ser un separador decimal, cambiar por punto
+                    value = value.replace(',', '.')
+                else:
+                    # Probablemente son separadores de miles, eliminarlos
+                    value = value.replace(',', '')
+            
+            # Intentar convertir a float y luego de nuevo a string para asegurar formato consistente
+            try:
+                return str(float(value))
+            except ValueError:
+                return value
+        return value
+    except (ValueError, TypeError):
+        # Si no se puede formatear, devolver el valor original
+        return value
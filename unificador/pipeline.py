@@ -0,0 +1,601 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from unificador.dates import normalize_dates
+from unificador.diagnostics import Diagnostics
+from unificador.export import (
+    build_excel_file, write_csv, write_excel, write_parquet, write_summary_csv, write_tables_excel,
+)
+from unificador.fx import apply_fx_rates, fx_counts
+from unificador.history import save_run, write_run_deltas
+from unificador.ingest import read_csv
+from unificador.incremental import (
+    assemble_rows, build_state, load_state, match_rows, rebuild_reason, row_fingerprints, save_state,
+)
+from unificador.mapping import build_mapping
+from unificador.numeric import NUMERIC_COLUMNS, detect_decimal_separator, parse_numeric_columns
+from unificador.profiling import StageProfiler
+from unificador.quality import check_quality, mapping_warnings
+from unificador.reconcile import reconcile
+from unificador.salesforce import column_kind, compile_mapping, mapped_pairs, transform_salesforce
+from unificador.schemas import (
+    NULL_STRINGS, SOURCE_COLUMN, category_columns, check_schema, check_sources, compact_columns, concat_frames,
+    match_schema, read_dtypes,
+)
+from unificador.summaries import build_summaries, summary_slug
+
+# Formatos de salida del pipeline: extensión de cada archivo generado (Parquet requiere pyarrow)
+OUTPUT_FORMATS = {"xlsx": ".xlsx", "csv": ".csv", "parquet": ".parquet"}
+
+# Formatos que se generan si no se indica otra cosa
+DEFAULT_FORMATS = ("xlsx", "csv")
+
+# Sufijo del directorio de estado de la unificación incremental
+STATE_SUFFIX = ".estado"
+
+# Sufijo del XLSX con el reporte de calidad que acompaña a cada resultado
+QUALITY_SUFFIX = "_calidad.xlsx"
+
+
+_PANDAS_MAJOR = int(pd.__version__.split(".")[0])
+
+
+# Activar copy-on-write en pandas 2.x (desde pandas 3.0 está siempre activo y la
+# opción está obsoleta). Así las copias son diferidas: solo se copian las columnas
+# que efectivamente se modifican.
+def enable_copy_on_write():
+    if _PANDAS_MAJOR < 3:
+        try:
+            pd.set_option("mode.copy_on_write", True)
+        except (AttributeError, KeyError):
+            pass
+
+
+def copy_on_write_enabled():
+    if _PANDAS_MAJOR >= 3:
+        return True
+    try:
+        return pd.get_option("mode.copy_on_write") is True
+    except (AttributeError, KeyError):
+        return False
+
+
+# Reemplazar en el mismo DataFrame los textos 'nan'/'None' por nulos reales, solo en las
+# columnas de texto (los números y las fechas no pueden contenerlos). En las categóricas
+# basta con quitar esas categorías.
+def normalize_null_strings(df):
+    for i, dtype in enumerate(df.dtypes):
+        if isinstance(dtype, pd.CategoricalDtype):
+            nulls = [value for value in NULL_STRINGS if value in dtype.categories]
+            if nulls:
+                df.isetitem(i, df.iloc[:, i].cat.remove_categories(nulls))
+        elif dtype == object or isinstance(dtype, pd.StringDtype):
+            mask = df.iloc[:, i].isin(NULL_STRINGS).to_numpy(dtype=bool)
+            if mask.any():
+                df.iloc[mask, i] = np.nan
+    return df
+
+
+# Leer un reporte CSV desde una ruta, un archivo abierto o su contenido en bytes.
+# La codificación, el separador y el decimal se detectan al leer (ver ingest.read_csv).
+# Con report ("netsuite" o "salesforce") las columnas conocidas se leen con los tipos
+# del esquema de la versión que corresponde al encabezado; las demás se infieren.
+def read_report(source, report=None):
+    if report is None:
+        return read_csv(source)
+
+    def schema_dtypes(header):
+        schema, _, _ = match_schema(report, header)
+        return read_dtypes(schema, header)
+
+    return read_csv(source, schema_dtypes)
+
+
+# Combinar en un solo DataFrame los reportes de varios archivos del mismo tipo. Las
+# columnas se reconcilian como en concat_frames: el resultado tiene todas y las que le
+# faltan a un archivo quedan nulas en sus filas (se registran en attrs["files"]). Con
+# tag=True cada fila lleva el nombre de su archivo en SOURCE_COLUMN (como category).
+# Las columnas se quitan de los DataFrames recibidos a medida que se combinan, para no
+# tener los datos dos veces en memoria: si los originales se siguen usando hay que
+# pasar copias superficiales (df.copy(deep=False)).
+def combine_reports(frames, names, tag=True):
+    frames = list(frames)
+    names = list(names)
+    columns = []
+    for frame in frames:
+        columns.extend(col for col in frame.columns if col not in columns)
+    files = [
+        {
+            "name": name,
+            "rows": len(frame),
+            "missing": [col for col in columns if col not in frame.columns],
+            "ingest": frame.attrs.get("ingest"),
+        }
+        for frame, name in zip(frames, names)
+    ]
+    if tag:
+        dtype = pd.CategoricalDtype(pd.unique(pd.Series(names, dtype=object)))
+        for frame, name in zip(frames, names):
+            codes = np.full(len(frame), dtype.categories.get_loc(name), dtype=np.int32)
+            frame[SOURCE_COLUMN] = pd.Categorical.from_codes(codes, dtype=dtype)
+
+    combined = concat_frames(frames, release=True)
+    # El decimal detectado en el primer archivo sirve de referencia (ver detect_decimals)
+    if files[0]["ingest"] is not None:
+        combined.attrs["ingest"] = files[0]["ingest"]
+    combined.attrs["files"] = files
+    return combined
+
+
+# Nombre del archivo i de un reporte: el de su ruta (la ruta completa con full=True), el
+# atributo name de un archivo abierto o subido, o "archivo N" para contenidos en bytes.
+def source_name(source, i, full=False):
+    name = source if isinstance(source, (str, Path)) else getattr(source, "name", None)
+    if not isinstance(name, (str, Path)) or not str(name):
+        return f"archivo {i + 1}"
+    return str(name) if full else Path(name).name
+
+
+# Leer uno o varios archivos de un mismo reporte (rutas, archivos abiertos o contenidos en
+# bytes). Los archivos se leen en paralelo en hilos (pyarrow y el motor C de pandas
+# liberan el GIL mientras leen) y se combinan con combine_reports. names son los nombres
+# de cada archivo (por defecto, los de source_name) y tag indica si se marca el archivo
+# de origen de cada fila (por defecto, solo si hay más de un archivo). Un único archivo
+# sin marcar se devuelve tal como se leyó.
+def load_reports(sources, report=None, names=None, tag=None, max_workers=None):
+    if isinstance(sources, (str, Path, bytes, bytearray)) or hasattr(sources, "read"):
+        sources = [sources]
+    sources = list(sources)
+    if not sources:
+        raise ValueError(f"No hay archivos para el reporte {report or ''}".strip())
+    if names is None:
+        names = [source_name(source, i) for i, source in enumerate(sources)]
+        if len(set(names)) < len(names):
+            # Archivos con el mismo nombre en directorios distintos
+            names = [source_name(source, i, full=True) for i, source in enumerate(sources)]
+    if tag is None:
+        tag = len(sources) > 1
+
+    if len(sources) == 1:
+        frames = [read_report(sources[0], report)]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            frames = list(executor.map(lambda source: read_report(source, report), sources))
+    if len(frames) == 1 and not tag:
+        return frames[0]
+    return combine_reports(frames, names, tag)
+
+
+# Separador decimal de cada columna numérica, detectado sobre los reportes de origen:
+# los textos de Netsuite y los de las columnas de Salesforce que se copian sin convertir.
+# Si una columna no alcanza para decidir se usa el decimal detectado al leer el archivo
+# de Netsuite. Depende solo de los archivos y del mapeo, no de qué filas se procesen.
+def detect_decimals(netsuite_df, salesforce_df, mapping):
+    default = netsuite_df.attrs.get("ingest", {}).get("decimal", ".")
+    target_columns = list(netsuite_df.columns)
+    copied = {
+        ns_col: sf_col for sf_col, ns_col in mapped_pairs(mapping, target_columns)
+        if column_kind(sf_col, ns_col) == "copy"
+    }
+    decimals = {}
+    for col in NUMERIC_COLUMNS:
+        sources = [netsuite_df[col]] if col in netsuite_df.columns else []
+        if col in copied:
+            sources.append(salesforce_df[copied[col]])
+        if not sources:
+            continue
+        values = pd.unique(np.concatenate([np.asarray(source.unique(), dtype=object) for source in sources]))
+        texts = [value for value in values if isinstance(value, str) and value not in ('nan', 'None')]
+        decimals[col] = detect_decimal_separator(texts, default)
+    return decimals
+
+
+# Preparar un DataFrame de Netsuite para recibir los datos de Salesforce: columna Estado,
+# archivo de origen (si solo lo trae Salesforce) y fechas normalizadas. Con copy-on-write
+# la copia no duplica los datos: solo se copian las columnas que se modifican.
+def prepare_netsuite(netsuite_df, salesforce_columns, categories):
+    result_df = netsuite_df.copy(deep=not copy_on_write_enabled())
+
+    # Añadir columna "Estado" a Netsuite con valor "CONFIRMADO" (como category)
+    if "Estado" not in result_df.columns:
+        result_df["Estado"] = pd.Categorical.from_codes(np.zeros(len(result_df), dtype=np.int8), ["CONFIRMADO"])
+
+    # Si solo Salesforce trae el archivo de origen, la columna se agrega (vacía) para conservarlo
+    if SOURCE_COLUMN in salesforce_columns and SOURCE_COLUMN not in result_df.columns:
+        result_df[SOURCE_COLUMN] = pd.Categorical.from_codes(np.full(len(result_df), -1, dtype=np.int8), [])
+
+    # Unificar formato de fechas en el DataFrame de Netsuite
+    if "Date" in result_df.columns:
+        result_df["Date"] = normalize_dates(result_df["Date"], "netsuite")
+    return compact_columns(result_df, categories)
+
+
+# Convertir a float las columnas numéricas de una parte del resultado (separadores de
+# miles y decimales por columna), en el mismo DataFrame. Antes se reemplazan los textos
+# 'nan'/'None' por nulos reales. Devuelve el informe de parse_numeric_columns.
+def convert_numbers(part, decimals):
+    normalize_null_strings(part)
+    return parse_numeric_columns(part, decimal=decimals)
+
+
+# Valores no interpretables por columna, sumando los informes de convert_numbers
+def count_invalid_numbers(numeric_reports):
+    invalid_numbers = {
+        col: sum(report[col]["invalid"] for report in numeric_reports if col in report)
+        for col in NUMERIC_COLUMNS
+    }
+    return {col: count for col, count in invalid_numbers.items() if count}
+
+
+def invalid_numbers_warning(invalid_numbers):
+    return "Valores numéricos que no se pudieron interpretar: " + ", ".join(
+        f"{col}: {count}" for col, count in invalid_numbers.items()
+    )
+
+
+# Registrar en result los mapeos aplicados y ejemplos de los valores mapeados en la
+# primera fila de Salesforce. Las advertencias sobre las columnas que quedaron sin datos
+# salen del reporte de calidad, que revisa todas las filas (ver quality.mapping_warnings).
+def describe_mapping(result, mapping, target_columns, salesforce_df, temp_salesforce):
+    # Mapeos aplicados (son los mismos para todas las filas)
+    result["mappings_applied"] = [f"{sf_col} → {ns_col}" for sf_col, ns_col in mapped_pairs(mapping, target_columns)]
+
+    # Ejemplos de los valores mapeados en la primera fila
+    first_source = salesforce_df.iloc[0]
+    first_mapped = temp_salesforce.iloc[0]
+    important_cols = ["_PM", "_Client Leader AUX", "Date", "Total", "Total USD", "Estado"]
+    for col in important_cols:
+        if col in temp_salesforce.columns:
+            source_col = next((sf for sf, ns in mapping.items() if ns == col), "Desconocido")
+            source_value = first_source.get(source_col, "N/A") if source_col != "Desconocido" else "N/A"
+            result["examples"].append((col, source_value, first_mapped[col]))
+
+
+# Unificar los datos de Netsuite y Salesforce.
+# Devuelve un diccionario con el DataFrame combinado ("combined_df") y la información
+# del proceso: diagnósticos, mapeos aplicados, ejemplos, advertencias y el reporte de
+# calidad de todas las filas ("quality", ver quality.QualityCheck).
+# decimals fija el separador decimal de cada columna (por defecto se detecta),
+# profiler (un StageProfiler) mide cada etapa y reconcile_policy indica qué hacer con las
+# filas de Salesforce que ya están en Netsuite (ver reconcile.RECONCILE_POLICIES). Con
+# quality=False no se arma el reporte de calidad (lo arma quien combine el resultado).
+# fx_rates (un fx.FxRates, opcional) completa los tipos de cambio de las filas de
+# Salesforce (ver fx.apply_fx_rates); cuántas quedaron con y sin tipo de cambio va en "fx".
+def unify(netsuite_df, salesforce_df, mapping, decimals=None, profiler=None, reconcile_policy="ninguna",
+          quality=True, fx_rates=None):
+    if profiler is None:
+        profiler = StageProfiler(enabled=False)
+
+    if decimals is None:
+        with profiler.stage("Detectar separadores decimales", rows=len(netsuite_df) + len(salesforce_df)):
+            decimals = detect_decimals(netsuite_df, salesforce_df, mapping)
+
+    diagnostics = Diagnostics()
+    netsuite_schema = check_schema("netsuite", netsuite_df.columns, diagnostics)
+    check_schema("salesforce", salesforce_df.columns, diagnostics)
+    check_sources("netsuite", netsuite_df, diagnostics)
+    check_sources("salesforce", salesforce_df, diagnostics)
+    categories = category_columns(netsuite_schema) + [SOURCE_COLUMN]
+
+    # Verificar si hay columnas duplicadas en Netsuite
+    if len(netsuite_df.columns) != len(set(netsuite_df.columns)):
+        diagnostics.warning("Columnas duplicadas", "Se detectaron columnas duplicadas en el archivo de Netsuite. Se renombrarán automáticamente para evitar conflictos.")
+
+    with profiler.stage("Preparar Netsuite", rows=len(netsuite_df)) as stage:
+        result_df = prepare_netsuite(netsuite_df, salesforce_df.columns, categories)
+        stage["frame"] = result_df
+
+    # Transferir datos de Salesforce según el mapeo, columna por columna
+    plan = compile_mapping(mapping, result_df.columns)
+    with profiler.stage("Transformar Salesforce", rows=len(salesforce_df)) as stage:
+        temp_salesforce = transform_salesforce(
+            salesforce_df, mapping, result_df.columns, diagnostics=diagnostics, target_dtypes=result_df.dtypes,
+            progress=profiler.progress, plan=plan,
+        )
+        stage["frame"] = temp_salesforce
+
+    result = {
+        "diagnostics": diagnostics,
+        "mappings_applied": [],
+        "examples": [],
+        "warnings": [],
+        "column_warnings": [],
+        "decimals": decimals,
+    }
+
+    has_salesforce = len(temp_salesforce) > 0
+    if has_salesforce:
+        describe_mapping(result, mapping, result_df.columns, salesforce_df, temp_salesforce)
+
+    # Convertir las columnas numéricas a float (separadores de miles y decimales por columna)
+    # en cada parte antes de combinarlas: así no se arman columnas mixtas de texto y números.
+    # Sin filas de Salesforce se convierte igual la parte de Netsuite.
+    parts = [result_df, temp_salesforce] if has_salesforce else [result_df]
+    with profiler.stage("Convertir números", rows=sum(len(part) for part in parts)):
+        numeric_reports = [convert_numbers(part, decimals) for part in parts]
+    invalid_numbers = count_invalid_numbers(numeric_reports)
+
+    if has_salesforce:
+        if fx_rates is not None:
+            with profiler.stage("Aplicar tipos de cambio", rows=len(temp_salesforce)):
+                apply_fx_rates(temp_salesforce, fx_rates, plan, diagnostics)
+
+        with profiler.stage("Combinar", rows=len(result_df) + len(temp_salesforce)) as stage:
+            # Combinar los DataFrames de manera segura, asegurando que tengan las mismas columnas
+            # y las mismas categorías en las columnas categóricas. Las partes se liberan
+            # a medida que se combinan.
+            combined_df = concat_frames([result_df, temp_salesforce], release=True)
+            stage["frame"] = combined_df
+
+        # Unificar formato de todas las fechas para que sean ordenables
+        if "Date" in combined_df.columns:
+            with profiler.stage("Normalizar fechas", rows=len(combined_df)):
+                combined_df["Date"] = normalize_dates(combined_df["Date"])
+    else:
+        combined_df = result_df
+    if invalid_numbers:
+        result["warnings"].append(invalid_numbers_warning(invalid_numbers))
+    compact_columns(combined_df, categories)
+
+    result["combined_df"] = combined_df
+    describe_fx(result, fx_rates, len(netsuite_df))
+    result["quality"] = None
+    if quality:
+        attach_quality(result, netsuite_df, salesforce_df, mapping, profiler)
+    return reconcile_result(result, len(netsuite_df), reconcile_policy, profiler)
+
+
+# Registrar en result["fx"] los tipos de cambio usados (key, el de fx.FxRates) y cuántas
+# filas de Salesforce del resultado, todavía sin conciliar, quedaron con y sin tipo de
+# cambio. Sin tipos de cambio queda en None.
+def describe_fx(result, fx_rates, netsuite_rows):
+    result["fx"] = None
+    if fx_rates is not None:
+        result["fx"] = {"key": fx_rates.key, **fx_counts(result["combined_df"].iloc[netsuite_rows:])}
+    return result
+
+
+# Agregar al resultado (todavía sin conciliar) el reporte de calidad de todas sus filas y
+# las advertencias del mapeo que salen de él
+def attach_quality(result, netsuite_df, salesforce_df, mapping, profiler):
+    combined_df = result["combined_df"]
+    with profiler.stage("Controlar calidad", rows=len(netsuite_df) + len(salesforce_df) + len(combined_df)):
+        plan = compile_mapping(mapping, combined_df.columns)
+        result["quality"] = check_quality(netsuite_df, salesforce_df, combined_df, plan)
+    result["column_warnings"] = mapping_warnings(result["quality"])
+    return result
+
+
+# Conciliar el resultado de una unificación con Netsuite según policy. El resumen
+# (filas de Salesforce que ya estaban en Netsuite) queda en result["reconciliation"].
+def reconcile_result(result, netsuite_rows, policy, profiler):
+    result["reconciliation"] = None
+    if policy == "ninguna":
+        return result
+    with profiler.stage("Conciliar con Netsuite", rows=len(result["combined_df"])) as stage:
+        result["combined_df"], result["reconciliation"] = reconcile(
+            result["combined_df"], netsuite_rows, policy, result["diagnostics"]
+        )
+        stage["frame"] = result["combined_df"]
+    return result
+
+
+# Unificar reutilizando el resultado previo (state): solo las filas nuevas o modificadas
+# de cada reporte pasan por unify() y las eliminadas se descartan. El resultado es el
+# mismo que el de una unificación completa, que se hace igualmente si cambió el mapeo,
+# las columnas o las convenciones numéricas. La conciliación con Netsuite depende de
+# todas las filas, así que se aplica sobre el resultado completo; el estado guarda el
+# resultado sin conciliar. Si cambian los tipos de cambio (fx_rates) se unifica todo.
+# Devuelve (resultado, estado nuevo).
+def unify_incremental(netsuite_df, salesforce_df, mapping, state=None, profiler=None, reconcile_policy="ninguna",
+                      fx_rates=None):
+    if profiler is None:
+        profiler = StageProfiler(enabled=False)
+
+    with profiler.stage("Detectar separadores decimales", rows=len(netsuite_df) + len(salesforce_df)):
+        decimals = detect_decimals(netsuite_df, salesforce_df, mapping)
+    fx_key = fx_rates.key if fx_rates is not None else None
+    reason = rebuild_reason(state, netsuite_df, salesforce_df, mapping, decimals, fx_key)
+    total_rows = len(netsuite_df) + len(salesforce_df)
+
+    if reason is not None:
+        result = unify(netsuite_df, salesforce_df, mapping, decimals, profiler, fx_rates=fx_rates)
+        with profiler.stage("Calcular huellas", rows=total_rows):
+            state = build_state(netsuite_df, salesforce_df, mapping, result)
+        result["incremental"] = {"full": True, "reason": reason, "reprocessed": total_rows, "reused": 0, "discarded": 0}
+        result["diagnostics"].info("Unificación completa", f"Unificación completa: {reason}.")
+        return reconcile_result(result, len(netsuite_df), reconcile_policy, profiler), state
+
+    with profiler.stage("Calcular huellas", rows=total_rows):
+        fingerprints = (row_fingerprints(netsuite_df), row_fingerprints(salesforce_df))
+        netsuite_positions = match_rows(state["netsuite_fingerprints"], fingerprints[0])
+        salesforce_positions = match_rows(state["salesforce_fingerprints"], fingerprints[1])
+    previous_rows = len(state["netsuite_fingerprints"]) + len(state["salesforce_fingerprints"])
+    # Filas previas sin pareja: se eliminaron o se modificaron
+    discarded = previous_rows - int((netsuite_positions >= 0).sum() + (salesforce_positions >= 0).sum())
+    # La primera fila de Salesforce se procesa siempre: de ella salen los ejemplos del mapeo
+    salesforce_positions[0] = -1
+
+    result = unify(
+        netsuite_df[netsuite_positions < 0], salesforce_df[salesforce_positions < 0], mapping, decimals, profiler,
+        quality=False, fx_rates=fx_rates,
+    )
+    with profiler.stage("Reutilizar filas previas", rows=total_rows) as stage:
+        result["combined_df"] = assemble_rows(
+            state["combined_df"], len(state["netsuite_fingerprints"]), result["combined_df"],
+            netsuite_positions, salesforce_positions,
+        )
+        compact_columns(result["combined_df"])
+        stage["frame"] = result["combined_df"]
+    describe_fx(result, fx_rates, len(netsuite_df))
+    attach_quality(result, netsuite_df, salesforce_df, mapping, profiler)
+
+    reused = int((netsuite_positions >= 0).sum() + (salesforce_positions >= 0).sum())
+    result["incremental"] = {
+        "full": False,
+        "reason": None,
+        "reprocessed": total_rows - reused,
+        "reused": reused,
+        "discarded": discarded,
+    }
+    result["diagnostics"].info(
+        "Unificación incremental",
+        f"Unificación incremental: {total_rows - reused:,} de {total_rows:,} filas reprocesadas, "
+        f"{reused:,} reutilizadas y {discarded:,} filas previas descartadas."
+    )
+    state = build_state(netsuite_df, salesforce_df, mapping, result, fingerprints)
+    return reconcile_result(result, len(netsuite_df), reconcile_policy, profiler), state
+
+
+# Resúmenes del resultado (ver summaries.build_summaries). Si fallan se registra una
+# advertencia y el resultado queda sin resúmenes, pero la exportación sigue.
+def summarize_result(result, profiler=None):
+    if profiler is None:
+        profiler = StageProfiler(enabled=False)
+    try:
+        with profiler.stage("Calcular resúmenes", rows=len(result["combined_df"])):
+            return build_summaries(result["combined_df"])
+    except Exception as e:
+        result["warnings"].append(f"No se pudieron calcular los resúmenes: {e}")
+        return {}
+
+
+# Agregar al resultado los resúmenes (result["summaries"]) y el XLSX serializado en un
+# archivo temporal, con los resúmenes como hojas adicionales. Si falla, se registra una
+# advertencia y el resultado queda sin archivo Excel.
+def attach_excel_file(result, profiler=None):
+    if profiler is None:
+        profiler = StageProfiler(enabled=False)
+    result["summaries"] = summarize_result(result, profiler)
+    try:
+        with profiler.stage("Exportar XLSX", rows=len(result["combined_df"])):
+            result["excel_file"] = build_excel_file(
+                result["combined_df"], progress=profiler.progress, summaries=result["summaries"]
+            )
+    except Exception as e:
+        result["excel_file"] = None
+        result["warnings"].append(f"No se pudo crear el archivo Excel: {e}")
+    return result
+
+
+# Escribir el resultado en output_dir como <name>.xlsx, <name>.csv y/o <name>.parquet.
+# summaries se agregan como hojas del XLSX y, con summaries_csv=True, también como
+# archivos <name>_<resumen>.csv. El reporte de calidad (quality) va en
+# <name>_calidad.xlsx. Devuelve las rutas generadas.
+def write_outputs(combined_df, output_dir, name, formats=DEFAULT_FORMATS, summaries=None, summaries_csv=False,
+                  quality=None):
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for fmt in formats:
+        path = output_dir / f"{name}{OUTPUT_FORMATS[fmt]}"
+        with open(path, "wb") as output:
+            if fmt == "xlsx":
+                write_excel(combined_df, output, summaries=summaries)
+            elif fmt == "parquet":
+                write_parquet(combined_df, output)
+            else:
+                write_csv(combined_df, output)
+        paths.append(path)
+    if summaries_csv:
+        for summary_name, table in (summaries or {}).items():
+            path = output_dir / f"{name}_{summary_slug(summary_name)}.csv"
+            with open(path, "wb") as output:
+                write_summary_csv(table, output)
+            paths.append(path)
+    if quality is not None:
+        paths.append(write_quality(quality, output_dir, name))
+    return paths
+
+
+# Escribir el reporte de calidad (ver quality.QualityCheck.tables) como <name>_calidad.xlsx
+def write_quality(quality, output_dir, name):
+    path = Path(output_dir) / f"{name}{QUALITY_SUFFIX}"
+    with open(path, "wb") as output:
+        write_tables_excel(quality, output)
+    return path
+
+
+# Ruta del estado guardado para la unificación incremental de un par
+def state_path(output_dir, name):
+    return Path(output_dir) / f"{name}{STATE_SUFFIX}"
+
+
+# Procesar un par de reportes de punta a punta (lectura, unificación y exportación).
+# Cada reporte puede ser una ruta o una lista de rutas (por ejemplo, un archivo por
+# subsidiaria); con más de un archivo las filas quedan marcadas con su archivo de origen.
+# Sin mapeo explícito se usa el predeterminado. Con incremental=True se reutiliza el
+# estado de la ejecución anterior guardado en output_dir. reconcile_policy es la política
+# de conciliación con Netsuite y summaries_csv agrega los resúmenes como CSV separados
+# (en el XLSX van siempre). El reporte de calidad se escribe como <name>_calidad.xlsx.
+# Con history_dir el resultado se guarda además como la corrida run (por defecto, la
+# fecha de hoy) de ese historial, y las diferencias con la corrida anterior se escriben
+# en output_dir (ver history). fx_rates (un fx.FxRates) completa los tipos de cambio de
+# las filas de Salesforce. Devuelve un resumen con los tiempos de cada etapa; es una
+# función de módulo para poder ejecutarse en otro proceso.
+def process_pair(name, netsuite_path, salesforce_path, output_dir, mapping=None, formats=DEFAULT_FORMATS,
+                 incremental=False, reconcile_policy="ninguna", summaries_csv=False, history_dir=None, run=None,
+                 fx_rates=None):
+    # Se ejecuta en los procesos del CLI, que no heredan las opciones de pandas
+    enable_copy_on_write()
+    netsuite_paths = netsuite_path if isinstance(netsuite_path, (list, tuple)) else [netsuite_path]
+    salesforce_paths = salesforce_path if isinstance(salesforce_path, (list, tuple)) else [salesforce_path]
+    tag = len(netsuite_paths) > 1 or len(salesforce_paths) > 1
+    timings = {}
+    start = time.perf_counter()
+    netsuite_df = load_reports(netsuite_paths, "netsuite", tag=tag)
+    salesforce_df = load_reports(salesforce_paths, "salesforce", tag=tag)
+    timings["lectura"] = time.perf_counter() - start
+
+    if mapping is None:
+        mapping = build_mapping(salesforce_df.columns)
+
+    stage_start = time.perf_counter()
+    if incremental:
+        path = state_path(output_dir, name)
+        state = load_state(path) if path.is_dir() else None
+        result, state = unify_incremental(
+            netsuite_df, salesforce_df, mapping, state, reconcile_policy=reconcile_policy, fx_rates=fx_rates
+        )
+    else:
+        result = unify(netsuite_df, salesforce_df, mapping, reconcile_policy=reconcile_policy, fx_rates=fx_rates)
+    timings["unificación"] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    summaries = summarize_result(result)
+    paths = write_outputs(
+        result["combined_df"], output_dir, name, formats, summaries, summaries_csv, result["quality"]
+    )
+    if incremental:
+        save_state(state, path)
+    timings["exportación"] = time.perf_counter() - stage_start
+
+    history = None
+    if history_dir is not None:
+        stage_start = time.perf_counter()
+        run = save_run(result["combined_df"], history_dir, len(netsuite_df), run)
+        history, delta_paths = write_run_deltas(history_dir, run, output_dir, name)
+        paths += delta_paths
+        timings["historial"] = time.perf_counter() - stage_start
+    timings["total"] = time.perf_counter() - start
+
+    return {
+        "name": name,
+        "rows": len(result["combined_df"]),
+        "netsuite_rows": len(netsuite_df),
+        "salesforce_rows": len(salesforce_df),
+        "netsuite_files": len(netsuite_paths),
+        "salesforce_files": len(salesforce_paths),
+        "outputs": [str(path) for path in paths],
+        "warnings": result["warnings"] + result["column_warnings"],
+        "incremental": result.get("incremental"),
+        "reconciliation": result["reconciliation"],
+        "history": history,
+        "quality": result["quality"],
+        "fx": result["fx"],
+        "timings": timings,
+    }
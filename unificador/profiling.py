@@ -0,0 +1,135 @@
+import cProfile
+import json
+import marshal
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from unificador.cache import frame_size
+
+# psutil es opcional: sin él, el RSS se lee de /proc (Linux)
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Cada cuánto se muestrea el RSS mientras corre una etapa (segundos)
+SAMPLE_INTERVAL = 0.02
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+# Memoria residente actual del proceso en bytes (None si no se puede medir)
+def current_rss():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# Hilo que registra el pico de RSS mientras está activo
+class _RssSampler(threading.Thread):
+    def __init__(self, interval):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            rss = current_rss()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        rss = current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+        return self.peak
+
+
+def _mb(value):
+    return None if value is None else round(value / 1024 ** 2, 1)
+
+
+# Perfil por etapas de una unificación: tiempo, filas, filas/s, pico de RSS y memoria
+# del DataFrame resultante de cada etapa. Con enabled=False no mide nada.
+# progress (un jobs.Progress, opcional) recibe el comienzo de cada etapa, aunque no se
+# mida, y las etapas largas informan su avance a través de profiler.progress.
+#
+#     with profiler.stage("Transformar Salesforce", rows=len(df)) as stage:
+#         stage["frame"] = transform_salesforce(...)
+class StageProfiler:
+    def __init__(self, enabled=True, sample_interval=SAMPLE_INTERVAL, progress=None):
+        self.enabled = enabled
+        self.sample_interval = sample_interval
+        self.progress = progress
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        if self.progress is not None:
+            self.progress.start_stage(name)
+        info = {"rows": rows, "frame": None}
+        if not self.enabled:
+            yield info
+            return
+
+        sampler = _RssSampler(self.sample_interval)
+        rss_before = sampler.peak
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            seconds = time.perf_counter() - start
+            peak_rss = sampler.stop()
+            rows = info["rows"]
+            frame = info["frame"]
+            self.records.append({
+                "stage": name,
+                "seconds": round(seconds, 4),
+                "rows": rows,
+                "rows_per_second": round(rows / seconds) if rows and seconds > 0 else None,
+                "peak_rss_mb": _mb(peak_rss),
+                "rss_increase_mb": _mb(peak_rss - rss_before) if peak_rss is not None and rss_before is not None else None,
+                "frame_mb": _mb(frame_size(frame)) if frame is not None else None,
+            })
+
+    def total_seconds(self):
+        return sum(record["seconds"] for record in self.records)
+
+    # Tabla para mostrar en la interfaz
+    def table(self):
+        table = pd.DataFrame(self.records, columns=[
+            "stage", "seconds", "rows", "rows_per_second", "peak_rss_mb", "rss_increase_mb", "frame_mb",
+        ])
+        return table.rename(columns={
+            "stage": "Etapa",
+            "seconds": "Tiempo (s)",
+            "rows": "Filas",
+            "rows_per_second": "Filas/s",
+            "peak_rss_mb": "RSS pico (MB)",
+            "rss_increase_mb": "Aumento RSS (MB)",
+            "frame_mb": "DataFrame (MB)",
+        })
+
+    def to_json(self):
+        return json.dumps({"stages": self.records, "total_seconds": round(self.total_seconds(), 4)}, indent=2)
+
+
+# Ejecutar func con cProfile. Devuelve (resultado, estadísticas en formato .prof), que
+# pueden abrirse con pstats.Stats o herramientas como snakeviz.
+def profile_call(func, *args, **kwargs):
+    profile = cProfile.Profile()
+    result = profile.runcall(func, *args, **kwargs)
+    profile.create_stats()
+    return result, marshal.dumps(profile.stats)
@@ -0,0 +1,250 @@
+import numpy as np
+import pandas as pd
+
+from unificador.dates import month_of
+from unificador.numeric import NUMERIC_COLUMNS
+from unificador.reconcile import RECONCILE_KEYS, key_hashes
+from unificador.schemas import NULL_STRINGS, REPORT_NAMES, SOURCE_COLUMN
+from unificador.summaries import ESTADOS
+
+# Reporte de calidad de datos: recorre todas las filas de los dos reportes de entrada y
+# del resultado (no solo la primera) con operaciones vectorizadas, por partes si hace
+# falta (ver streaming). Cada control cuenta las filas con problemas y guarda algunas
+# como muestra para poder ubicarlas en el archivo de origen.
+
+# Controles del reporte: clave → nombre en el reporte
+CHECKS = {
+    "dates": "Fecha no interpretable",
+    "numbers": "Monto no interpretable",
+    "probability": "Probabilidad fuera de 0-100",
+    "estado": "Estado desconocido",
+    "duplicates": "Clave duplicada",
+}
+
+# Columna del resultado con la probabilidad de las filas de Salesforce (el mapeo
+# predeterminado lleva "Probability (%)" a Quantity)
+PROBABILITY_COLUMN = "Quantity"
+
+# Filas de muestra que se guardan por control, origen y columna
+SAMPLE_ROWS = 5
+
+# Columnas del resultado que acompañan a cada fila de muestra para identificarla
+SAMPLE_COLUMNS = [SOURCE_COLUMN, "Project(PLAN)", "Customer Parent", "Date"]
+
+# Columnas de Salesforce cuyos vacíos generan una advertencia del mapeo
+MAPPING_COLUMNS = ["_PM", "_Client Leader AUX", "Date", "Total", "Quantity"]
+
+# Nombres de las tablas del reporte (hojas del XLSX de calidad)
+SUMMARY_TABLE = "Calidad - Resumen"
+EMPTY_TABLE = "Calidad - Vacíos"
+SAMPLE_TABLE = "Calidad - Muestras"
+
+
+# Códigos por fila y valores únicos de una columna (las category ya los tienen)
+def _codes(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories
+    return pd.factorize(values)
+
+
+# Filas vacías de una columna: nulos, textos vacíos o solo espacios y los textos de
+# NULL_STRINGS. Las columnas de texto se revisan sobre sus valores únicos.
+def empty_mask(values):
+    values = pd.Series(values, copy=False)
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+        return values.isna().to_numpy()
+    codes, uniques = _codes(values)
+    texts = pd.Series(np.asarray(uniques, dtype=object), dtype=object).astype(str).str.strip()
+    empty = np.append(((texts == "") | texts.isin(NULL_STRINGS)).to_numpy(dtype=bool), True)
+    return empty[codes]
+
+
+# Fechas que no quedaron como DD/MM/YYYY válido (los vacíos no cuentan: van en Vacíos)
+def _invalid_dates(values):
+    codes, uniques = _codes(values)
+    texts = pd.Series(np.asarray(uniques, dtype=object), dtype=object).astype(str).str.strip()
+    valid = texts.map(month_of).notna() & pd.to_datetime(texts, format="%d/%m/%Y", errors="coerce").notna()
+    invalid = ~valid.to_numpy(dtype=bool) & ~((texts == "") | texts.isin(NULL_STRINGS)).to_numpy(dtype=bool)
+    return np.append(invalid, False)[codes]
+
+
+# Estados que no son ninguno de los conocidos, incluidos los vacíos
+def _unknown_estados(values):
+    codes, uniques = _codes(values)
+    known = pd.Series(np.asarray(uniques, dtype=object), dtype=object).isin(ESTADOS).to_numpy(dtype=bool)
+    return ~np.append(known, False)[codes]
+
+
+# Acumulador del reporte de calidad. Se alimenta por partes, en el orden de las filas de
+# cada reporte (offset es la posición de la primera fila de la parte en su reporte):
+# - scan_source(origen, entrada, parte): la parte de un reporte de entrada y sus filas ya
+#   convertidas al formato de Netsuite (montos convertidos), fila por fila;
+# - scan_result(origen, parte): las mismas filas ya terminadas (fechas normalizadas),
+#   antes de la conciliación.
+# plan es el de salesforce.compile_mapping: de ahí sale la columna de Salesforce de la que
+# viene cada monto. tables() arma el reporte.
+class QualityCheck:
+    def __init__(self, plan=()):
+        self.sources = {
+            "netsuite": {col: col for col in NUMERIC_COLUMNS},
+            "salesforce": {ns_col: sf_col for sf_col, ns_col, _ in plan if ns_col in NUMERIC_COLUMNS},
+        }
+        self.empty = {}
+        self.checked = {}
+        self.problems = {}
+        self.samples = {}
+        self._keys = {"netsuite": np.empty(0, dtype=np.uint64), "salesforce": np.empty(0, dtype=np.uint64)}
+        self._key_cache = {}
+
+    def _count_empty(self, stage, origin, df):
+        for col in df.columns:
+            counts = self.empty.setdefault((stage, origin, col), [0, 0])
+            counts[0] += int(empty_mask(df[col]).sum())
+            counts[1] += len(df)
+
+    # Registrar las filas de part marcadas en mask para un control y una columna. El valor
+    # de cada fila de muestra sale de values (una serie alineada con part) o de part[col].
+    def _record(self, check, origin, col, part, mask, offset, values=None):
+        key = (check, origin, col)
+        self.checked[key] = self.checked.get(key, 0) + len(part)
+        positions = np.flatnonzero(mask)
+        if not len(positions):
+            return
+        self.problems[key] = self.problems.get(key, 0) + len(positions)
+        sample = self.samples.setdefault(key, [])
+        take = positions[:SAMPLE_ROWS - len(sample)]
+        if not len(take):
+            return
+        rows = part.iloc[take]
+        if values is None:
+            values = part[col] if col in part.columns else pd.Series(np.full(len(part), None, dtype=object))
+        shown = values.iloc[take].to_numpy(dtype=object)
+        for i, position in enumerate(take):
+            row = {"Fila": int(offset + position + 1), "Valor": shown[i]}
+            for sample_col in SAMPLE_COLUMNS:
+                if sample_col in rows.columns:
+                    row[sample_col] = rows[sample_col].iloc[i]
+            sample.append(row)
+
+    def scan_source(self, origin, source_df, part, offset=0):
+        self._count_empty("Entrada", origin, source_df)
+        # Un monto convertido a nulo cuyo texto de origen no estaba vacío no se pudo interpretar
+        for col, source_col in self.sources[origin].items():
+            if col not in part.columns or source_col not in source_df.columns:
+                continue
+            positions = np.flatnonzero(part[col].isna().to_numpy())
+            mask = np.zeros(len(part), dtype=bool)
+            mask[positions] = ~empty_mask(source_df[source_col].iloc[positions])
+            self._record("numbers", origin, col, part, mask, offset, source_df[source_col])
+
+    def scan_result(self, origin, part, offset=0):
+        self._count_empty("Resultado", origin, part)
+        if "Date" in part.columns:
+            self._record("dates", origin, "Date", part, _invalid_dates(part["Date"]), offset)
+        if origin == "salesforce" and PROBABILITY_COLUMN in part.columns:
+            probability = pd.to_numeric(part[PROBABILITY_COLUMN], errors="coerce").to_numpy(dtype=float)
+            self._record("probability", origin, PROBABILITY_COLUMN, part, (probability < 0) | (probability > 100), offset)
+        if "Estado" in part.columns:
+            self._record("estado", origin, "Estado", part, _unknown_estados(part["Estado"]), offset)
+        if all(col in part.columns for col in RECONCILE_KEYS):
+            self._record("duplicates", origin, ", ".join(RECONCILE_KEYS), part, self._repeated_keys(origin, part), offset)
+
+    # Filas cuya clave de conciliación (proyecto, cliente y mes) ya apareció antes en el
+    # mismo reporte, en esta parte o en las anteriores. De las partes anteriores se
+    # guardan solo los hashes de las claves, ordenados (8 bytes por clave distinta).
+    def _repeated_keys(self, origin, part):
+        hashes, valid = key_hashes(part, cache=self._key_cache.setdefault(origin, {}))
+        repeated = pd.Series(hashes).duplicated().to_numpy() & valid
+        seen = self._keys[origin]
+        if len(seen):
+            positions = np.minimum(np.searchsorted(seen, hashes), len(seen) - 1)
+            repeated |= valid & (seen[positions] == hashes)
+        # Las claves nuevas de la parte no estaban entre las anteriores: basta con ordenarlas
+        self._keys[origin] = np.sort(np.concatenate([seen, hashes[valid & ~repeated]]))
+        return repeated
+
+    # Tablas del reporte: nombre → DataFrame, listas para escribirse como hojas del XLSX
+    # o como CSV. Resumen tiene una fila por control, origen y columna revisados (con 0
+    # filas si no hubo problemas); Vacíos, los vacíos de cada columna de entrada y del
+    # resultado; Muestras, hasta SAMPLE_ROWS filas con problemas de cada control, con su
+    # número de fila de datos en el reporte de origen (sin contar el encabezado).
+    def tables(self):
+        # Mismo orden sea cual sea el orden en que se revisaron las partes: por origen y
+        # control (o etapa); las columnas, en el orden en que aparecieron
+        origins, checks, stages = list(REPORT_NAMES), list(CHECKS), ["Entrada", "Resultado"]
+        self.checked = dict(sorted(self.checked.items(), key=lambda item: (origins.index(item[0][1]), checks.index(item[0][0]))))
+        self.samples = dict(sorted(self.samples.items(), key=lambda item: (origins.index(item[0][1]), checks.index(item[0][0]))))
+        self.empty = dict(sorted(self.empty.items(), key=lambda item: (origins.index(item[0][1]), stages.index(item[0][0]))))
+        summary = pd.DataFrame(
+            [
+                {
+                    "Control": CHECKS[check],
+                    "Origen": REPORT_NAMES[origin],
+                    "Columna": col,
+                    "Filas revisadas": rows,
+                    "Filas con problemas": self.problems.get((check, origin, col), 0),
+                }
+                for (check, origin, col), rows in self.checked.items()
+            ],
+            columns=["Control", "Origen", "Columna", "Filas revisadas", "Filas con problemas"],
+        )
+        summary["% de filas"] = (summary["Filas con problemas"] / summary["Filas revisadas"].where(summary["Filas revisadas"] > 0)).fillna(0.0)
+
+        empty = pd.DataFrame(
+            [
+                {"Etapa": stage, "Origen": REPORT_NAMES[origin], "Columna": col, "Filas": rows, "Vacías": count}
+                for (stage, origin, col), (count, rows) in self.empty.items()
+            ],
+            columns=["Etapa", "Origen", "Columna", "Filas", "Vacías"],
+        )
+        empty["% vacías"] = (empty["Vacías"] / empty["Filas"].where(empty["Filas"] > 0)).fillna(0.0)
+
+        samples = pd.DataFrame(
+            [
+                {"Control": CHECKS[check], "Origen": REPORT_NAMES[origin], "Columna": col, **row}
+                for (check, origin, col), rows in self.samples.items()
+                for row in rows
+            ],
+            columns=["Control", "Origen", "Columna", "Fila", "Valor"] + SAMPLE_COLUMNS,
+        )
+        # Las columnas de identificación que no están en el resultado no se muestran
+        missing = [col for col in SAMPLE_COLUMNS if samples[col].isna().all()]
+        samples = samples.drop(columns=missing).astype(object)
+        return {SUMMARY_TABLE: summary, EMPTY_TABLE: empty, SAMPLE_TABLE: samples}
+
+
+# Reporte de calidad de un resultado completo en memoria. combined_df tiene primero las
+# filas de netsuite_df y después las de salesforce_df, en el mismo orden y sin conciliar.
+def check_quality(netsuite_df, salesforce_df, combined_df, plan):
+    quality = QualityCheck(plan)
+    netsuite_rows = len(netsuite_df)
+    parts = {"netsuite": combined_df.iloc[:netsuite_rows], "salesforce": combined_df.iloc[netsuite_rows:]}
+    for origin, source_df in (("netsuite", netsuite_df), ("salesforce", salesforce_df)):
+        quality.scan_source(origin, source_df, parts[origin])
+        quality.scan_result(origin, parts[origin])
+    return quality.tables()
+
+
+# Filas con problemas por control, sumando orígenes y columnas: {control: filas}
+def problem_counts(tables):
+    summary = tables[SUMMARY_TABLE]
+    counts = summary.groupby("Control")["Filas con problemas"].sum()
+    return {control: int(counts[control]) for control in CHECKS.values() if counts.get(control, 0)}
+
+
+# Advertencias del mapeo: columnas importantes que quedaron vacías en las filas de
+# Salesforce del resultado (en todas o en parte de ellas)
+def mapping_warnings(tables):
+    empty = tables[EMPTY_TABLE]
+    rows = empty[(empty["Etapa"] == "Resultado") & (empty["Origen"] == REPORT_NAMES["salesforce"])]
+    warnings = []
+    for col in MAPPING_COLUMNS:
+        match = rows[rows["Columna"] == col]
+        if match.empty or match["Vacías"].iloc[0] == 0:
+            continue
+        count, total = int(match["Vacías"].iloc[0]), int(match["Filas"].iloc[0])
+        if count == total:
+            warnings.append(f"⚠️ La columna '{col}' no parece tener datos mapeados correctamente.")
+        else:
+            warnings.append(f"⚠️ La columna '{col}' quedó vacía en {count:,} de {total:,} filas de Salesforce.")
+    return warnings
@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+
+from unificador.dates import month_of
+from unificador.schemas import compact_columns
+from unificador.text import normalize_key
+
+# Qué hacer con las filas de Salesforce que ya están registradas en Netsuite (la misma
+# oportunidad ya facturada), para no contarlas dos veces
+RECONCILE_POLICIES = {
+    "ninguna": "No conciliar (se conservan ambas filas)",
+    "marcar": "Marcar los duplicados",
+    "excluir": "Marcar los duplicados como NO INCLUIR",
+    "eliminar": "Quitar los duplicados del resultado",
+}
+
+# Columnas (ya en el formato de Netsuite) que identifican una misma oportunidad:
+# proyecto/oportunidad, cliente y mes. Las fechas se comparan por mes.
+RECONCILE_KEYS = ["Project(PLAN)", "Customer Parent", "Date"]
+MONTH_KEYS = ["Date"]
+
+# Columna que indica si una fila de Salesforce ya estaba en Netsuite
+DUPLICATE_COLUMN = "_Duplicado Netsuite"
+
+# Multiplicador (impar) para combinar los hashes de las partes de una clave
+_HASH_MULTIPLIER = np.uint64(0x100000001B3)
+
+
+# Mes (YYYY-MM) de una fecha DD/MM/YYYY; otros formatos se comparan como texto
+def month_key(value):
+    month = month_of(value)
+    return normalize_key(value) if month is None else month
+
+
+# Código entero de la clave normalizada de cada fila (-1 si es nula). La normalización
+# se hace solo sobre los valores únicos de la columna.
+def _key_codes(values, normalize):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, uniques = pd.factorize(values)
+    keys, _ = pd.factorize(pd.Series([normalize(value) for value in uniques], dtype=object))
+    keys = np.append(keys, -1)
+    return keys[codes]
+
+
+# Clave compuesta de cada fila como un código denso (0..n-1) a partir de los códigos de
+# cada columna, combinándolos de a uno y volviendo a factorizar para que no desborden.
+# Las filas con alguna clave nula quedan en -1.
+def _combined_codes(columns):
+    valid = np.ones(len(columns[0]), dtype=bool)
+    combined = np.zeros(len(columns[0]), dtype=np.int64)
+    for codes in columns:
+        valid &= codes >= 0
+        size = int(codes.max()) + 1 if len(codes) else 1
+        combined, _ = pd.factorize(combined * size + np.maximum(codes, 0))
+    combined[~valid] = -1
+    return combined
+
+
+# Filas de Salesforce del resultado combinado (las que siguen a las netsuite_rows filas
+# de Netsuite) que coinciden con alguna fila de Netsuite en todas las claves. Usa un
+# índice por clave, no comparaciones de a pares: el costo es lineal en la cantidad de filas.
+def find_duplicates(combined_df, netsuite_rows, keys=RECONCILE_KEYS):
+    columns = [
+        _key_codes(combined_df[col], month_key if col in MONTH_KEYS else normalize_key)
+        for col in keys
+    ]
+    codes = _combined_codes(columns)
+    netsuite_codes = codes[:netsuite_rows]
+    salesforce_codes = codes[netsuite_rows:]
+    booked = np.zeros(int(codes.max()) + 2 if len(codes) else 1, dtype=bool)
+    booked[netsuite_codes[netsuite_codes >= 0]] = True
+    return (salesforce_codes >= 0) & booked[salesforce_codes]
+
+
+# Conciliar las filas de Salesforce con las de Netsuite según policy (ver
+# RECONCILE_POLICIES). Devuelve (DataFrame resultante, resumen). Los duplicados se
+# registran en diagnostics; con "marcar" y "excluir" quedan marcados en DUPLICATE_COLUMN.
+def reconcile(combined_df, netsuite_rows, policy="ninguna", diagnostics=None, keys=RECONCILE_KEYS):
+    if policy not in RECONCILE_POLICIES:
+        raise ValueError(f"Política de conciliación desconocida: {policy}")
+    if policy == "ninguna":
+        return combined_df, None
+
+    if not check_keys(combined_df.columns, diagnostics, keys):
+        return combined_df, {"policy": policy, "matched": 0, "by_estado": {}}
+
+    duplicates = find_duplicates(combined_df, netsuite_rows, keys)
+    summary = {"policy": policy, "matched": int(duplicates.sum()), "by_estado": {}}
+    if summary["matched"] and "Estado" in combined_df.columns:
+        summary["by_estado"] = count_by_estado(combined_df["Estado"].iloc[netsuite_rows:][duplicates])
+    report_duplicates(summary, diagnostics)
+
+    flags = np.concatenate([np.zeros(netsuite_rows, dtype=bool), duplicates])
+    return apply_policy(combined_df, flags, policy), summary
+
+
+# Verificar que estén las columnas de la clave; si falta alguna se registra en diagnostics
+def check_keys(columns, diagnostics=None, keys=RECONCILE_KEYS):
+    missing = [col for col in keys if col not in columns]
+    if missing and diagnostics is not None:
+        diagnostics.warning(
+            "Conciliación",
+            f"No se pudo conciliar con Netsuite: faltan las columnas {', '.join(missing)}",
+        )
+    return not missing
+
+
+def count_by_estado(estados):
+    return {str(estado): int(count) for estado, count in estados.value_counts().items() if count}
+
+
+def report_duplicates(summary, diagnostics):
+    if diagnostics is not None and summary["matched"]:
+        detail = ", ".join(f"{estado}: {count:,}" for estado, count in summary["by_estado"].items())
+        diagnostics.info(
+            "Conciliación",
+            f"{summary['matched']:,} filas de Salesforce ya están en Netsuite ({detail}); "
+            f"política: {RECONCILE_POLICIES[summary['policy']].lower()}",
+            summary["matched"],
+        )
+
+
+# Aplicar policy a las filas marcadas en flags: "eliminar" las quita; "marcar" y
+# "excluir" las marcan en DUPLICATE_COLUMN y "excluir" además las pasa a NO INCLUIR
+def apply_policy(df, flags, policy):
+    if policy == "eliminar":
+        result = df[~flags].reset_index(drop=True)
+        return compact_columns(result)
+
+    result = df.copy(deep=False)
+    result[DUPLICATE_COLUMN] = flags
+    if policy == "excluir" and "Estado" in result.columns:
+        estado = result["Estado"].astype("category")
+        if "NO INCLUIR" not in estado.cat.categories:
+            estado = estado.cat.add_categories(["NO INCLUIR"])
+        result["Estado"] = estado.where(~flags, "NO INCLUIR")
+        compact_columns(result, ["Estado"])
+    return result
+
+
+# Hash de 64 bits de la clave compuesta normalizada de cada fila, y si la fila tiene
+# todas las partes de la clave. Sirve para conciliar por partes: los hashes de Netsuite
+# se acumulan (8 bytes por clave distinta) y cada parte de Salesforce se busca entre
+# ellos (ver streaming). cache (columna → {valor: valor normalizado}) evita normalizar
+# en cada parte los valores que ya aparecieron en las anteriores. Solo se hashean los
+# valores únicos de cada columna; los hashes por fila se combinan como números, sin
+# armar un texto por fila.
+def key_hashes(df, keys=RECONCILE_KEYS, cache=None):
+    cache = {} if cache is None else cache
+    hashes = np.zeros(len(df), dtype=np.uint64)
+    valid = np.ones(len(df), dtype=bool)
+    for col in keys:
+        values = df[col]
+        normalize = month_key if col in MONTH_KEYS else normalize_key
+        normalized_values = cache.setdefault(col, {})
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+        else:
+            codes, uniques = pd.factorize(values)
+        normalized = []
+        for value in uniques.tolist():
+            if value not in normalized_values:
+                normalized_values[value] = normalize(value)
+            normalized.append(normalized_values[value])
+        unique_hashes = np.append(pd.util.hash_array(np.array(normalized, dtype=object)), np.uint64(0))
+        valid &= codes >= 0
+        # Combinación de polinomio módulo 2**64 (la multiplicación desborda a propósito)
+        hashes = hashes * _HASH_MULTIPLIER + unique_hashes[codes]
+    return hashes, valid
@@ -0,0 +1,365 @@
+import calendar
+import re
+
+import numpy as np
+import pandas as pd
+
+from unificador.schemas import SOURCE_COLUMN
+
+NO_MAPEAR = "No mapear"
+
+# Nombres de mes en inglés y español (abreviados) usados por los reportes
+MONTH_NUMBERS = {
+    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12,
+    'Ene': 1, 'Abr': 4, 'Ago': 8, 'Dic': 12
+}
+
+# Patrones posibles para extraer mes y año de la columna Month de Salesforce
+_MONTH_PATTERNS = [
+    re.compile(r'([A-Za-z]+)\.(\d{4})'),        # Mmm.YYYY
+    re.compile(r'([A-Za-z]+)(\d{4})'),          # MmmYYYY
+    re.compile(r'([A-Za-z]+)[^0-9]+(\d{4})'),   # Cualquier separador
+    re.compile(r'(\d{1,2})[/\-](\d{4})'),       # MM/YYYY o MM-YYYY
+]
+_YEAR_SEARCH = re.compile(r'(\d{4})')
+_MONTH_SEARCH = re.compile(r'(?<!\d)([1-9]|1[0-2])(?!\d)')
+
+
+# Determinar el tratamiento especial que corresponde a un par de columnas mapeadas
+def column_kind(sf_col, ns_col):
+    if "Client Leader" in sf_col and ("_Client Leader AUX" in ns_col or "_Client Leader" in ns_col):
+        return "client_leader"
+    if "Project Manager" in sf_col and ("_PM" in ns_col or ns_col.endswith("PM")):
+        return "project_manager"
+    if "Month" in sf_col and "Date" in ns_col:
+        return "month"
+    if "Amount" in sf_col and "converted" in sf_col and "Total" in ns_col:
+        return "amount"
+    return "copy"
+
+
+# Pares (columna Salesforce, columna Netsuite) que efectivamente se transfieren
+def mapped_pairs(mapping, target_columns):
+    target_columns = set(target_columns)
+    return [
+        (sf_col, ns_col) for sf_col, ns_col in mapping.items()
+        if ns_col != NO_MAPEAR and ns_col in target_columns
+    ]
+
+
+# Plan de un mapeo: (columna Salesforce, columna Netsuite, tratamiento) de cada par que
+# se transfiere. Se arma una vez por unificación y transform_salesforce lo reutiliza en
+# cada parte, sin volver a resolver el mapeo.
+def compile_mapping(mapping, target_columns):
+    return [(sf_col, ns_col, column_kind(sf_col, ns_col)) for sf_col, ns_col in mapped_pairs(mapping, target_columns)]
+
+
+# Convertir "Mmm.YYYY" (u otras variantes) al último día del mes en formato DD/MM/YYYY.
+# Devuelve None si no se puede extraer mes y año.
+def month_to_date(month_str):
+    month_num = None
+    year_num = None
+
+    for pattern in _MONTH_PATTERNS:
+        match = pattern.match(month_str)
+        if match:
+            part1, part2 = match.groups()
+            if part1 in MONTH_NUMBERS:
+                month_num = MONTH_NUMBERS[part1]
+                year_num = int(part2)
+            elif part1.isdigit() and 1 <= int(part1) <= 12:
+                month_num = int(part1)
+                year_num = int(part2)
+            break
+
+    # Si no se pudo extraer con los patrones, buscar partes numéricas
+    if month_num is None or year_num is None:
+        year_match = _YEAR_SEARCH.search(month_str)
+        if year_match:
+            year_num = int(year_match.group(1))
+            month_match = _MONTH_SEARCH.search(month_str)
+            if month_match:
+                month_num = int(month_match.group(1))
+
+    if month_num is None or year_num is None:
+        return None
+
+    last_day = calendar.monthrange(year_num, month_num)[1]
+    return f"{last_day:02d}/{month_num:02d}/{year_num}"
+
+
+# Valor centinela: la fila no recibe asignación y conserva el valor previo
+_SKIP = object()
+
+
+# Aplicar una función escalar sobre los valores únicos de una columna y expandir el
+# resultado a todas las filas. func(valor, filas) recibe también la cantidad de filas
+# con ese valor. Los nulos no se asignan. Devuelve (valores, asignados).
+def map_unique(values, func):
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    mapped = np.empty(len(uniques) + 1, dtype=object)
+    for i, value in enumerate(uniques):
+        mapped[i] = func(value, int(counts[i]))
+    mapped[-1] = _SKIP
+    expanded = mapped[codes]
+    return expanded, np.not_equal(expanded, _SKIP)
+
+
+def _convert_client_leader(source, ns_col, diagnostics):
+    # Cambiar formato "Nombre Apellido" a "Apellido, Nombre"
+    def convert(value, rows):
+        name_str = str(value).strip()
+        if name_str == "":
+            return _SKIP
+        parts = name_str.split(maxsplit=1)
+        if len(parts) > 1:
+            formatted_name = f"{parts[1]}, {parts[0]}"
+            if diagnostics is not None:
+                diagnostics.info("Client Leader", f"Mapeando Client Leader: '{name_str}' a '{formatted_name}' en columna '{ns_col}'", rows)
+            return formatted_name
+        return name_str
+
+    return map_unique(source, convert)
+
+
+def _convert_project_manager(source, ns_col, diagnostics):
+    def convert(value, rows):
+        pm_value = str(value).strip()
+        if diagnostics is not None:
+            diagnostics.info("Project Manager", f"Mapeando Project Manager: '{pm_value}' a '{ns_col}'", rows)
+        return pm_value
+
+    return map_unique(source, convert)
+
+
+def _convert_month(source, ns_col, diagnostics):
+    # Procesamiento especial para Month a Date (Mmm.YYYY a DD/MM/YYYY)
+    def convert(value, rows):
+        month_str = str(value)
+        if month_str == "":
+            return _SKIP
+        try:
+            formatted_date = month_to_date(month_str)
+        except Exception as e:
+            if diagnostics is not None:
+                diagnostics.warning("Error de fecha", f"Error al convertir la fecha '{value}': {e}", rows)
+            return value
+        if formatted_date is None:
+            if diagnostics is not None:
+                diagnostics.warning("Fecha no reconocida", f"No se pudo extraer mes y año de '{month_str}'", rows)
+            return month_str
+        if diagnostics is not None:
+            diagnostics.info("Fecha convertida", f"Fecha convertida: '{month_str}' → '{formatted_date}'", rows)
+        return formatted_date
+
+    return map_unique(source, convert)
+
+
+# Limpiar montos ("$1,234.56" → 1234.56). Vacío → None; si no se puede convertir se
+# conserva el valor original. Los montos repetidos se limpian una sola vez.
+def _convert_amount(source, ns_col, diagnostics):
+    assigned = pd.notna(source).to_numpy()
+    values = np.full(len(source), None, dtype=object)
+    if pd.api.types.is_numeric_dtype(source) and not pd.api.types.is_bool_dtype(source):
+        values[assigned] = source.to_numpy(dtype=float)[assigned]
+        return values, assigned
+
+    codes, uniques = pd.factorize(source, use_na_sentinel=True)
+    uniques = pd.Series(np.asarray(uniques, dtype=object), dtype=object)
+    cleaned = (
+        uniques.astype(str)
+        .str.replace(',', '', regex=False)
+        .str.replace('$', '', regex=False)
+        .str.strip()
+    )
+    empty = (cleaned == "").to_numpy()
+    numbers = pd.to_numeric(cleaned.where(~empty, "0"), errors="coerce").to_numpy(dtype=float)
+    result = numbers.astype(object)
+    result[empty] = None
+
+    # to_numeric no acepta todo lo que acepta float(); reintentar solo los fallidos
+    cleaned_values = cleaned.to_numpy(dtype=object)
+    failed = np.flatnonzero(np.isnan(numbers) & ~empty)
+    if len(failed):
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    for i in failed:
+        try:
+            result[i] = float(cleaned_values[i])
+        except ValueError as e:
+            original = uniques.iat[i]
+            if diagnostics is not None:
+                diagnostics.warning("Monto no convertible", f"Error al convertir el monto '{original}': {e}", int(counts[i]))
+            result[i] = original
+
+    values[assigned] = result[codes[assigned]]
+    return values, assigned
+
+
+_CONVERTERS = {
+    "client_leader": _convert_client_leader,
+    "project_manager": _convert_project_manager,
+    "month": _convert_month,
+    "amount": _convert_amount,
+}
+
+
+# Valores de una columna como array de objetos. Las columnas tipadas (texto, category)
+# se convierten sobre los valores únicos, sin crear un objeto de Python por fila.
+def _object_values(values):
+    if isinstance(values, np.ndarray) or values.dtype == object:
+        return np.asarray(values, dtype=object)
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return np.asarray(uniques, dtype=object)[codes]
+
+
+_ESTADOS = np.array(["NO INCLUIR", "CONFIRMADO", "PIPELINE"], dtype=object)
+
+
+# Convertir una columna a números como el cálculo de TOTAL USD: los strings se limpian
+# con strip_chars y vacío equivale a 0. Devuelve (números, calculable, error).
+def _to_number(values, strip_chars):
+    numbers = np.full(len(values), np.nan)
+    computable = np.zeros(len(values), dtype=bool)
+    failed = np.zeros(len(values), dtype=bool)
+
+    present = np.not_equal(values, None)
+    inferred = pd.api.types.infer_dtype(values, skipna=True)
+    if inferred in ("floating", "integer", "mixed-integer-float", "boolean"):
+        is_str = np.zeros(len(values), dtype=bool)
+        is_num = present
+    elif inferred == "string":
+        # Los NaN de una columna de texto cuentan como números (NaN)
+        missing = pd.isna(values)
+        is_str = present & ~missing
+        is_num = present & missing
+    else:
+        is_str = np.fromiter((isinstance(v, str) for v in values), dtype=bool, count=len(values))
+        is_num = np.fromiter((isinstance(v, (int, float)) for v in values), dtype=bool, count=len(values))
+
+    if is_num.any():
+        numbers[is_num] = values[is_num].astype(float)
+        computable |= is_num
+
+    if is_str.any():
+        # Los textos repetidos (p. ej. "70%") se convierten una sola vez
+        codes, uniques = pd.factorize(values[is_str])
+        parsed = np.full(len(uniques), np.nan)
+        ok = np.zeros(len(uniques), dtype=bool)
+        for i, text in enumerate(uniques):
+            for char in strip_chars:
+                text = text.replace(char, '')
+            text = text.strip()
+            try:
+                parsed[i] = float(text) if text else 0
+                ok[i] = True
+            except ValueError:
+                pass
+        positions = np.flatnonzero(is_str)
+        numbers[positions] = parsed[codes]
+        computable[positions[ok[codes]]] = True
+        failed[positions[~ok[codes]]] = True
+
+    return numbers, computable, failed
+
+
+# Transformar el DataFrame de Salesforce al esquema de Netsuite columna por columna.
+# Equivale a recorrer las filas con iterrows() aplicando el mapeo, pero con
+# operaciones vectorizadas (y las conversiones costosas solo sobre valores únicos).
+# diagnostics (un Diagnostics) recibe los eventos de cada conversión. Con target_dtypes
+# (los tipos de las columnas de Netsuite) las columnas de texto sin datos se crean con el
+# mismo tipo, para que al concatenar no se conviertan a objetos de Python. progress (un
+# jobs.Progress, opcional) recibe el avance después de cada columna mapeada. plan es el
+# de compile_mapping(mapping, target_columns), si ya está armado.
+def transform_salesforce(salesforce_df, mapping, target_columns, diagnostics=None, target_dtypes=None,
+                         progress=None, plan=None):
+    target_columns = list(target_columns)
+    n_rows = len(salesforce_df)
+    columns = {}
+
+    if plan is None:
+        plan = compile_mapping(mapping, target_columns)
+    for i, (sf_col, ns_col, kind) in enumerate(plan):
+        if progress is not None:
+            progress.advance(i / (len(plan) + 1))
+        source = salesforce_df[sf_col].reset_index(drop=True)
+        if kind == "copy":
+            # La columna se usa tal cual, sin convertirla a objetos de Python
+            columns[ns_col] = source
+            continue
+
+        values, assigned = _CONVERTERS[kind](source, ns_col, diagnostics)
+        previous = columns.get(ns_col)
+        if previous is None:
+            previous = np.full(n_rows, None, dtype=object)
+        columns[ns_col] = np.where(assigned, values, np.asarray(previous, dtype=object))
+
+    # El archivo de origen de cada fila (si el reporte se armó con varios archivos) se conserva
+    if SOURCE_COLUMN in salesforce_df.columns and SOURCE_COLUMN in target_columns and SOURCE_COLUMN not in columns:
+        columns[SOURCE_COLUMN] = salesforce_df[SOURCE_COLUMN].reset_index(drop=True)
+
+    # Las columnas sin datos comparten un mismo array de nulos (solo se lee)
+    output_columns = list(target_columns)
+    empty = {}
+    none_values = np.full(n_rows, None, dtype=object)
+    for ns_col in target_columns:
+        if ns_col not in columns:
+            columns[ns_col] = empty[ns_col] = none_values
+
+    # Calcular TOTAL USD = TOTAL * (Probability / 100) y el Estado según Probability
+    estado = np.full(n_rows, "NO INCLUIR", dtype=object)
+    if "Total" in target_columns and "Quantity" in target_columns:
+        total = _object_values(columns["Total"])
+        quantity = _object_values(columns["Quantity"])
+        present = np.not_equal(total, None) & np.not_equal(quantity, None)
+
+        total_num, total_ok, total_failed = _to_number(total, ',$')
+        qty_num, qty_ok, qty_failed = _to_number(quantity, '%,')
+        failed = present & (total_failed | qty_failed)
+        computed = present & total_ok & qty_ok
+        # Valores de otro tipo (ni número ni texto) no modifican Estado ni TOTAL USD
+        untouched = present & ~failed & ~computed
+
+        if (computed | failed).any():
+            if "Total USD" not in columns:
+                output_columns.append("Total USD")
+            if columns.get("Total USD", none_values) is none_values:
+                # Sin valores previos la columna queda directamente como float
+                total_usd = np.full(n_rows, np.nan)
+            else:
+                total_usd = np.array(columns["Total USD"], dtype=object)
+            # Un monto infinito ("inf") por una probabilidad 0 da NaN, igual que en el cálculo
+            # por fila: es el resultado buscado, no un error
+            with np.errstate(invalid="ignore"):
+                total_usd[computed] = total_num[computed] * (qty_num[computed] / 100)
+            total_usd[failed] = None if total_usd.dtype == object else np.nan
+            columns["Total USD"] = total_usd
+            if diagnostics is not None and failed.any():
+                diagnostics.warning("TOTAL USD", f"No se pudo calcular TOTAL USD en {int(failed.sum())} filas", int(failed.sum()))
+
+        estado = _ESTADOS[np.select([qty_num == 100, (qty_num == 50) | (qty_num == 70)], [1, 2], default=0)]
+        estado[~computed] = "NO INCLUIR"
+        if untouched.any():
+            if "Estado" in columns:
+                estado[untouched] = _object_values(columns["Estado"])[untouched]
+            else:
+                estado[untouched] = None
+
+    columns["Estado"] = estado
+    if "Estado" not in output_columns:
+        output_columns.append("Estado")
+
+    # Cada columna se tipa apenas se arma y se libera su versión de objetos. Las que en
+    # Netsuite son category se crean como category (sin copiar los textos a cada fila).
+    data = {}
+    for col in output_columns:
+        values = columns.pop(col)
+        dtype = target_dtypes.get(col) if target_dtypes is not None else None
+        if col in empty and values is empty[col] and isinstance(dtype, pd.StringDtype):
+            data[col] = pd.Series(pd.array([None] * n_rows, dtype=dtype))
+        elif isinstance(dtype, pd.CategoricalDtype):
+            data[col] = pd.Series(values, dtype="category")
+        else:
+            data[col] = pd.Series(values).infer_objects()
+    return pd.DataFrame(data, columns=output_columns, copy=False)
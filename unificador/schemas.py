@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+
+from unificador.numeric import NUMERIC_COLUMNS
+
+# Tipos de columna de los esquemas:
+# - "category": etiquetas que se repiten (clientes, personas, monedas) → category
+# - "text": texto libre → str
+# - "number": montos y cantidades con los separadores de cada reporte; se leen como texto
+#   y el pipeline los convierte a float64 tras detectar el separador decimal
+# - "date": fechas en formatos mezclados; se leen como category y el pipeline las
+#   normaliza a DD/MM/YYYY (el resultado también queda como category)
+_READ_DTYPES = {"category": "category", "text": "str", "number": "str", "date": "category"}
+
+# Esquemas conocidos de cada reporte, de la versión más antigua a la más nueva. Si un
+# reporte cambia de formato se agrega una versión nueva en lugar de modificar la anterior.
+# "optional" son columnas que pueden faltar sin que cambie el formato.
+SCHEMAS = {
+    "netsuite": [
+        {
+            "name": "Delivery Tracking - Consolidated View",
+            "version": 1,
+            "columns": {
+                "Project(PLAN)": "category",
+                "Customer Parent": "category",
+                "Date": "date",
+                "_PM": "category",
+                "_Client Leader AUX": "category",
+                "Proj. Currency": "category",
+                "Estado": "category",
+                **{col: "number" for col in NUMERIC_COLUMNS},
+            },
+            "optional": ["Estado"],
+        },
+    ],
+    "salesforce": [
+        {
+            "name": "Copy of Pipeline by Month (All Accounts)",
+            "version": 1,
+            "columns": {
+                "Opportunity Name": "category",
+                "Account Name": "category",
+                "Client Leader": "category",
+                "Project Manager": "category",
+                "Month": "category",
+                "Amount Currency": "category",
+                "Amount (converted)": "number",
+                "Probability (%)": "number",
+            },
+            "optional": [],
+        },
+    ],
+}
+
+REPORT_NAMES = {"netsuite": "Netsuite", "salesforce": "Salesforce"}
+
+# Columna con el nombre del archivo de origen de cada fila, cuando un reporte se arma
+# con varios archivos. No es parte de ningún esquema: la agrega la lectura.
+SOURCE_COLUMN = "_Archivo Origen"
+
+# Textos que representan valores nulos en el resultado combinado
+NULL_STRINGS = ['nan', 'None']
+
+
+def latest_schema(report):
+    return SCHEMAS[report][-1]
+
+
+# Versión del esquema que mejor coincide con las columnas de un reporte.
+# Devuelve (esquema, columnas faltantes, columnas no declaradas); si ninguna versión
+# coincide por completo se elige la que tenga menos columnas faltantes (la más nueva
+# en caso de empate).
+def match_schema(report, columns):
+    columns = [str(col) for col in columns]
+    best = None
+    for schema in SCHEMAS[report]:
+        missing = [
+            col for col in schema["columns"] if col not in columns and col not in schema["optional"]
+        ]
+        if best is None or len(missing) <= len(best[1]):
+            best = (schema, missing)
+    schema, missing = best
+    extra = [col for col in columns if col not in schema["columns"] and col != SOURCE_COLUMN]
+    return schema, missing, extra
+
+
+# Tipos para read_csv de las columnas declaradas en el esquema; las demás se infieren
+def read_dtypes(schema, columns=None):
+    return {
+        col: _READ_DTYPES[kind] for col, kind in schema["columns"].items()
+        if columns is None or col in columns
+    }
+
+
+# Registrar en diagnostics si un reporte no coincide con su esquema: columnas faltantes
+# (el formato cambió y esas columnas no se tipan) o no declaradas (se infieren)
+def check_schema(report, columns, diagnostics):
+    schema, missing, extra = match_schema(report, columns)
+    label = f"{REPORT_NAMES[report]} ('{schema['name']}' v{schema['version']})"
+    if missing:
+        diagnostics.warning(
+            "Formato de reporte",
+            f"El reporte de {label} no tiene las columnas esperadas: {', '.join(missing)}. "
+            "Puede que el formato del reporte haya cambiado.",
+        )
+    if extra:
+        diagnostics.info(
+            "Columnas no declaradas",
+            f"Columnas de {label} sin tipo declarado (se infiere): {', '.join(extra)}",
+        )
+    return schema
+
+
+# Registrar en diagnostics las columnas que le faltan a cada archivo de un reporte armado
+# con varios archivos (ver pipeline.combine_reports): en las filas de ese archivo quedan vacías
+def check_sources(report, df, diagnostics):
+    for source in df.attrs.get("files", []):
+        if source["missing"]:
+            diagnostics.warning(
+                "Columnas faltantes por archivo",
+                f"El archivo de {REPORT_NAMES[report]} '{source['name']}' no tiene las columnas "
+                f"{', '.join(source['missing'])}; en sus {source['rows']:,} filas quedan vacías.",
+            )
+
+
+# Columnas que deben quedar como category en el resultado unificado
+def category_columns(schema):
+    return [col for col, kind in schema["columns"].items() if kind in ("category", "date")]
+
+
+# Convertir a category (en el mismo DataFrame) las columnas indicadas (por defecto, las
+# que ya son category) y dejar sus categorías en forma canónica: solo las usadas y
+# ordenadas, para que el resultado no dependa del orden en que se combinaron las partes
+def compact_columns(df, columns=None):
+    if columns is None:
+        columns = [col for col, dtype in df.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    for col in columns:
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            df[col] = values.astype("category")
+            continue
+        values = values.cat.remove_unused_categories()
+        try:
+            values = values.cat.reorder_categories(values.cat.categories.sort_values())
+        except TypeError:
+            # Categorías de tipos mezclados que no se pueden ordenar
+            pass
+        df[col] = values
+    return df
+
+
+# Concatenar columnas conservando el tipo category: las categorías se unen antes
+# (pandas convierte a object las columnas category con categorías distintas)
+def _concat_column(parts):
+    if any(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+        categories = None
+        for part in parts:
+            if isinstance(part.dtype, pd.CategoricalDtype):
+                values = part.cat.categories
+            else:
+                values = pd.Index(part.dropna().unique())
+            categories = values if categories is None else categories.union(values, sort=False)
+        dtype = pd.CategoricalDtype(categories)
+        parts = [part.astype(dtype) for part in parts]
+    return pd.concat(parts, axis=0, ignore_index=True)
+
+
+# Concatenar DataFrames columna por columna, conservando las categóricas. Como en
+# pd.concat, el resultado tiene todas las columnas y las que faltan en una parte quedan
+# nulas (con el tipo que la columna tiene en las demás partes). Con release=True cada
+# columna se quita de los DataFrames de origen apenas se concatena, así la memoria de
+# las partes se libera durante la combinación.
+def concat_frames(frames, release=False):
+    frames = list(frames)
+    columns = []
+    for frame in frames:
+        columns.extend(col for col in frame.columns if col not in columns)
+    data = {}
+    for col in columns:
+        dtype = next(frame[col].dtype for frame in frames if col in frame.columns)
+        parts = []
+        for frame in frames:
+            if col not in frame.columns:
+                part = pd.Series(np.nan, index=range(len(frame)))
+                # En enteros y booleanos los nulos quedan como float, igual que en pd.concat
+                parts.append(part if dtype.kind in "iub" else part.astype(dtype))
+            else:
+                parts.append(frame.pop(col) if release else frame[col])
+        data[col] = _concat_column(parts)
+    return pd.DataFrame(data, columns=columns, copy=False)
@@ -0,0 +1,478 @@
+import itertools
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from unificador.dates import normalize_dates
+from unificador.diagnostics import Diagnostics
+from unificador.export import ExcelStreamWriter, ParquetStreamWriter, write_csv, write_summary_csv
+from unificador.fx import apply_fx_rates, fx_counts
+from unificador.history import HistoryWriter, write_run_deltas
+from unificador.ingest import iter_csv
+from unificador.pipeline import (
+    DEFAULT_FORMATS, OUTPUT_FORMATS, build_mapping, convert_numbers, count_invalid_numbers, describe_mapping,
+    detect_decimals, enable_copy_on_write, invalid_numbers_warning, prepare_netsuite, source_name, write_quality,
+)
+from unificador.quality import QualityCheck, mapping_warnings
+from unificador.reconcile import (
+    DUPLICATE_COLUMN, RECONCILE_POLICIES, apply_policy, check_keys, count_by_estado, key_hashes, report_duplicates,
+)
+from unificador.salesforce import compile_mapping, transform_salesforce
+from unificador.schemas import (
+    SOURCE_COLUMN, category_columns, check_schema, check_sources, compact_columns, concat_frames, match_schema,
+    read_dtypes,
+)
+from unificador.summaries import (
+    aggregate, merge_aggregates, summaries_from_aggregates, summary_slug,
+)
+
+# Memoria (en MB) que puede usar la unificación por partes si no se indica otra
+DEFAULT_MEMORY_MB = 512
+
+# Memoria (en MB) que pandas y pyarrow reservan al procesar la primera parte, sea cual
+# sea su tamaño (sobre todo el asignador de memoria de Arrow). Un presupuesto menor que
+# MIN_MEMORY_MB no alcanza ni para partes chicas.
+BASE_MEMORY_MB = 128
+MIN_MEMORY_MB = 160
+
+# Memoria que ocupa el procesamiento de una parte por cada byte de CSV leído: el
+# DataFrame leído, la copia transformada, la conversión de números y los bloques que se
+# pasan a los escritores. Medido con benchmarks/memory.py --memoria-mb sobre los
+# reportes sintéticos (unos 8 bytes por byte de CSV).
+MEMORY_FACTOR = 8
+
+# Tamaño mínimo de cada parte, para que un presupuesto muy chico no la haga ineficiente
+MIN_BLOCK_BYTES = 256 * 1024
+
+
+# Bytes de CSV que se leen por parte para no pasar de memory_mb. Del presupuesto se
+# descuenta BASE_MEMORY_MB; en el resto hay a la vez una parte de Netsuite o de Salesforce
+# y la primera parte de Salesforce (que se lee al comienzo para fijar las columnas del
+# resultado), de ahí el factor 2.
+def block_size(memory_mb=DEFAULT_MEMORY_MB):
+    available = max(memory_mb - BASE_MEMORY_MB, 0) * 1024 ** 2
+    return max(MIN_BLOCK_BYTES, int(available / (2 * MEMORY_FACTOR)))
+
+
+def _source_size(source):
+    if isinstance(source, (bytes, bytearray)):
+        return len(source)
+    if hasattr(source, "seek"):
+        position = source.tell()
+        size = source.seek(0, 2)
+        source.seek(position)
+        return size
+    return Path(source).stat().st_size
+
+
+# Partes de uno o varios archivos de un mismo reporte, con las columnas de todos (las
+# que le faltan a un archivo quedan vacías) y, con tag=True, el archivo de origen de cada
+# fila en SOURCE_COLUMN. Al abrirse solo se leen los encabezados; las filas se leen al
+# recorrerlo. files lleva las filas de cada archivo (como attrs["files"] en
+# combine_reports) y fraction el avance estimado por los bytes leídos.
+class _ReportStream:
+    def __init__(self, report, sources, names, tag, block_bytes):
+        self.report = report
+        self.block_bytes = block_bytes
+        self.columns = []
+        self.dtypes = {}
+        self.files = []
+        self._readers = []
+
+        def schema_dtypes(header):
+            schema, _, _ = match_schema(report, header)
+            return read_dtypes(schema, header)
+
+        for source, name in zip(sources, names):
+            info, header, chunks = iter_csv(source, schema_dtypes, block_bytes)
+            self.columns.extend(col for col in header if col not in self.columns)
+            for col, dtype in schema_dtypes(header).items():
+                self.dtypes.setdefault(col, dtype)
+            self.files.append({"name": name, "rows": 0, "header": header, "ingest": info})
+            self._readers.append((chunks, _source_size(source)))
+        for file in self.files:
+            header = file.pop("header")
+            file["missing"] = [col for col in self.columns if col not in header]
+
+        self.tag = pd.CategoricalDtype(pd.unique(pd.Series(names, dtype=object))) if tag else None
+        if self.tag is not None:
+            self.columns.append(SOURCE_COLUMN)
+        self.total_bytes = sum(size for _, size in self._readers) or 1
+        self.read_bytes = 0
+
+    @property
+    def fraction(self):
+        return min(self.read_bytes / self.total_bytes, 1.0)
+
+    # DataFrame sin filas con las columnas y los tipos de las partes
+    def empty(self):
+        frame = pd.DataFrame({
+            col: pd.Series(dtype=self.dtypes.get(col, "str")) for col in self.columns if col != SOURCE_COLUMN
+        })
+        if self.tag is not None:
+            frame[SOURCE_COLUMN] = pd.Categorical([], dtype=self.tag)
+        frame.attrs["ingest"] = self.files[0]["ingest"]
+        return frame
+
+    def __iter__(self):
+        done = 0
+        for file, (chunks, size) in zip(self.files, self._readers):
+            file_bytes = 0
+            for chunk in chunks:
+                for col in file["missing"]:
+                    if col != SOURCE_COLUMN:
+                        chunk[col] = pd.Series(np.nan, index=chunk.index).astype(self.dtypes.get(col, "str"))
+                if self.tag is not None:
+                    codes = np.full(len(chunk), self.tag.categories.get_loc(file["name"]), dtype=np.int32)
+                    chunk[SOURCE_COLUMN] = pd.Categorical.from_codes(codes, dtype=self.tag)
+                file["rows"] += len(chunk)
+                file_bytes = min(file_bytes + self.block_bytes, size)
+                self.read_bytes = done + file_bytes
+                yield chunk[self.columns]
+            done += size
+            self.read_bytes = done
+
+    # Registrar en diagnostics las columnas faltantes por archivo (ver schemas.check_sources)
+    def check_sources(self, diagnostics):
+        holder = pd.DataFrame()
+        holder.attrs["files"] = self.files
+        check_sources(self.report, holder, diagnostics)
+
+
+# Nombres de los archivos de un reporte, como en pipeline.load_reports
+def _source_names(sources, names):
+    if names is not None:
+        return list(names)
+    names = [source_name(source, i) for i, source in enumerate(sources)]
+    if len(set(names)) < len(names):
+        names = [source_name(source, i, full=True) for i, source in enumerate(sources)]
+    return names
+
+
+# Primeras filas de un reporte (uno o varios archivos) sin leerlo completo, con las
+# columnas de todos sus archivos: la vista previa del modo por partes. El formato
+# detectado en cada archivo queda en attrs["files"].
+def preview_report(sources, report, names=None, rows=5):
+    sources = list(sources)
+    stream = _ReportStream(report, sources, _source_names(sources, names), False, MIN_BLOCK_BYTES)
+    first = next(iter(stream), None)
+    preview = stream.empty() if first is None else first.head(rows)
+    preview.attrs["files"] = [{"name": file["name"], "ingest": file["ingest"]} for file in stream.files]
+    return preview
+
+
+# Ajustar una parte a las columnas (y el orden) del resultado: las que le faltan quedan
+# nulas con el tipo de template, como en concat_frames
+def _conform(part, template):
+    for col in template.columns:
+        if col not in part.columns:
+            dtype = template[col].dtype
+            fill = pd.Series(np.nan, index=part.index)
+            part[col] = fill if dtype.kind in "iub" else fill.astype(dtype)
+    return part[list(template.columns)]
+
+
+# Escritores de las salidas pedidas; reciben las partes en orden y se cierran al final
+class _OutputWriters:
+    def __init__(self, output_dir, name, formats, template):
+        self.paths = []
+        self._files = []
+        self._writers = []
+        try:
+            for fmt in formats:
+                path = Path(output_dir) / f"{name}{OUTPUT_FORMATS[fmt]}"
+                self.paths.append(path)
+                output = open(path, "wb")
+                self._files.append(output)
+                if fmt == "xlsx":
+                    self._writers.append((fmt, ExcelStreamWriter(output, template.columns)))
+                elif fmt == "parquet":
+                    self._writers.append((fmt, ParquetStreamWriter(output, template)))
+                else:
+                    self._writers.append((fmt, output))
+        except BaseException:
+            self.abort()
+            raise
+        self._header = True
+
+    def write(self, part):
+        for fmt, writer in self._writers:
+            if fmt == "csv":
+                write_csv(part, writer, header=self._header)
+            else:
+                writer.write(part)
+        self._header = False
+
+    def close(self, summaries=None):
+        for fmt, writer in self._writers:
+            if fmt == "xlsx":
+                writer.close(summaries)
+            elif fmt == "parquet":
+                writer.close()
+        for output in self._files:
+            output.close()
+
+    # Cerrar y borrar las salidas a medio escribir (error o cancelación)
+    def abort(self):
+        for output in self._files:
+            output.close()
+        for path in self.paths:
+            path.unlink(missing_ok=True)
+
+
+# Unificar un par de reportes por partes, escribiendo el resultado en output_dir a
+# medida que se procesa (modo fuera de memoria): para resultados que no entran en
+# memoria. Cada parte pasa por el mismo mapeo, la misma conversión de números y fechas y
+# la misma lógica de Estado que en unify(); el resultado tiene las filas de Netsuite y
+# después las de Salesforce, como en la unificación completa. Lo que depende de todas
+# las filas se acumula parte por parte: los resúmenes se calculan sumando los agregados
+# de cada parte y la conciliación compara cada parte de Salesforce con el conjunto de
+# claves de Netsuite (uno por proyecto, cliente y mes, no por fila).
+#
+# memory_mb es el presupuesto de memoria aproximado para el procesamiento (el tamaño de
+# cada parte sale de block_size). Los separadores decimales se detectan sobre la primera
+# parte de cada reporte, y las columnas que no están en los esquemas se leen como texto.
+# netsuite_sources y salesforce_sources son una o varias rutas o contenidos en bytes;
+# sus nombres (para marcar el archivo de origen) se toman de las rutas o de
+# netsuite_names/salesforce_names. history_dir y run guardan el resultado en el historial
+# como en pipeline.process_pair. progress (un jobs.Progress, opcional) recibe el avance.
+# El reporte de calidad se arma parte por parte y se escribe como <name>_calidad.xlsx.
+# fx_rates (un fx.FxRates, opcional) completa los tipos de cambio de cada parte de
+# Salesforce, como en unify().
+# Devuelve un resumen como el de pipeline.process_pair, más los diagnósticos, los
+# resúmenes, los ejemplos del mapeo y las primeras filas del resultado ("preview").
+def stream_unify(name, netsuite_sources, salesforce_sources, output_dir, mapping=None, formats=DEFAULT_FORMATS,
+                 reconcile_policy="ninguna", summaries_csv=False, memory_mb=DEFAULT_MEMORY_MB,
+                 netsuite_names=None, salesforce_names=None, history_dir=None, run=None, progress=None,
+                 fx_rates=None):
+    # Se ejecuta en los procesos del CLI, que no heredan las opciones de pandas
+    enable_copy_on_write()
+    if reconcile_policy not in RECONCILE_POLICIES:
+        raise ValueError(f"Política de conciliación desconocida: {reconcile_policy}")
+    if isinstance(netsuite_sources, (str, Path, bytes, bytearray)):
+        netsuite_sources = [netsuite_sources]
+    if isinstance(salesforce_sources, (str, Path, bytes, bytearray)):
+        salesforce_sources = [salesforce_sources]
+    netsuite_sources, salesforce_sources = list(netsuite_sources), list(salesforce_sources)
+    tag = len(netsuite_sources) > 1 or len(salesforce_sources) > 1
+    block_bytes = block_size(memory_mb)
+    timings = {}
+    start = time.perf_counter()
+
+    netsuite = _ReportStream(
+        "netsuite", netsuite_sources, _source_names(netsuite_sources, netsuite_names), tag, block_bytes
+    )
+    salesforce = _ReportStream(
+        "salesforce", salesforce_sources, _source_names(salesforce_sources, salesforce_names), tag, block_bytes
+    )
+    if mapping is None:
+        mapping = build_mapping(salesforce.columns)
+
+    diagnostics = Diagnostics()
+    netsuite_schema = check_schema("netsuite", netsuite.columns, diagnostics)
+    check_schema("salesforce", salesforce.columns, diagnostics)
+    categories = category_columns(netsuite_schema) + [SOURCE_COLUMN]
+
+    if progress is not None:
+        progress.start_stage("Leer las primeras partes")
+    netsuite_chunks, salesforce_chunks = iter(netsuite), iter(salesforce)
+    first_netsuite = next(netsuite_chunks, None)
+    first_netsuite = netsuite.empty() if first_netsuite is None else first_netsuite
+    first_salesforce = next(salesforce_chunks, None)
+    first_salesforce = salesforce.empty() if first_salesforce is None else first_salesforce
+    decimals = detect_decimals(first_netsuite, first_salesforce, mapping)
+
+    # La primera parte de cada reporte fija las columnas y los tipos del resultado
+    netsuite_part = prepare_netsuite(first_netsuite, salesforce.columns, categories)
+    target_columns, target_dtypes = netsuite_part.columns, netsuite_part.dtypes
+    plan = compile_mapping(mapping, target_columns)
+    salesforce_part = transform_salesforce(
+        first_salesforce, mapping, target_columns, diagnostics=diagnostics, target_dtypes=target_dtypes, plan=plan,
+    )
+    result = {
+        "diagnostics": diagnostics,
+        "mappings_applied": [],
+        "examples": [],
+        "warnings": [],
+        "column_warnings": [],
+        "decimals": decimals,
+    }
+    if len(salesforce_part) > 0:
+        describe_mapping(result, mapping, target_columns, first_salesforce, salesforce_part)
+
+    numeric_reports = [convert_numbers(netsuite_part, decimals), convert_numbers(salesforce_part, decimals)]
+    if fx_rates is not None:
+        apply_fx_rates(salesforce_part, fx_rates, plan, diagnostics)
+    quality = QualityCheck(plan)
+    quality.scan_source("netsuite", first_netsuite, netsuite_part)
+    quality.scan_source("salesforce", first_salesforce, salesforce_part)
+    del first_netsuite, first_salesforce
+    template = concat_frames([netsuite_part.iloc[:0], salesforce_part.iloc[:0]])
+    reconcile = reconcile_policy != "ninguna" and check_keys(template.columns, diagnostics)
+    if reconcile_policy in ("marcar", "excluir"):
+        template[DUPLICATE_COLUMN] = pd.Series(dtype=bool)
+
+    # Terminar una parte ya convertida: fechas, categorías, calidad, conciliación y
+    # agregados. Los hashes de las claves de Netsuite se acumulan ordenados en booked y los
+    # de cada parte de Salesforce se buscan ahí. Una colisión de hashes de 64 bits es
+    # despreciable. Cuando se termina una parte, rows ya cuenta sus filas.
+    booked = np.empty(0, dtype=np.uint64)
+    pending = []
+    key_cache = {}
+    reconciliation = {"policy": reconcile_policy, "matched": 0, "by_estado": {}}
+    aggregates = {}
+    fx = {"key": fx_rates.key, "rows": 0, "missing": 0} if fx_rates is not None else None
+
+    def finish(part, netsuite_rows):
+        nonlocal booked, pending, aggregates
+        if "Date" in part.columns:
+            part["Date"] = normalize_dates(part["Date"])
+        compact_columns(part, categories)
+        origin = "netsuite" if netsuite_rows else "salesforce"
+        quality.scan_result(origin, part, rows[origin] - len(part))
+        if fx is not None and not netsuite_rows:
+            for key, count in fx_counts(part).items():
+                fx[key] += count
+        if reconcile:
+            hashes, valid = key_hashes(part, cache=key_cache)
+            if netsuite_rows:
+                pending.append(np.unique(hashes[valid]))
+                # Se reordena recién cuando lo pendiente supera a lo acumulado (costo amortizado)
+                if sum(len(keys) for keys in pending) > len(booked):
+                    booked = np.unique(np.concatenate([booked] + pending))
+                    pending = []
+                flags = np.zeros(len(part), dtype=bool)
+            else:
+                if pending:
+                    booked = np.unique(np.concatenate([booked] + pending))
+                    pending = []
+                positions = np.minimum(np.searchsorted(booked, hashes), max(len(booked) - 1, 0))
+                flags = valid & (booked[positions] == hashes) if len(booked) else np.zeros(len(part), dtype=bool)
+                matched = int(flags.sum())
+                if matched:
+                    reconciliation["matched"] += matched
+                    if "Estado" in part.columns:
+                        for estado, count in count_by_estado(part["Estado"][flags]).items():
+                            reconciliation["by_estado"][estado] = reconciliation["by_estado"].get(estado, 0) + count
+            if reconcile_policy != "eliminar" or flags.any():
+                part = apply_policy(part, flags, reconcile_policy)
+        part = _conform(part, template)
+        aggregates = merge_aggregates([aggregates, aggregate(part)])
+        return part
+
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    writers = _OutputWriters(output_dir, name, formats, template)
+    history = HistoryWriter(history_dir, run) if history_dir is not None else None
+    rows = {"netsuite": 0, "salesforce": 0, "result": 0, "chunks": 0}
+    try:
+        if progress is not None:
+            progress.start_stage("Unificar Netsuite")
+        stage_start = time.perf_counter()
+        for chunk in itertools.chain([None], netsuite_chunks):
+            if chunk is not None:
+                netsuite_part = prepare_netsuite(chunk, salesforce.columns, categories)
+                numeric_reports.append(convert_numbers(netsuite_part, decimals))
+                quality.scan_source("netsuite", chunk, netsuite_part, rows["netsuite"])
+            rows["netsuite"] += len(netsuite_part)
+            part = finish(netsuite_part, True)
+            if "preview" not in result:
+                result["preview"] = part.head(10)
+            netsuite_part = None
+            writers.write(part)
+            if history is not None:
+                history.write(part, len(part))
+            rows["result"] += len(part)
+            rows["chunks"] += 1
+            if progress is not None:
+                progress.advance(netsuite.fraction)
+        timings["Netsuite"] = time.perf_counter() - stage_start
+
+        if progress is not None:
+            progress.start_stage("Unificar Salesforce")
+        stage_start = time.perf_counter()
+        for chunk in itertools.chain([None], salesforce_chunks):
+            if chunk is not None:
+                salesforce_part = transform_salesforce(
+                    chunk, mapping, target_columns, diagnostics=diagnostics, target_dtypes=target_dtypes, plan=plan,
+                )
+                numeric_reports.append(convert_numbers(salesforce_part, decimals))
+                if fx_rates is not None:
+                    apply_fx_rates(salesforce_part, fx_rates, plan, diagnostics)
+                quality.scan_source("salesforce", chunk, salesforce_part, rows["salesforce"])
+            rows["salesforce"] += len(salesforce_part)
+            part = finish(salesforce_part, False)
+            if len(result["preview"]) == 0:
+                result["preview"] = part.head(10)
+            salesforce_part = None
+            writers.write(part)
+            if history is not None:
+                history.write(part, 0)
+            rows["result"] += len(part)
+            rows["chunks"] += 1
+            if progress is not None:
+                progress.advance(salesforce.fraction)
+        timings["Salesforce"] = time.perf_counter() - stage_start
+
+        if progress is not None:
+            progress.start_stage("Escribir resúmenes")
+        stage_start = time.perf_counter()
+        try:
+            summaries = summaries_from_aggregates(aggregates)
+        except Exception as e:
+            result["warnings"].append(f"No se pudieron calcular los resúmenes: {e}")
+            summaries = {}
+        writers.close(summaries)
+        if history is not None:
+            run = history.close()
+    except BaseException:
+        writers.abort()
+        if history is not None:
+            history.abort()
+        raise
+
+    result["quality"] = quality.tables()
+    result["column_warnings"] = mapping_warnings(result["quality"])
+    paths = list(writers.paths)
+    if summaries_csv:
+        for summary_name, table in summaries.items():
+            path = Path(output_dir) / f"{name}_{summary_slug(summary_name)}.csv"
+            with open(path, "wb") as output:
+                write_summary_csv(table, output)
+            paths.append(path)
+    paths.append(write_quality(result["quality"], output_dir, name))
+    timings["resúmenes"] = time.perf_counter() - stage_start
+    result["history"] = None
+    if history is not None:
+        result["history"], delta_paths = write_run_deltas(history_dir, run, output_dir, name)
+        paths += delta_paths
+    timings["total"] = time.perf_counter() - start
+
+    netsuite.check_sources(diagnostics)
+    salesforce.check_sources(diagnostics)
+    invalid_numbers = count_invalid_numbers(numeric_reports)
+    if invalid_numbers:
+        result["warnings"].append(invalid_numbers_warning(invalid_numbers))
+    result["reconciliation"] = reconciliation if reconcile_policy != "ninguna" else None
+    result["fx"] = fx
+    if reconcile:
+        by_estado = sorted(reconciliation["by_estado"].items(), key=lambda item: -item[1])
+        reconciliation["by_estado"] = dict(by_estado)
+        report_duplicates(reconciliation, diagnostics)
+
+    result.update({
+        "name": name,
+        "rows": rows["result"],
+        "netsuite_rows": rows["netsuite"],
+        "salesforce_rows": rows["salesforce"],
+        "netsuite_files": len(netsuite_sources),
+        "salesforce_files": len(salesforce_sources),
+        "files": {"netsuite": netsuite.files, "salesforce": salesforce.files},
+        "outputs": [str(path) for path in paths],
+        "summaries": summaries,
+        "incremental": None,
+        "streaming": {"memory_mb": memory_mb, "block_bytes": block_bytes, "chunks": rows["chunks"]},
+        "timings": timings,
+    })
+    return result
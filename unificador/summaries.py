@@ -0,0 +1,203 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from unificador.dates import month_of
+from unificador.reconcile import DUPLICATE_COLUMN
+
+# Columna que se suma en los resúmenes
+SUMMARY_VALUE = "Total USD"
+
+# Estados en el orden en que se muestran (los demás van después)
+ESTADOS = ["CONFIRMADO", "PIPELINE", "NO INCLUIR"]
+
+# Etiqueta de los valores vacíos en las filas de los resúmenes
+EMPTY_LABEL = "(sin dato)"
+
+# Dimensiones del agregado base: columna del resultado → nombre en los resúmenes.
+# "Date" se agrupa por mes.
+_DIMENSIONS = {
+    "Estado": "Estado",
+    "Date": "Mes",
+    "Customer Parent": "Customer Parent",
+    "_PM": "_PM",
+    "_Client Leader AUX": "_Client Leader AUX",
+}
+
+# Resúmenes por dimensión: nombre de la hoja → dimensión (se abren por Estado)
+_BY_DIMENSION = {
+    "Resumen Estado x Mes": "Mes",
+    "Resumen Cliente": "Customer Parent",
+    "Resumen PM": "_PM",
+    "Resumen Client Leader": "_Client Leader AUX",
+}
+
+# Cota de los códigos combinados en aggregate, para que no desborden un int64
+_MAX_COMBINED = 2 ** 62
+
+
+# Mes (YYYY-MM) de cada fecha DD/MM/YYYY, calculado sobre los valores únicos
+def month_labels(dates):
+    if isinstance(dates.dtype, pd.CategoricalDtype):
+        codes, uniques = dates.cat.codes.to_numpy(), dates.cat.categories
+    else:
+        codes, uniques = pd.factorize(dates)
+    labels = [month_of(value) or EMPTY_LABEL for value in uniques]
+    labels = np.array(labels + [EMPTY_LABEL], dtype=object)
+    return pd.Categorical(labels[codes])
+
+
+# Código de grupo de cada fila y etiqueta de cada código (los nulos van a EMPTY_LABEL,
+# con el último código)
+def _group_codes(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, uniques = pd.factorize(values)
+    labels = np.append(np.asarray(uniques, dtype=object), EMPTY_LABEL)
+    return np.where(codes < 0, len(uniques), codes).astype(np.int64), labels
+
+
+# Código denso (0..n-1) de cada combinación de códigos de columns (sizes es la cantidad de
+# códigos de cada una) y la cantidad de combinaciones. Los códigos se combinan como un
+# número en base mixta y se factoriza una sola vez, salvo que la combinación pudiera
+# desbordar: entonces se factoriza antes de seguir.
+def _combined_codes(columns, sizes):
+    combined = np.zeros(len(columns[0]), dtype=np.int64)
+    bound = 1
+    for codes, size in zip(columns, sizes):
+        if bound * size > _MAX_COMBINED:
+            combined, uniques = pd.factorize(combined)
+            bound = len(uniques)
+        combined = combined * size + codes
+        bound *= size
+    combined, uniques = pd.factorize(combined)
+    return combined, len(uniques)
+
+
+# Agregados base: suma de Total USD y cantidad de filas por Estado y cada dimensión (mes,
+# cliente, PM y Client Leader), como {dimensión: DataFrame}. Es todo lo que necesitan los
+# resúmenes, y su tamaño depende de la cantidad de valores de cada dimensión, no de sus
+# combinaciones. Las filas se agrupan una sola vez, por todas las dimensiones juntas (con
+# códigos enteros), y cada agregado se arma sumando esos grupos. Las filas de Salesforce
+# marcadas como ya registradas en Netsuite no se suman, para no contarlas dos veces.
+def aggregate(combined_df):
+    keys = {}
+    for col, name in _DIMENSIONS.items():
+        if col not in combined_df.columns:
+            continue
+        values = month_labels(combined_df[col]) if col == "Date" else combined_df[col]
+        keys[name] = pd.Series(values, copy=False).reset_index(drop=True)
+    if "Estado" not in keys or SUMMARY_VALUE not in combined_df.columns:
+        return {}
+
+    frame = pd.DataFrame(keys)
+    frame[SUMMARY_VALUE] = pd.to_numeric(combined_df[SUMMARY_VALUE], errors="coerce").to_numpy()
+    if DUPLICATE_COLUMN in combined_df.columns:
+        frame = frame[~combined_df[DUPLICATE_COLUMN].to_numpy(dtype=bool)]
+
+    # Grupos por todas las dimensiones: suma, filas y código de cada dimensión
+    codes, labels = {}, {}
+    for name in keys:
+        codes[name], labels[name] = _group_codes(frame[name])
+    groups, group_count = _combined_codes(list(codes.values()), [len(labels[name]) for name in keys])
+    values = np.nan_to_num(frame[SUMMARY_VALUE].to_numpy(dtype=float), nan=0.0)
+    totals = np.bincount(groups, weights=values, minlength=group_count)
+    sizes = np.bincount(groups, minlength=group_count)
+    for name in keys:
+        group_codes = np.zeros(group_count, dtype=np.int64)
+        group_codes[groups] = codes[name]
+        codes[name] = group_codes
+
+    # Cada agregado suma los grupos con el mismo Estado y valor de la dimensión
+    aggregates = {}
+    for name in keys:
+        if name == "Estado":
+            continue
+        pairs, pair_count = _combined_codes(
+            [codes["Estado"], codes[name]], [len(labels["Estado"]), len(labels[name])]
+        )
+        base = {}
+        for col in ("Estado", name):
+            pair_codes = np.zeros(pair_count, dtype=np.int64)
+            pair_codes[pairs] = codes[col]
+            base[col] = pd.Series(labels[col][pair_codes], dtype=object)
+        base[SUMMARY_VALUE] = np.bincount(pairs, weights=totals, minlength=pair_count)
+        base["Filas"] = np.bincount(pairs, weights=sizes, minlength=pair_count).astype(np.int64)
+        aggregates[name] = pd.DataFrame(base)
+    return aggregates
+
+
+def _estado_columns(columns):
+    columns = list(columns)
+    return [estado for estado in ESTADOS if estado in columns] + sorted(c for c in columns if c not in ESTADOS)
+
+
+# Total USD por dimensión, abierto por Estado, con total y cantidad de filas
+def _pivot_by_estado(base, dimension):
+    pivot = base.pivot_table(
+        index=dimension, columns="Estado", values=SUMMARY_VALUE, aggfunc="sum", fill_value=0.0, observed=True,
+    )
+    pivot = pivot[_estado_columns(pivot.columns)]
+    pivot.columns = [str(col) for col in pivot.columns]
+    pivot["Total"] = pivot.sum(axis=1)
+    pivot["Filas"] = base.groupby(dimension)["Filas"].sum()
+    if dimension == "Mes":
+        pivot = pivot.sort_index()
+    else:
+        pivot = pivot.sort_values("Total", ascending=False, kind="stable")
+    return pivot.reset_index()
+
+
+# Por mes: lo confirmado, lo que está en pipeline y el forecast (la suma de ambos)
+def _confirmed_vs_pipeline(base):
+    totals = base.pivot_table(
+        index="Mes", columns="Estado", values=SUMMARY_VALUE, aggfunc="sum", fill_value=0.0, observed=True,
+    )
+    table = pd.DataFrame(index=totals.index)
+    table["Confirmado"] = totals["CONFIRMADO"] if "CONFIRMADO" in totals.columns else 0.0
+    table["Pipeline"] = totals["PIPELINE"] if "PIPELINE" in totals.columns else 0.0
+    table["Forecast"] = table["Confirmado"] + table["Pipeline"]
+    forecast = table["Forecast"].where(table["Forecast"] != 0)
+    table["% Confirmado"] = (table["Confirmado"] / forecast).fillna(0.0)
+    return table.sort_index().reset_index()
+
+
+# Combinar los agregados base de distintas partes del resultado, sumando los de la misma
+# dimensión. Así los resúmenes se pueden calcular por partes (ver streaming) sin
+# tener todo el resultado en memoria.
+def merge_aggregates(aggregates):
+    merged = {}
+    for dimension in dict.fromkeys(dimension for bases in aggregates for dimension in bases):
+        parts = [bases[dimension] for bases in aggregates if dimension in bases]
+        if len(parts) == 1:
+            merged[dimension] = parts[0]
+            continue
+        combined = pd.concat(parts, ignore_index=True)
+        grouped = combined.groupby(["Estado", dimension], sort=False)[[SUMMARY_VALUE, "Filas"]].sum()
+        merged[dimension] = grouped.reset_index()
+    return merged
+
+
+# Resúmenes del resultado unificado: nombre → DataFrame chico, listo para escribirse como
+# hoja del XLSX o como CSV. Se calculan todos a partir de los agregados base; los que
+# necesitan columnas que no están en el resultado se omiten.
+def build_summaries(combined_df):
+    return summaries_from_aggregates(aggregate(combined_df))
+
+
+# Resúmenes a partir de los agregados base (de aggregate o merge_aggregates)
+def summaries_from_aggregates(aggregates):
+    summaries = {}
+    for name, dimension in _BY_DIMENSION.items():
+        if dimension in aggregates:
+            summaries[name] = _pivot_by_estado(aggregates[dimension], dimension)
+    if "Mes" in aggregates:
+        summaries["Confirmado vs Pipeline"] = _confirmed_vs_pipeline(aggregates["Mes"])
+    return summaries
+
+
+# Nombre de archivo para un resumen: "Resumen Estado x Mes" → "resumen_estado_x_mes"
+def summary_slug(name):
+    return re.sub(r'[^0-9a-z]+', "_", name.lower()).strip("_")
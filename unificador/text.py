@@ -0,0 +1,12 @@
+import unicodedata
+
+
+# Texto normalizado para comparar: sin acentos, sin distinguir mayúsculas y con los
+# espacios colapsados. Los textos ASCII no tienen acentos que quitar.
+def normalize_key(value):
+    text = str(value)
+    if text.isascii():
+        return " ".join(text.casefold().split())
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(text.casefold().split())